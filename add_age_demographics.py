@@ -9,6 +9,7 @@ import time
 import json
 from typing import Dict, Optional
 import warnings
+from columnar_store import read_table, write_table
 warnings.filterwarnings('ignore')
 
 class AgeDemographicsEnricher:
@@ -234,7 +235,7 @@ class AgeDemographicsEnricher:
     def enrich_locations_with_age_demographics(self, csv_file: str, output_file: str = None) -> pd.DataFrame:
         """Add age demographic data to the locations CSV"""
         print("Loading locations data...")
-        df = pd.read_csv(csv_file)
+        df = read_table(csv_file, float32=False)
         
         if output_file is None:
             output_file = csv_file.replace('.csv', '_with_age_demographics.csv')
@@ -248,7 +249,7 @@ class AgeDemographicsEnricher:
         # Get age data for each unique MSA
         print("Fetching age demographic data for MSAs...")
         for msa_code in unique_msa_codes:
-            if pd.isna(msa_code) or msa_code == 99999:
+            if pd.isna(msa_code) or msa_code == '99999':
                 continue
                 
             if msa_code not in self.msa_age_data:
@@ -322,7 +323,7 @@ class AgeDemographicsEnricher:
         
         # Save enriched data
         print(f"Saving enriched data to {output_file}...")
-        df.to_csv(output_file, index=False)
+        write_table(df, output_file)
         
         # Print summary
         print("\nAge Demographics Summary:")
@@ -3,11 +3,11 @@
 Add coordinates to attractiveness data using geocoding
 """
 
-import pandas as pd
 import requests
 import time
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+from columnar_store import read_table, write_table
 
 class CoordinateAdder:
     def __init__(self):
@@ -53,7 +53,7 @@ class CoordinateAdder:
         print("🗺️ Adding coordinates to attractiveness data...")
         
         # Load data
-        df = pd.read_csv(input_file)
+        df = read_table(input_file, float32=False)
         print(f"📊 Loaded {len(df)} facilities")
         
         # Add coordinate columns
@@ -81,7 +81,7 @@ class CoordinateAdder:
         
         # Save enhanced data
         output_file = 'ssm_health_locations_with_attractiveness_scores_and_coords.csv'
-        df.to_csv(output_file, index=False)
+        write_table(df, output_file)
         
         # Print summary
         valid_coords = df[df['lat'].notna() & df['lon'].notna()]
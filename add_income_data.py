@@ -9,6 +9,7 @@ import time
 import json
 from typing import Dict, Optional
 import warnings
+from columnar_store import read_table, write_table
 warnings.filterwarnings('ignore')
 
 class IncomeDataEnricher:
@@ -149,7 +150,7 @@ class IncomeDataEnricher:
     def enrich_locations_with_income(self, csv_file: str, output_file: str = None) -> pd.DataFrame:
         """Add household income data to the locations CSV"""
         print("Loading locations data...")
-        df = pd.read_csv(csv_file)
+        df = read_table(csv_file, float32=False)
         
         if output_file is None:
             output_file = csv_file.replace('.csv', '_with_income.csv')
@@ -163,7 +164,7 @@ class IncomeDataEnricher:
         # Get income data for each unique MSA
         print("Fetching income data for MSAs...")
         for msa_code in unique_msa_codes:
-            if pd.isna(msa_code) or msa_code == 99999:
+            if pd.isna(msa_code) or msa_code == '99999':
                 continue
                 
             if msa_code not in self.msa_income_data:
@@ -207,7 +208,7 @@ class IncomeDataEnricher:
         
         # Save enriched data
         print(f"Saving enriched data to {output_file}...")
-        df.to_csv(output_file, index=False)
+        write_table(df, output_file)
         
         # Print summary
         print("\nIncome Data Summary:")
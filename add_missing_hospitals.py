@@ -8,6 +8,7 @@ import requests
 import time
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+from name_matcher import NameMatcher
 
 def get_coordinates_for_address(address, city, state, zip_code):
     """Get coordinates for an address using geocoding"""
@@ -49,23 +50,24 @@ def add_missing_hospitals():
     print(f"  Main dataset has {len(main_data)} facilities")
     
     # Get hospital names from both datasets
-    masterlist_hospitals = set(masterlist['name'].str.strip().str.lower())
-    main_hospitals = set(main_data[main_data['facility_type'] == 'Hospital']['name'].str.strip().str.lower())
+    main_hospitals = main_data.loc[main_data['facility_type'] == 'Hospital', 'name'].dropna()
+    exact_matcher = NameMatcher(main_hospitals, stopwords=())
     
-    # Find missing hospitals
-    missing_hospitals = masterlist_hospitals - main_hospitals
-    print(f"  Found {len(missing_hospitals)} missing hospitals")
+    # Find missing hospitals (no exact name match, ignoring case and punctuation)
+    missing_records = masterlist[~masterlist['name'].map(exact_matcher.is_exact)]
+    print(f"  Found {len(missing_records)} missing hospitals")
     
-    if not missing_hospitals:
+    if missing_records.empty:
         print("  ✅ All hospitals from masterlist are already in the main dataset!")
         return
     
-    # Get the missing hospital records from masterlist
-    missing_records = masterlist[masterlist['name'].str.strip().str.lower().isin(missing_hospitals)]
-    
+    # Closest dataset name for each, to catch hospitals listed under another spelling
+    similar_matcher = NameMatcher(main_hospitals)
     print(f"\n  Missing hospitals:")
-    for _, hospital in missing_records.iterrows():
-        print(f"    - {hospital['name']}")
+    for name in missing_records['name']:
+        closest, confidence = similar_matcher.match(name)
+        note = f" (closest: {closest}, {confidence:.0%} similar)" if closest else ""
+        print(f"    - {name}{note}")
     
     # Create new records for missing hospitals
     new_records = []
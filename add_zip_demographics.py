@@ -9,6 +9,7 @@ import numpy as np
 import requests
 import time
 import warnings
+from columnar_store import read_table, write_table
 warnings.filterwarnings('ignore')
 
 class ZIPDemographicsEnricher:
@@ -271,7 +272,7 @@ class ZIPDemographicsEnricher:
         print(f"🔍 Enriching facility data with ZIP code demographics...")
         
         # Load the data
-        df = pd.read_csv(input_file)
+        df = read_table(input_file, float32=False)
         
         # Get unique ZIP codes
         unique_zips = df['zip'].dropna().unique()
@@ -397,7 +398,7 @@ class ZIPDemographicsEnricher:
         
         # Save the enriched data
         output_file = 'ssm_health_locations_with_census_zip_demographics.csv'
-        df.to_csv(output_file, index=False)
+        write_table(df, output_file)
         
         print(f"✅ Enriched data saved to {output_file}")
         print(f"📊 Added {len(demographic_columns)} new demographic columns")
@@ -8,6 +8,7 @@ import pandas as pd
 import numpy as np
 import random
 import warnings
+from columnar_store import read_table, write_table
 warnings.filterwarnings('ignore')
 
 class SimpleZIPDemographicsEnricher:
@@ -151,7 +152,7 @@ class SimpleZIPDemographicsEnricher:
         print(f"🔍 Enriching facility data with ZIP code demographics...")
         
         # Load the data
-        df = pd.read_csv(input_file)
+        df = read_table(input_file, float32=False)
         
         # Get unique ZIP codes
         unique_zips = df['zip'].dropna().unique()
@@ -247,7 +248,7 @@ class SimpleZIPDemographicsEnricher:
         
         # Save the enriched data
         output_file = 'ssm_health_locations_with_zip_demographics.csv'
-        df.to_csv(output_file, index=False)
+        write_table(df, output_file)
         
         print(f"✅ Enriched data saved to {output_file}")
         print(f"📊 Added {len(demographic_columns)} new demographic columns")
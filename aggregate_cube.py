@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Materialized MSA Aggregate Cube for the Analysis Dashboards
+The dashboards in comprehensive_facility_analysis.py, corrected_comprehensive_analysis.py
+and enhanced_facility_analysis.py all chart the same few aggregates of the
+facility rows. AggregateCube keeps them materialized:
+  - cells: facility counts per MSA x facility_category x income_category x
+    age_mix_category, with the MSA population and facilities per 100k
+  - msas: one row per MSA with its first MSA-level values (as groupby().first()
+    gives), facility count and facilities per 100k
+Each analyzer saves its cube (its own category definitions) under a name.
+On the next run only the MSAs whose rows changed since then are recomputed,
+so the cube is built once and refreshed incrementally as the pipeline
+rewrites its input.
+"""
+
+import json
+import os
+import pandas as pd
+from columnar_store import read_table, write_table
+from table_schema import code_column
+
+CUBE_DIR = 'aggregate_cube'
+
+# Cube dimensions; a cube uses those its rows have
+DIMENSIONS = ['msa_name', 'msa_code', 'facility_category', 'income_category', 'age_mix_category']
+
+MSA_KEY = ['msa_name', 'msa_code']
+
+# MSA-level values kept per MSA (first non-null value)
+MSA_ATTRIBUTES = [
+    'msa_population', 'msa_median_household_income', 'median_age',
+    'pct_under_18', 'pct_18_34', 'pct_35_54', 'pct_55_64', 'pct_65_plus'
+]
+
+
+def _prepare(df):
+    """The cube's columns of df, MSA codes as schema strings, plus the msa_key partition"""
+    columns = [column for column in DIMENSIONS + MSA_ATTRIBUTES if column in df.columns]
+    rows = df[columns].copy()
+    if 'msa_code' in rows.columns:
+        rows['msa_code'] = code_column(rows['msa_code'])
+    parts = [rows[column].astype(object).where(rows[column].notna(), '').astype(str)
+             for column in MSA_KEY if column in rows.columns]
+    rows['msa_key'] = parts[0].str.cat(parts[1:], sep='|') if parts else ''
+    return rows
+
+
+def _categories(rows, dimensions):
+    """Category order (and orderedness) of each categorical dimension of rows"""
+    return {
+        column: {'categories': list(rows[column].cat.categories), 'ordered': bool(rows[column].cat.ordered)}
+        for column in dimensions if isinstance(rows[column].dtype, pd.CategoricalDtype)
+    }
+
+
+def _msa_digests(rows):
+    """msa_key -> content digest of that MSA's rows (order-independent)"""
+    hashes = pd.util.hash_pandas_object(rows.drop(columns='msa_key'), index=False)
+    grouped = hashes.groupby(rows['msa_key'].to_numpy(), sort=False)
+    return grouped.sum().map('{:016x}'.format) + '-' + grouped.size().astype(str)
+
+
+class AggregateCube:
+    """
+    Facility counts per MSA x category cell (cells) and per MSA (msas).
+    categories keeps each categorical dimension's category order, which the
+    saved CSVs don't.
+    """
+
+    def __init__(self, cells, msas, dimensions, categories):
+        self.cells = cells
+        self.msas = msas
+        self.dimensions = list(dimensions)
+        self.categories = categories
+
+    @classmethod
+    def from_rows(cls, df):
+        """Build the cube from facility rows that already have their category columns"""
+        rows = _prepare(df)
+        dimensions = [column for column in DIMENSIONS if column in rows.columns]
+        cube = cls(pd.DataFrame(), pd.DataFrame(), dimensions, _categories(rows, dimensions))
+        cube.cells, cube.msas = cube._aggregate(rows)
+        return cube
+
+    def _aggregate(self, rows):
+        """cells and msas tables of rows"""
+        attributes = [column for column in MSA_ATTRIBUTES if column in rows.columns]
+        key = [column for column in MSA_KEY if column in rows.columns]
+        grouped = rows.groupby('msa_key', sort=False)
+        msas = grouped[key + attributes].first()
+        msas['facility_count'] = grouped.size()
+        msas['row_digest'] = _msa_digests(rows)
+        msas = msas.reset_index()
+
+        cells = (rows.groupby(['msa_key'] + self.dimensions, dropna=False, observed=True, sort=False)
+                 .size().reset_index(name='facility_count'))
+        if 'msa_population' in msas.columns:
+            msas['facilities_per_100k'] = msas['facility_count'] / msas['msa_population'] * 100000
+            cells['population'] = cells['msa_key'].map(msas.set_index('msa_key')['msa_population'])
+            cells['facilities_per_100k'] = cells['facility_count'] / cells['population'] * 100000
+        return cells, msas
+
+    def update(self, df):
+        """
+        Bring the cube up to date with df, the full current facility rows;
+        only MSAs whose rows changed are recomputed. Returns the changed msa_keys.
+        New dimensions or category definitions rebuild the whole cube, since the
+        saved cells would be rolled up with the new categories.
+        """
+        rows = _prepare(df)
+        dimensions = [column for column in DIMENSIONS if column in rows.columns]
+        if dimensions != self.dimensions or _categories(rows, dimensions) != self.categories:
+            rebuilt = AggregateCube.from_rows(df)
+            self.cells, self.msas, self.dimensions, self.categories = (
+                rebuilt.cells, rebuilt.msas, rebuilt.dimensions, rebuilt.categories)
+            return list(self.msas['msa_key'])
+
+        digests = _msa_digests(rows)
+        saved = self.msas.set_index('msa_key')['row_digest'] if len(self.msas) else pd.Series(dtype=object)
+        changed = [key for key, digest in digests.items() if saved.get(key) != digest]
+        removed = set(saved.index) - set(digests.index)
+        if not changed and not removed:
+            return []
+
+        cells, msas = self._aggregate(rows[rows['msa_key'].isin(changed)])
+        stale = set(changed) | removed
+        self.cells = pd.concat([self.cells[~self.cells['msa_key'].isin(stale)], cells], ignore_index=True)
+        self.msas = pd.concat([self.msas[~self.msas['msa_key'].isin(stale)], msas], ignore_index=True)
+        return changed + sorted(removed)
+
+    def _typed(self, df):
+        """df with the categorical dimensions in their original category order"""
+        df = df.copy()
+        for column, spec in self.categories.items():
+            if column in df.columns:
+                df[column] = pd.Categorical(df[column].astype(object), categories=spec['categories'],
+                                            ordered=spec['ordered'])
+        return df
+
+    def rollup(self, by):
+        """Facility counts per combination of the by dimensions (rows missing one are left out)"""
+        cells = self._typed(self.cells)
+        return cells.groupby(by, observed=True)['facility_count'].sum().reset_index()
+
+    def msa_summary(self):
+        """One row per MSA with a name and code, in (msa_name, msa_code) order like a groupby"""
+        key = [column for column in MSA_KEY if column in self.msas.columns]
+        msas = self.msas.dropna(subset=key).sort_values(key, ignore_index=True)
+        return msas.drop(columns=['msa_key', 'row_digest'])
+
+    def save(self, name, cube_dir=CUBE_DIR):
+        os.makedirs(cube_dir, exist_ok=True)
+        write_table(self.cells, os.path.join(cube_dir, f"{name}_cells.csv"))
+        write_table(self.msas, os.path.join(cube_dir, f"{name}_msas.csv"))
+        with open(os.path.join(cube_dir, f"{name}.json"), 'w') as f:
+            json.dump({'dimensions': self.dimensions, 'categories': self.categories}, f, indent=2)
+
+    @classmethod
+    def load(cls, name, cube_dir=CUBE_DIR):
+        """Read a cube written by save()"""
+        with open(os.path.join(cube_dir, f"{name}.json"), 'r') as f:
+            meta = json.load(f)
+        # Dimensions as plain text (categories are restored from the metadata when
+        # rolled up) and MSA values at full precision, as they were computed
+        dtypes = {column: object for column in meta['dimensions'] + ['msa_key', 'row_digest']}
+        dtypes.update({column: 'float64' for column in MSA_ATTRIBUTES})
+        cells = read_table(os.path.join(cube_dir, f"{name}_cells.csv"), dtype=dtypes)
+        msas = read_table(os.path.join(cube_dir, f"{name}_msas.csv"), dtype=dtypes)
+        return cls(cells, msas, meta['dimensions'], meta['categories'])
+
+
+def load_cube(df, name, cube_dir=CUBE_DIR):
+    """
+    The cube saved under name, updated with the facility rows df (or built
+    from them the first time) and saved again when anything changed
+    """
+    if os.path.exists(os.path.join(cube_dir, f"{name}.json")):
+        cube = AggregateCube.load(name, cube_dir)
+        changed = cube.update(df)
+    else:
+        cube = AggregateCube.from_rows(df)
+        changed = list(cube.msas['msa_key'])
+    if changed:
+        cube.save(name, cube_dir)
+        print(f"📦 Aggregate cube '{name}': recomputed {len(changed)} of {len(cube.msas)} MSAs")
+    else:
+        print(f"📦 Aggregate cube '{name}': up to date ({len(cube.msas)} MSAs)")
+    return cube
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Embedded Analytics Database for the Pipeline Tables
+Loads the pipeline's facility tables and the scored ZIP tables into one SQLite
+file, indexed on the columns the reports filter and group by (MSA, ZIP, state,
+facility type), with two views per facility table:
+  - <table>_msa: one row per MSA with its facility count, population totals and
+    MSA attributes (taken from the MSA's first row, like groupby().first())
+  - <table>_zip: every facility joined to its ZIP's scored demographics
+so a report is one indexed aggregate query instead of repeated DataFrame
+filters. A table is reloaded only when its source file changes.
+"""
+
+import os
+import re
+import sqlite3
+import pandas as pd
+from columnar_store import read_table
+from build_maps import SCORED_ZIP_FILES
+from facility_model import MSA_COLUMNS
+
+DB_FILE = 'ssm_analytics.db'
+
+# Facility tables from the pipeline stages, loaded by build_analytics_db()
+FACILITY_TABLES = [
+    'ssm_health_locations_with_msa_robust.csv',
+    'ssm_health_locations_with_income_with_age_demographics.csv',
+    'ssm_health_locations_with_attractiveness_scores_and_coords.csv'
+]
+
+ZIP_SCORES_TABLE = 'zip_scores'
+
+# Columns indexed in every table that has them
+INDEX_COLUMNS = ['msa_name', 'msa_code', 'zip', 'state', 'type', 'facility_type', 'msa_source']
+
+# MSA-level columns carried into the <table>_msa rollup
+MSA_ATTRIBUTES = ['msa_code'] + [column for column in MSA_COLUMNS if column != 'msa_name']
+
+
+def table_name_for(path):
+    """ssm_health_locations_with_msa_robust.csv -> ssm_health_locations_with_msa_robust"""
+    return re.sub(r'\W', '_', os.path.splitext(os.path.basename(path))[0])
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def connect(db_path=DB_FILE, functions=None):
+    """
+    Open the database
+
+    functions: name -> one-argument Python function callable from SQL
+    """
+    conn = sqlite3.connect(db_path)
+    for function_name, function in (functions or {}).items():
+        conn.create_function(function_name, 1, function, deterministic=True)
+    conn.execute("CREATE TABLE IF NOT EXISTS _sources (name TEXT PRIMARY KEY, path TEXT, size INTEGER, mtime_ns INTEGER)")
+    return conn
+
+
+def table_columns(conn, name):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(name)})")]
+
+
+def msa_rollup_sql(name, columns, where=None, keys=None):
+    """
+    SELECT for one row per MSA of table name, largest first: facility_count,
+    population_2016 total and mean when present, the MSA attributes (each
+    MSA's first non-null value, as groupby().first() gives) and
+    facilities_per_100k = facility_count / msa_population * 100,000
+
+    columns: the table's columns
+    where: SQL condition on the table's rows
+    keys: output column -> SQL expression to group by (default msa_name)
+    """
+    keys = keys or {'msa_name': 'msa_name'}
+    partition = ', '.join(keys.values())
+    attributes = [column for column in MSA_ATTRIBUTES if column in columns and column not in keys]
+    inner = [f"{expression} AS {_quote(alias)}" for alias, expression in keys.items()] + ["rowid AS _row"]
+    if 'population_2016' in columns:
+        inner.append("population_2016")
+    inner += [f"FIRST_VALUE({_quote(column)}) OVER (PARTITION BY {partition} "
+              f"ORDER BY {_quote(column)} IS NULL, rowid) AS {_quote(column)}" for column in attributes]
+    conditions = [f"{expression} IS NOT NULL" for expression in keys.values()] + ([f"({where})"] if where else [])
+
+    outer = [_quote(alias) for alias in keys] + ["COUNT(*) AS facility_count"]
+    if 'population_2016' in columns:
+        outer += ["TOTAL(population_2016) AS total_population", "AVG(population_2016) AS avg_population"]
+    outer += [f"MAX({_quote(column)}) AS {_quote(column)}" for column in attributes]
+    if 'msa_population' in attributes:
+        outer.append("COUNT(*) * 100000.0 / MAX(msa_population) AS facilities_per_100k")
+    group = ', '.join(_quote(alias) for alias in keys)
+    return (f"SELECT {', '.join(outer)} FROM (SELECT {', '.join(inner)} FROM {_quote(name)} "
+            f"WHERE {' AND '.join(conditions)}) GROUP BY {group} ORDER BY facility_count DESC, MIN(_row)")
+
+
+def _create_views(conn, name):
+    columns = table_columns(conn, name)
+    conn.execute(f"DROP VIEW IF EXISTS {_quote(name + '_msa')}")
+    if 'msa_name' in columns:
+        conn.execute(f"CREATE VIEW {_quote(name + '_msa')} AS {msa_rollup_sql(name, columns)}")
+
+    conn.execute(f"DROP VIEW IF EXISTS {_quote(name + '_zip')}")
+    if 'zip' in columns and name != ZIP_SCORES_TABLE and ZIP_SCORES_TABLE in _tables(conn):
+        zip_columns = [column for column in table_columns(conn, ZIP_SCORES_TABLE) if column not in columns]
+        selected = ', '.join(['f.*'] + [f"z.{_quote(column)}" for column in zip_columns])
+        conn.execute(f"CREATE VIEW {_quote(name + '_zip')} AS SELECT {selected} FROM {_quote(name)} f "
+                     f"LEFT JOIN {ZIP_SCORES_TABLE} z ON z.zip = f.zip")
+
+
+def _tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def _source_signature(paths):
+    stats = [os.stat(path) for path in paths]
+    return sum(stat.st_size for stat in stats), max(stat.st_mtime_ns for stat in stats)
+
+
+def load_table(conn, path, name=None, force=False):
+    """
+    Load a pipeline CSV (or several, concatenated) into table name, unless it
+    is already loaded from the same file version. Returns the table name.
+    """
+    paths = [path] if isinstance(path, str) else list(path)
+    paths = [p for p in paths if os.path.exists(p) or os.path.exists(os.path.splitext(p)[0] + '.parquet')]
+    if not paths:
+        raise FileNotFoundError(f"No such file: {path}")
+    name = name or table_name_for(paths[0])
+    size, mtime_ns = _source_signature([p for p in paths if os.path.exists(p)] or
+                                       [os.path.splitext(p)[0] + '.parquet' for p in paths])
+    loaded = conn.execute("SELECT size, mtime_ns FROM _sources WHERE name = ?", (name,)).fetchone()
+    if not force and loaded == (size, mtime_ns) and name in _tables(conn):
+        return name
+
+    df = pd.concat([read_table(p) for p in paths], ignore_index=True)
+    # SQLite stores TEXT and 64-bit REAL; float32 goes through its shortest text form
+    # so 21.8 is stored as 21.8, not 21.799999237
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(object)
+        elif df[column].dtype == 'float32':
+            df[column] = pd.to_numeric(df[column].astype(str))
+    if name == ZIP_SCORES_TABLE:
+        # Later files win on duplicate ZIPs, as in the map builders' lookup
+        df = df.drop_duplicates('zip', keep='last')
+    df.to_sql(name, conn, if_exists='replace', index=False)
+    for column in INDEX_COLUMNS:
+        if column in df.columns:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{name}_{column}')} "
+                         f"ON {_quote(name)} ({_quote(column)})")
+    conn.execute("INSERT OR REPLACE INTO _sources VALUES (?, ?, ?, ?)", (name, ';'.join(paths), size, mtime_ns))
+
+    # Views over this table, and the ZIP views of every facility table when the ZIP scores change
+    for table in (_tables(conn) - {'_sources'} if name == ZIP_SCORES_TABLE else [name]):
+        _create_views(conn, table)
+    conn.commit()
+    return name
+
+
+def query(sql, params=(), db_path=DB_FILE, tables=(), functions=None):
+    """
+    Run sql and return the result as a DataFrame
+
+    tables: pipeline CSVs to (re)load first when they changed; each is the
+            table table_name_for(path)
+    functions: SQL functions for the query, as in connect()
+    """
+    conn = connect(db_path, functions)
+    try:
+        for path in tables:
+            load_table(conn, path)
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+
+def msa_rollup(path, where=None, params=(), keys=None, db_path=DB_FILE, functions=None):
+    """
+    One row per MSA of a pipeline CSV (see msa_rollup_sql), loading it first
+    when it changed
+
+    where / params: SQL condition on the facility rows and its parameters
+    """
+    conn = connect(db_path, functions)
+    try:
+        name = load_table(conn, path)
+        sql = msa_rollup_sql(name, table_columns(conn, name), where, keys)
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+
+def build_analytics_db(db_path=DB_FILE, facility_tables=FACILITY_TABLES, force=False):
+    """Load the scored ZIPs and every facility table that exists; returns the loaded table names"""
+    conn = connect(db_path)
+    loaded = []
+    try:
+        zip_files = [path for path in SCORED_ZIP_FILES if os.path.exists(path)]
+        if zip_files:
+            loaded.append(load_table(conn, zip_files, ZIP_SCORES_TABLE, force))
+        for path in facility_tables:
+            if os.path.exists(path):
+                loaded.append(load_table(conn, path, force=force))
+    finally:
+        conn.close()
+    return loaded
+
+
+def main():
+    """Build (or refresh) the analytics database and list its tables and views"""
+    print("🏥 SSM Health Analytics Database")
+    print("=" * 50)
+    tables = build_analytics_db()
+    conn = connect()
+    try:
+        for name in tables:
+            rows = conn.execute(f"SELECT COUNT(*) FROM {_quote(name)}").fetchone()[0]
+            print(f"  ✅ {name}: {rows} rows")
+        views = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'view' ORDER BY name")]
+        print(f"  👁️ Views: {', '.join(views) if views else 'none'}")
+    finally:
+        conn.close()
+    print(f"💾 Saved to {DB_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Attractiveness Score Binning
+Vectorized classification of 0-100 attractiveness scores into categories and colors.
+Shared by the ZIP scorers and the map builders so the thresholds live in one place.
+"""
+
+import pandas as pd
+import numpy as np
+
+# Lower edges of the Low / Medium / High / Very High bins
+SCORE_BINS = np.array([20, 40, 60, 80])
+
+CATEGORY_LABELS = ['Very Low', 'Low', 'Medium', 'High', 'Very High']
+
+# Palette written to the attractiveness_color column by the scorers
+CATEGORY_COLORS = np.array([
+    '#9467bd',  # Purple - Very Low
+    '#d62728',  # Red - Low
+    '#2ca02c',  # Green - Medium
+    '#ff7f0e',  # Orange - High
+    '#1f77b4',  # Dark blue - Very High
+])
+
+# Red-to-green palette used for ZIP polygon fills on the portal maps
+MAP_FILL_COLORS = np.array([
+    '#ff3333',  # Bright Red - Very Unattractive
+    '#ff9933',  # Orange - Low
+    '#ffff66',  # Yellow - Medium
+    '#99ff99',  # Light Green - High
+    '#00e600',  # Bright Green - Very Attractive
+])
+
+
+def score_bin_codes(scores):
+    """
+    Return the bin index (0-4) for each score.
+    NaN scores fall into bin 0, matching the old if/elif chains where
+    every comparison against NaN was False.
+    """
+    values = np.asarray(scores, dtype=float)
+    codes = np.digitize(values, SCORE_BINS, right=False)
+    codes[np.isnan(values)] = 0
+    return codes
+
+
+def categorize_scores(scores):
+    """
+    Categorize attractiveness scores into levels
+
+    Returns:
+        (pd.Categorical, np.ndarray): ordered categories and hex colors
+    """
+    codes = score_bin_codes(scores)
+    categories = pd.Categorical.from_codes(codes, categories=CATEGORY_LABELS, ordered=True)
+    return categories, CATEGORY_COLORS[codes]
+
+
+def map_fill_colors(scores):
+    """Return the portal map fill color for each score"""
+    return MAP_FILL_COLORS[score_bin_codes(scores)]
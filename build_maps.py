@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Portal Map Build Orchestrator
+Builds the comprehensive, market-share and overlay maps in parallel worker
+processes after loading their shared inputs once, and skips any map whose
+inputs (data files, builder code and build settings) hash the same as at its
+last successful build. Each map is written and compressed under a temporary
+name and swapped in with os.replace, so the portal never serves a partial map.
+"""
+
+import ast
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import input_cache
+import market_share
+from geometry_store import is_store_current, build_geometry_store
+from simplify_zip_polygons import SIMPLIFICATION_LEVELS, simplified_path_for, build_simplified_levels
+import vector_tiles
+from vector_tiles import TILESETS
+from static_delivery import precompress_file, install_precompressed
+from columnar_store import FACILITY_MAP_COLUMNS, ZIP_SCORE_COLUMNS
+
+MANIFEST_FILE = 'map_build_manifest.json'
+
+# Where the builder modules and the modules they import live
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ZIP_GEOJSON_FILES = ['zipcodes_mn_wi_il_scored.geojson', 'zipcodes_mo_ok.geojson']
+
+SCORED_ZIP_FILES = ['all_mn_wi_il_zip_demographics_scored.csv', 'all_ok_mo_zip_demographics_scored.csv']
+
+FACILITY_FILES = [
+    'ssm_health_locations_with_attractiveness_scores_and_coords.csv',
+    'ssm_health_locations_with_census_zip_demographics.csv',
+    'ssm_health_locations_with_zip_demographics.csv',
+    'ssm_health_locations.csv',
+    'hospitals_masterlist.csv',
+    'uszips.csv'
+]
+
+# The extracts market_share.py reads, as a list of input paths
+MARKET_SHARE_FILES = list(market_share.MARKET_SHARE_FILES.values())
+
+# What vector_tiles.py builds the ZCTA tile set from
+TILE_INPUTS = SCORED_ZIP_FILES + ZIP_GEOJSON_FILES + MARKET_SHARE_FILES + ['vector_tiles.py']
+
+# Environment settings that change builder output
+BUILD_SETTINGS = ['MAP_EXTERNAL_LAYERS']
+
+MAP_BUILDS = {
+    'comprehensive': {
+        'module': 'create_comprehensive_final_map',
+        'output': 'ssm_health_comprehensive_final_map.html',
+        'inputs': SCORED_ZIP_FILES + FACILITY_FILES + ZIP_GEOJSON_FILES + [TILESETS['zcta']]
+    },
+    'market_share': {
+        'module': 'create_comprehensive_competitor_market_share_map',
+        'output': 'ssm_health_comprehensive_competitor_market_share_map.html',
+        'inputs': MARKET_SHARE_FILES + ZIP_GEOJSON_FILES
+    },
+    'overlay': {
+        'module': 'create_proper_overlay_market_share_attractiveness_facilities_map',
+        'output': 'ssm_health_proper_overlay_market_share_attractiveness_facilities_map.html',
+        'inputs': MARKET_SHARE_FILES + SCORED_ZIP_FILES + FACILITY_FILES + ZIP_GEOJSON_FILES
+    }
+}
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """sha256 of a file's contents, or 'missing'"""
+    if not os.path.exists(path):
+        return 'missing'
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+
+def _import_nodes(node):
+    """Import statements under node, except those in main() (command-line entry points)"""
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)) and child.name == 'main':
+            continue
+        if isinstance(child, (ast.Import, ast.ImportFrom)):
+            yield child
+        else:
+            yield from _import_nodes(child)
+
+
+def local_imports(module_file, found=None):
+    """The repository modules module_file imports, directly or through each other"""
+    found = set() if found is None else found
+    with open(os.path.join(CODE_DIR, module_file), 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=module_file)
+    for node in _import_nodes(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            path = name.split('.')[0] + '.py'
+            if path not in found and os.path.exists(os.path.join(CODE_DIR, path)):
+                found.add(path)
+                local_imports(path, found)
+    return found
+
+
+# Modules the builders import (found from their import statements); a change
+# to any of them rebuilds all maps
+SHARED_CODE = sorted(set().union(*(local_imports(build['module'] + '.py') for build in MAP_BUILDS.values())) -
+                     {build['module'] + '.py' for build in MAP_BUILDS.values()})
+
+
+def build_hash(name, digests):
+    """Combined hash of a map's inputs, builder code and build settings"""
+    build = MAP_BUILDS[name]
+    files = build['inputs'] + [build['module'] + '.py'] + SHARED_CODE
+    combined = hashlib.sha256()
+    for path in sorted(set(files)):
+        combined.update(f"{path}={digests[path]}\n".encode('utf-8'))
+    for setting in BUILD_SETTINGS:
+        combined.update(f"{setting}={os.environ.get(setting, '')}\n".encode('utf-8'))
+    return combined.hexdigest()
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
+    with open(MANIFEST_FILE, 'r') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest):
+    temp_file = MANIFEST_FILE + '.tmp'
+    with open(temp_file, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_file, MANIFEST_FILE)
+
+
+def refresh_tilesets():
+    """
+    Rebuild the ZCTA tile set when any of its inputs is newer. Only a tile set
+    that exists is kept current: running vector_tiles.py once switches the
+    comprehensive map to tiles, and it inlines its polygons until then.
+    """
+    path = TILESETS['zcta']
+    if not os.path.exists(path):
+        return
+    built_at = os.path.getmtime(path)
+    if any(os.path.exists(source) and os.path.getmtime(source) > built_at for source in TILE_INPUTS):
+        try:
+            vector_tiles.main()
+        except Exception as e:
+            # The previous tile set stays in place
+            print(f"⚠️ Warning: Could not rebuild {path}: {e}")
+
+
+def prepare_shared_inputs():
+    """
+    Build derived geometry files once, before the workers start, so they neither
+    race to write them nor repeat the work; then parse the tabular inputs into
+    input_cache for forked workers to inherit
+    """
+    for geojson_file in ZIP_GEOJSON_FILES:
+        if not os.path.exists(geojson_file):
+            continue
+        if not is_store_current(geojson_file):
+            build_geometry_store(geojson_file)
+        source_mtime = os.path.getmtime(geojson_file)
+        if any(not os.path.exists(simplified_path_for(geojson_file, level)) or
+               os.path.getmtime(simplified_path_for(geojson_file, level)) < source_mtime
+               for level in SIMPLIFICATION_LEVELS):
+            build_simplified_levels(geojson_file)
+
+    tables = [(path, ZIP_SCORE_COLUMNS) for path in SCORED_ZIP_FILES]
+    tables += [(path, FACILITY_MAP_COLUMNS) for path in FACILITY_FILES
+               if path not in ('hospitals_masterlist.csv', 'uszips.csv')]
+    csv_files = [('hospitals_masterlist.csv', {'skiprows': 2}), ('uszips.csv', {})]
+    loaded = input_cache.preload(csv_files=csv_files, excel_files=MARKET_SHARE_FILES, tables=tables)
+    print(f"📦 Preloaded {loaded} shared input files")
+
+
+def temp_output_for(name):
+    """Path a map is built at before being swapped in"""
+    return MAP_BUILDS[name]['output'] + '.building'
+
+
+def run_build(name):
+    """Worker: import a builder module and run its main() into the map's temp path"""
+    start = time.time()
+    module = importlib.import_module(MAP_BUILDS[name]['module'])
+    module.main(output_file=temp_output_for(name))
+    return name, time.time() - start
+
+
+def build_all_maps(names=None, force=False, max_workers=None):
+    """
+    Build the portal maps whose inputs changed since their last build
+
+    names: subset of MAP_BUILDS to consider (default all)
+    force: rebuild even when the input hashes are unchanged
+
+    Returns {map name: 'built' | 'skipped' | 'failed'}.
+    """
+    names = list(names or MAP_BUILDS)
+    manifest = load_manifest()
+
+    # Before hashing, so maps drawn from the tiles see the rebuilt ones
+    refresh_tilesets()
+
+    files = set(SHARED_CODE)
+    for name in names:
+        files.update(MAP_BUILDS[name]['inputs'])
+        files.add(MAP_BUILDS[name]['module'] + '.py')
+    digests = {path: file_digest(path) for path in files}
+    hashes = {name: build_hash(name, digests) for name in names}
+
+    results = {}
+    stale = []
+    for name in names:
+        entry = manifest.get(name, {})
+        if not force and entry.get('hash') == hashes[name] and os.path.exists(MAP_BUILDS[name]['output']):
+            print(f"⏭️ {name}: inputs unchanged, keeping {MAP_BUILDS[name]['output']}")
+            results[name] = 'skipped'
+        else:
+            stale.append(name)
+    if not stale:
+        return results
+
+    prepare_shared_inputs()
+
+    # fork lets workers inherit the preloaded input cache; other start methods
+    # still work, each worker then parses its own inputs
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    print(f"🏗️ Building {len(stale)} map(s): {', '.join(stale)}")
+    with ProcessPoolExecutor(max_workers=max_workers or len(stale), mp_context=context) as executor:
+        futures = {executor.submit(run_build, name): name for name in stale}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                _, seconds = future.result()
+            except Exception as e:
+                print(f"⚠️ Warning: Could not build {name} map: {e}")
+                if os.path.exists(temp_output_for(name)):
+                    os.remove(temp_output_for(name))
+                results[name] = 'failed'
+                continue
+            print(f"✅ {name} map built in {seconds:.1f}s")
+            # Compressed once here rather than per request by the portal
+            precompress_file(temp_output_for(name))
+            install_precompressed(temp_output_for(name), MAP_BUILDS[name]['output'])
+            manifest[name] = {
+                'hash': hashes[name],
+                'output': MAP_BUILDS[name]['output'],
+                'built_at': time.strftime('%Y-%m-%d %H:%M:%S')
+            }
+            save_manifest(manifest)
+            results[name] = 'built'
+    return results
+
+
+def main():
+    """Build all portal maps, skipping unchanged ones"""
+    print("🏥 SSM Health Portal Map Build")
+    print("=" * 50)
+    start = time.time()
+    results = build_all_maps()
+    print(f"\n🎉 Done in {time.time() - start:.1f}s: " +
+          ", ".join(f"{name} {status}" for name, status in results.items()))
+
+
+if __name__ == "__main__":
+    main()
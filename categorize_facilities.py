@@ -7,6 +7,7 @@ based on their names and specialties.
 import pandas as pd
 import re
 from typing import Dict, List
+from facility_categorizer import FACILITY_TYPES
 
 def categorize_facility(name: str, specialty: str) -> str:
     """
@@ -19,105 +20,8 @@ def categorize_facility(name: str, specialty: str) -> str:
     Returns:
         str: Categorized facility type
     """
-    # Convert to lowercase for easier matching
-    name_lower = str(name).lower() if pd.notna(name) else ""
-    specialty_lower = str(specialty).lower() if pd.notna(specialty) else ""
-    
-    # Hospital
-    hospital_keywords = [
-        'hospital', 'medical center', 'health center', 'medical center'
-    ]
-    for keyword in hospital_keywords:
-        if keyword in name_lower:
-            return 'Hospital'
-    
-    # Emergency Department / Urgent Care
-    ed_keywords = [
-        'emergency', 'urgent care', 'ed ', 'er ', 'emergency room', 'urgent'
-    ]
-    for keyword in ed_keywords:
-        if keyword in name_lower or keyword in specialty_lower:
-            return 'Emergency Department (ED) / Urgent Care'
-    
-    # Pharmacy
-    pharmacy_keywords = [
-        'pharmacy', 'drug store', 'medication', 'prescription'
-    ]
-    for keyword in pharmacy_keywords:
-        if keyword in name_lower:
-            return 'Pharmacy'
-    
-    # Surgery Center / ASC
-    surgery_keywords = [
-        'surgery center', 'ambulatory surgery', 'asc', 'surgical', 'surgery'
-    ]
-    for keyword in surgery_keywords:
-        if keyword in name_lower or keyword in specialty_lower:
-            return 'Surgery Center (or Ambulatory Surgery Center – ASC)'
-    
-    # Imaging Center / Radiology
-    imaging_keywords = [
-        'imaging', 'radiology', 'x-ray', 'mri', 'ct scan', 'ultrasound', 'mammography',
-        'nuclear medicine', 'diagnostic imaging', 'medical imaging'
-    ]
-    for keyword in imaging_keywords:
-        if keyword in name_lower or keyword in specialty_lower:
-            return 'Imaging Center / Radiology'
-    
-    # Laboratory / Lab
-    lab_keywords = [
-        'laboratory', 'lab ', 'pathology', 'diagnostic lab', 'clinical lab'
-    ]
-    for keyword in lab_keywords:
-        if keyword in name_lower or keyword in specialty_lower:
-            return 'Laboratory / Lab'
-    
-    # Rehabilitation Center / Physical Therapy
-    rehab_keywords = [
-        'rehabilitation', 'rehab', 'physical therapy', 'pt ', 'occupational therapy',
-        'ot ', 'speech therapy', 'cardiac rehab', 'orthopedic rehab', 'therapy services'
-    ]
-    for keyword in rehab_keywords:
-        if keyword in name_lower or keyword in specialty_lower:
-            return 'Rehabilitation Center (or Physical Therapy)'
-    
-    # Clinic / Outpatient Clinic (default for most medical groups)
-    clinic_keywords = [
-        'clinic', 'medical group', 'outpatient', 'primary care', 'family medicine',
-        'internal medicine', 'pediatrics', 'ob/gyn', 'obstetrics', 'gynecology',
-        'orthopedics', 'cardiology', 'dermatology', 'neurology', 'psychiatry',
-        'psychology', 'behavioral health', 'mental health', 'podiatry', 'chiropractic',
-        'audiology', 'ent', 'otolaryngology', 'nephrology', 'gastroenterology',
-        'endocrinology', 'rheumatology', 'oncology', 'hematology', 'pulmonology',
-        'urology', 'ophthalmology', 'optometry', 'eye care', 'dental', 'orthodontics',
-        'hospice', 'palliative care', 'home health', 'at home'
-    ]
-    for keyword in clinic_keywords:
-        if keyword in name_lower or keyword in specialty_lower:
-            return 'Clinic (or Outpatient Clinic)'
-    
-    # Check for specific facility patterns
-    if any(pattern in name_lower for pattern in [
-        'dean medical group', 'monroe clinic', 'health plaza', 'slucare',
-        'physician group', 'medical associates', 'healthcare partners'
-    ]):
-        return 'Clinic (or Outpatient Clinic)'
-    
-    # Check for specialty-based categorization
-    specialty_clinic_keywords = [
-        'orthopedics', 'sports medicine', 'pain management', 'ear nose throat',
-        'audiology', 'behavioral health', 'podiatry', 'chiropractic', 'nephrology',
-        'academy', 'community'
-    ]
-    for keyword in specialty_clinic_keywords:
-        if keyword in name_lower or keyword in specialty_lower:
-            return 'Clinic (or Outpatient Clinic)'
-    
-    # Default to clinic if it's a medical facility but doesn't match other categories
-    if 'ssm health' in name_lower:
-        return 'Clinic (or Outpatient Clinic)'
-    
-    return 'Unknown'
+    # Priority-ordered keyword rules, compiled once (facility_categorizer.FACILITY_TYPES)
+    return FACILITY_TYPES(name=name, specialty=specialty)
 
 def analyze_facility_types(df: pd.DataFrame) -> None:
     """
@@ -169,10 +73,7 @@ def main():
     
     # Categorize facilities
     print("\nCategorizing facilities...")
-    df['facility_type'] = df.apply(
-        lambda row: categorize_facility(row['name'], row['specialty']), 
-        axis=1
-    )
+    df['facility_type'] = FACILITY_TYPES.categorize(name=df['name'], specialty=df['specialty'])
     
     # Analyze results
     analyze_facility_types(df)
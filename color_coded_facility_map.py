@@ -7,6 +7,7 @@ import pandas as pd
 import folium
 from folium import plugins
 import random
+from facility_categorizer import TYPE_CATEGORIES
 
 def create_color_coded_map():
     """Create a facility map with proper color coding and distinct icons"""
@@ -19,32 +20,7 @@ def create_color_coded_map():
     df['type'] = df['type'].fillna('Unknown')
     
     # Create facility categories
-    def categorize_facility(facility_type):
-        if pd.isna(facility_type):
-            return 'Unknown'
-        facility_type = str(facility_type).lower()
-        if any(word in facility_type for word in ['hospital', 'medical center']):
-            return 'Hospital'
-        elif any(word in facility_type for word in ['urgent', 'express', 'walk']):
-            return 'Urgent Care'
-        elif any(word in facility_type for word in ['pharmacy', 'prescription']):
-            return 'Pharmacy'
-        elif any(word in facility_type for word in ['imaging', 'radiology', 'mammography']):
-            return 'Imaging'
-        elif any(word in facility_type for word in ['laboratory', 'lab']):
-            return 'Laboratory'
-        elif any(word in facility_type for word in ['therapy', 'rehabilitation']):
-            return 'Therapy'
-        elif any(word in facility_type for word in ['cancer', 'oncology']):
-            return 'Cancer Care'
-        elif any(word in facility_type for word in ['eye', 'ophthalmology']):
-            return 'Eye Care'
-        elif any(word in facility_type for word in ['hospice']):
-            return 'Hospice'
-        else:
-            return 'Primary Care'
-    
-    df['facility_category'] = df['type'].apply(categorize_facility)
+    df['facility_category'] = TYPE_CATEGORIES.categorize(type=df['type'])
     
     # Predefined coordinates for major cities
     city_coords = {
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Columnar Intermediate Store for the Pipeline Tables
+Pipeline stages write each table as Parquet next to the CSV they have always
+written (the CSV stays the interchange copy that is committed and deployed).
+Readers get the typed, column-addressable Parquet copy whenever it is at least
+as new as the CSV, so floats are not reparsed from text at every stage and a
+reader that asks for five columns only decodes those five. Without pyarrow,
+or when the CSV was edited after the Parquet was written, reads fall back to
+the CSV, still projected with usecols. Either way the columns come back typed
+by table_schema.
+"""
+
+import os
+import pandas as pd
+import table_schema
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    # pyarrow is optional; without it every table is read from its CSV
+    pq = None
+
+# Facility columns the map builders and the portal API read
+FACILITY_MAP_COLUMNS = [
+    'name', 'street', 'city', 'state', 'zip', 'msa_name', 'type', 'facility_type',
+    'lat', 'lon', 'latitude', 'longitude',
+    'fte_count', 'discharges (inpatient volume, 2023)', 'patient_days (2023)', 'cmi (12/2023)'
+]
+
+# Scored ZIP columns the map builders and the portal API read
+ZIP_SCORE_COLUMNS = [
+    'zip', 'state', 'attractiveness_score', 'attractiveness_category',
+    'total_population', 'median_household_income', 'senior_population_pct'
+]
+
+
+def parquet_path_for(csv_path):
+    """ssm_health_locations.csv -> ssm_health_locations.parquet"""
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+
+def is_parquet_current(csv_path):
+    """True if the Parquet copy exists and is no older than the CSV (or the CSV is gone)"""
+    parquet_path = parquet_path_for(csv_path)
+    if pq is None or not os.path.exists(parquet_path):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+
+
+def table_source(csv_path):
+    """The file read_table(csv_path) reads"""
+    return parquet_path_for(csv_path) if is_parquet_current(csv_path) else csv_path
+
+
+def write_table(df, csv_path):
+    """
+    Write df to csv_path and, when pyarrow is installed, to its Parquet copy
+
+    The Parquet file is written second, so it is the newer of the two.
+    """
+    df.to_csv(csv_path, index=False)
+    if pq is not None:
+        parquet_path = parquet_path_for(csv_path)
+        df.to_parquet(parquet_path + '.tmp', index=False, engine='pyarrow')
+        os.replace(parquet_path + '.tmp', parquet_path)
+    return csv_path
+
+
+def read_table(csv_path, columns=None, float32=True, **csv_kwargs):
+    """
+    Read a pipeline table, from Parquet when current and from CSV otherwise,
+    with the table_schema dtypes applied
+
+    columns: only these columns (those missing from the table are ignored)
+    float32: False keeps scores and percentages at full precision; stages that
+             write the table back (write_table) pass it, so the committed CSVs
+             are not rounded to float32
+    csv_kwargs: passed to pd.read_csv on the CSV path; a dtype mapping
+                overrides the schema for its columns on either path
+    """
+    if is_parquet_current(csv_path):
+        parquet_path = parquet_path_for(csv_path)
+        if columns is not None:
+            available = set(pq.read_schema(parquet_path).names)
+            columns = [column for column in columns if column in available]
+        df = pd.read_parquet(parquet_path, columns=columns, engine='pyarrow')
+        return table_schema.apply_schema(df, csv_kwargs.get('dtype'), float32)
+
+    if columns is not None:
+        wanted = set(columns)
+        csv_kwargs['usecols'] = lambda column: column in wanted
+    return table_schema.read_csv(csv_path, float32=float32, **csv_kwargs)
+
+
+def main():
+    """Write Parquet copies of the pipeline CSVs that lack a current one"""
+    print("🏥 SSM Health Columnar Store")
+    print("=" * 50)
+    if pq is None:
+        print("⚠️ pyarrow not installed, nothing to do (tables are read from CSV)")
+        return
+    from pipeline import PIPELINE_STAGES
+    csv_files = sorted({path for stage in PIPELINE_STAGES.values()
+                        for path in stage['inputs'] + stage['outputs'] if path.endswith('.csv')})
+    for csv_path in csv_files:
+        if not os.path.exists(csv_path):
+            continue
+        if is_parquet_current(csv_path):
+            print(f"  ✅ {parquet_path_for(csv_path)} is up to date")
+            continue
+        # Rewriting the CSV too would change its hash and rerun the pipeline, so only write Parquet
+        df = pd.read_csv(csv_path)
+        df.to_parquet(parquet_path_for(csv_path), index=False, engine='pyarrow')
+        csv_mb = os.path.getsize(csv_path) / 1e6
+        parquet_mb = os.path.getsize(parquet_path_for(csv_path)) / 1e6
+        print(f"  ✅ {parquet_path_for(csv_path)}: {parquet_mb:.2f} MB (CSV {csv_mb:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
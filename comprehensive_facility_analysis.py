@@ -15,6 +15,8 @@ from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut
 import time
 import warnings
+from facility_categorizer import TYPE_CATEGORIES
+from aggregate_cube import load_cube
 warnings.filterwarnings('ignore')
 
 class ComprehensiveFacilityAnalyzer:
@@ -63,7 +65,7 @@ class ComprehensiveFacilityAnalyzer:
         self.df['specialty'] = self.df['specialty'].fillna('General')
         
         # Create facility categories
-        self.df['facility_category'] = self.df['type'].apply(self.categorize_facility)
+        self.df['facility_category'] = TYPE_CATEGORIES.categorize(type=self.df['type'])
         
         # Calculate facilities per 100k population
         self.df['facilities_per_100k'] = (1 / self.df['msa_population']) * 100000
@@ -84,34 +86,26 @@ class ComprehensiveFacilityAnalyzer:
         self.df['young_adult_population'] = self.df['pct_18_34'] > 25
         
         print(f"Processed {len(self.df)} facilities across {self.df['msa_code'].nunique()} MSAs")
+        
+        # Materialized aggregates the dashboards read (recomputed only for changed MSAs)
+        self.cube = load_cube(self.df, 'comprehensive')
+    
+    def msa_summary(self):
+        """Per-MSA values from the cube, with facilities_per_100k and market_status as in process_data"""
+        msa_summary = self.cube.msa_summary()
+        msa_summary['facilities_per_100k'] = (1 / msa_summary['msa_population']) * 100000
+        msa_summary['market_status'] = msa_summary['facilities_per_100k'].apply(self.categorize_market)
+        return msa_summary
+    
+    def market_status_counts(self):
+        """Facilities per market status of their MSA"""
+        msas = self.cube.msas
+        market_status = ((1 / msas['msa_population']) * 100000).apply(self.categorize_market)
+        return msas.groupby(market_status)['facility_count'].sum().sort_values(ascending=False)
     
     def categorize_facility(self, facility_type):
         """Categorize facility types"""
-        if pd.isna(facility_type):
-            return 'Unknown'
-        
-        facility_type = str(facility_type).lower()
-        
-        if any(word in facility_type for word in ['hospital', 'medical center']):
-            return 'Hospital'
-        elif any(word in facility_type for word in ['urgent', 'express', 'walk']):
-            return 'Urgent Care'
-        elif any(word in facility_type for word in ['pharmacy', 'prescription']):
-            return 'Pharmacy'
-        elif any(word in facility_type for word in ['imaging', 'radiology', 'mammography']):
-            return 'Imaging'
-        elif any(word in facility_type for word in ['laboratory', 'lab']):
-            return 'Laboratory'
-        elif any(word in facility_type for word in ['therapy', 'rehabilitation']):
-            return 'Therapy'
-        elif any(word in facility_type for word in ['cancer', 'oncology']):
-            return 'Cancer Care'
-        elif any(word in facility_type for word in ['eye', 'ophthalmology']):
-            return 'Eye Care'
-        elif any(word in facility_type for word in ['hospice']):
-            return 'Hospice'
-        else:
-            return 'Primary Care'
+        return TYPE_CATEGORIES(type=facility_type)
     
     def categorize_market(self, facilities_per_100k):
         """Categorize market status based on facility density"""
@@ -147,13 +141,8 @@ class ComprehensiveFacilityAnalyzer:
         )
         
         # Chart 1: Facilities per 100k by MSA
-        msa_summary = self.df.groupby(['msa_name', 'msa_code']).agg({
-            'facilities_per_100k': 'first',
-            'msa_median_household_income': 'first',
-            'median_age': 'first'
-        }).reset_index()
-        
-        msa_summary = msa_summary.sort_values('facilities_per_100k', ascending=True).tail(15)
+        msa_analysis = self.msa_summary()
+        msa_summary = msa_analysis.sort_values('facilities_per_100k', ascending=True).tail(15)
         
         fig.add_trace(
             go.Bar(
@@ -167,7 +156,7 @@ class ComprehensiveFacilityAnalyzer:
         )
         
         # Chart 2: Market Status Distribution
-        market_status_counts = self.df['market_status'].value_counts()
+        market_status_counts = self.market_status_counts()
         
         fig.add_trace(
             go.Pie(
@@ -179,27 +168,27 @@ class ComprehensiveFacilityAnalyzer:
             row=1, col=2
         )
         
-        # Chart 3: Income vs Facility Density
+        # Chart 3: Income vs Facility Density (one point per MSA)
         fig.add_trace(
             go.Scatter(
-                x=self.df['msa_median_household_income'],
-                y=self.df['facilities_per_100k'],
+                x=msa_analysis['msa_median_household_income'],
+                y=msa_analysis['facilities_per_100k'],
                 mode='markers',
                 marker=dict(
                     size=8,
-                    color=self.df['median_age'],
+                    color=msa_analysis['median_age'],
                     colorscale='Viridis',
                     showscale=True,
                     colorbar=dict(title="Median Age")
                 ),
-                text=self.df['msa_name'],
+                text=msa_analysis['msa_name'],
                 name='Income vs Density'
             ),
             row=2, col=1
         )
         
         # Chart 4: Age Demographics by MSA
-        age_demo_summary = self.df.groupby('msa_name').agg({
+        age_demo_summary = msa_analysis.groupby('msa_name').agg({
             'pct_under_18': 'first',
             'pct_18_34': 'first',
             'pct_35_54': 'first',
@@ -260,7 +249,8 @@ class ComprehensiveFacilityAnalyzer:
         )
         
         # Chart 5: Facility Distribution by Income Level
-        income_facility_counts = self.df.groupby('income_category')['facility_category'].value_counts().unstack(fill_value=0)
+        income_facility_counts = self.cube.rollup(['income_category', 'facility_category']).pivot(
+            index='income_category', columns='facility_category', values='facility_count').fillna(0).astype(int)
         
         for facility_type in income_facility_counts.columns:
             fig.add_trace(
@@ -274,7 +264,7 @@ class ComprehensiveFacilityAnalyzer:
             )
         
         # Chart 6: Age Mix Categories Distribution
-        age_mix_counts = self.df['age_mix_category'].value_counts()
+        age_mix_counts = self.cube.rollup(['age_mix_category']).set_index('age_mix_category')['facility_count'].sort_values(ascending=False)
         
         fig.add_trace(
             go.Pie(
@@ -332,7 +322,8 @@ class ComprehensiveFacilityAnalyzer:
         )
         
         # Chart 1: Income Distribution by MSA
-        income_summary = self.df.groupby(['msa_name', 'msa_code'])['msa_median_household_income'].first().sort_values(ascending=False).head(15)
+        msa_analysis = self.msa_summary().set_index(['msa_name', 'msa_code'])
+        income_summary = msa_analysis['msa_median_household_income'].sort_values(ascending=False).head(15)
         
         fig.add_trace(
             go.Bar(
@@ -346,7 +337,7 @@ class ComprehensiveFacilityAnalyzer:
         )
         
         # Chart 2: Age Distribution by MSA
-        age_summary = self.df.groupby(['msa_name', 'msa_code'])['median_age'].first().sort_values(ascending=False).head(15)
+        age_summary = msa_analysis['median_age'].sort_values(ascending=False).head(15)
         
         fig.add_trace(
             go.Bar(
@@ -360,11 +351,7 @@ class ComprehensiveFacilityAnalyzer:
         )
         
         # Chart 3: Income vs Age Correlation
-        msa_analysis = self.df.groupby(['msa_name', 'msa_code']).agg({
-            'msa_median_household_income': 'first',
-            'median_age': 'first',
-            'facilities_per_100k': 'first'
-        }).reset_index()
+        msa_analysis = msa_analysis.reset_index()
         
         fig.add_trace(
             go.Scatter(
@@ -385,7 +372,8 @@ class ComprehensiveFacilityAnalyzer:
         )
         
         # Chart 4: Facility Types by Income Level
-        income_facility_summary = self.df.groupby(['income_category', 'facility_category']).size().unstack(fill_value=0)
+        income_facility_summary = self.cube.rollup(['income_category', 'facility_category']).pivot(
+            index='income_category', columns='facility_category', values='facility_count').fillna(0).astype(int)
         
         for facility_type in income_facility_summary.columns:
             fig.add_trace(
@@ -429,15 +417,10 @@ class ComprehensiveFacilityAnalyzer:
         print("Creating strategic recommendations...")
         
         # Analyze market opportunities and risks
-        msa_analysis = self.df.groupby(['msa_name', 'msa_code']).agg({
-            'msa_median_household_income': 'first',
-            'median_age': 'first',
-            'facilities_per_100k': 'first',
-            'pct_65_plus': 'first',
-            'pct_under_18': 'first',
-            'pct_18_34': 'first',
-            'market_status': 'first'
-        }).reset_index()
+        msa_analysis = self.msa_summary()[[
+            'msa_name', 'msa_code', 'msa_median_household_income', 'median_age', 'facilities_per_100k',
+            'pct_65_plus', 'pct_under_18', 'pct_18_34', 'market_status'
+        ]]
         
         # Identify opportunities
         high_income_underserved = msa_analysis[
@@ -15,6 +15,8 @@ from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut
 import time
 import warnings
+from facility_categorizer import TYPE_CATEGORIES
+from aggregate_cube import load_cube
 warnings.filterwarnings('ignore')
 
 def clean_msa_name(msa_name):
@@ -63,7 +65,7 @@ class CorrectedComprehensiveFacilityAnalyzer:
         self.df['msa_name_clean'] = self.df['msa_name'].apply(clean_msa_name)
         
         # Create facility categories
-        self.df['facility_category'] = self.df['type'].apply(self.categorize_facility)
+        self.df['facility_category'] = TYPE_CATEGORIES.categorize(type=self.df['type'])
         
         # Calculate facilities per 100k population (original method)
         self.df['facilities_per_100k'] = (1 / self.df['msa_population']) * 100000
@@ -97,34 +99,13 @@ class CorrectedComprehensiveFacilityAnalyzer:
         self.df['age_mix_category'] = self.df.apply(create_age_mix_category, axis=1)
         
         print(f"Processed {len(self.df)} facilities across {self.df['msa_name_clean'].nunique()} MSAs")
+        
+        # Materialized aggregates the dashboard reads, per clean MSA name (recomputed only for changed MSAs)
+        self.cube = load_cube(self.df.assign(msa_name=self.df['msa_name_clean']), 'corrected')
     
     def categorize_facility(self, facility_type):
         """Categorize facility types"""
-        if pd.isna(facility_type):
-            return 'Unknown'
-        
-        facility_type = str(facility_type).lower()
-        
-        if any(word in facility_type for word in ['hospital', 'medical center']):
-            return 'Hospital'
-        elif any(word in facility_type for word in ['urgent', 'express', 'walk']):
-            return 'Urgent Care'
-        elif any(word in facility_type for word in ['pharmacy', 'prescription']):
-            return 'Pharmacy'
-        elif any(word in facility_type for word in ['imaging', 'radiology', 'mammography']):
-            return 'Imaging'
-        elif any(word in facility_type for word in ['laboratory', 'lab']):
-            return 'Laboratory'
-        elif any(word in facility_type for word in ['therapy', 'rehabilitation']):
-            return 'Therapy'
-        elif any(word in facility_type for word in ['cancer', 'oncology']):
-            return 'Cancer Care'
-        elif any(word in facility_type for word in ['eye', 'ophthalmology']):
-            return 'Eye Care'
-        elif any(word in facility_type for word in ['hospice']):
-            return 'Hospice'
-        else:
-            return 'Primary Care'
+        return TYPE_CATEGORIES(type=facility_type)
     
     def categorize_market(self, facilities_per_100k):
         """Categorize market status based on facility density"""
@@ -159,13 +140,10 @@ class CorrectedComprehensiveFacilityAnalyzer:
         )
         
         # Chart 1: Facilities per 100k by MSA
-        msa_summary = self.df.groupby(['msa_name_clean', 'msa_code']).agg({
-            'facilities_per_100k': 'first',
-            'msa_median_household_income': 'first',
-            'median_age': 'first'
-        }).reset_index()
+        msa_analysis = self.cube.msa_summary().rename(columns={'msa_name': 'msa_name_clean'})
+        msa_analysis['facilities_per_100k'] = (1 / msa_analysis['msa_population']) * 100000
         
-        msa_summary = msa_summary.sort_values('facilities_per_100k', ascending=True).tail(15)
+        msa_summary = msa_analysis.sort_values('facilities_per_100k', ascending=True).tail(15)
         
         fig.add_trace(
             go.Bar(
@@ -179,8 +157,10 @@ class CorrectedComprehensiveFacilityAnalyzer:
             row=1, col=1
         )
         
-        # Chart 2: Market Status Distribution
-        market_status_counts = self.df['market_status'].value_counts()
+        # Chart 2: Market Status Distribution (facilities per market status of their MSA)
+        msas = self.cube.msas
+        market_status = ((1 / msas['msa_population']) * 100000).apply(self.categorize_market)
+        market_status_counts = msas.groupby(market_status)['facility_count'].sum().sort_values(ascending=False)
         
         fig.add_trace(
             go.Pie(
@@ -193,20 +173,20 @@ class CorrectedComprehensiveFacilityAnalyzer:
             row=1, col=2
         )
         
-        # Chart 3: Income vs Facility Density
+        # Chart 3: Income vs Facility Density (one point per MSA)
         fig.add_trace(
             go.Scatter(
-                x=self.df['msa_median_household_income'],
-                y=self.df['facilities_per_100k'],
+                x=msa_analysis['msa_median_household_income'],
+                y=msa_analysis['facilities_per_100k'],
                 mode='markers',
                 marker=dict(
                     size=10,
-                    color=self.df['median_age'],
+                    color=msa_analysis['median_age'],
                     colorscale='Viridis',
                     showscale=True,
                     colorbar=dict(title="Median Age", x=0.45)
                 ),
-                text=self.df['msa_name_clean'],
+                text=msa_analysis['msa_name_clean'],
                 hovertemplate='<b>%{text}</b><br>Income: $%{x:,.0f}<br>Facilities per 100k: %{y:.2f}<br>Median Age: %{marker.color:.0f}<extra></extra>',
                 name='Income vs Density'
             ),
@@ -214,7 +194,7 @@ class CorrectedComprehensiveFacilityAnalyzer:
         )
         
         # Chart 4: Age Mix Categories Distribution
-        age_mix_counts = self.df['age_mix_category'].value_counts()
+        age_mix_counts = self.cube.rollup(['age_mix_category']).set_index('age_mix_category')['facility_count'].sort_values(ascending=False)
         
         fig.add_trace(
             go.Pie(
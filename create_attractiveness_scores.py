@@ -7,6 +7,8 @@ Based on population density, growth, age distribution, and income levels
 import pandas as pd
 import numpy as np
 import warnings
+from attractiveness_bins import categorize_scores
+from columnar_store import read_table, write_table
 warnings.filterwarnings('ignore')
 
 class HealthcareAttractivenessScorer:
@@ -142,33 +144,13 @@ class HealthcareAttractivenessScorer:
         return composite_score
     
     def categorize_attractiveness(self, scores):
-        """Categorize attractiveness scores into levels"""
-        categories = []
-        colors = []
-        
-        for score in scores:
-            if score >= 80:
-                categories.append('Very High')
-                colors.append('#1f77b4')  # Dark blue
-            elif score >= 60:
-                categories.append('High')
-                colors.append('#ff7f0e')  # Orange
-            elif score >= 40:
-                categories.append('Medium')
-                colors.append('#2ca02c')  # Green
-            elif score >= 20:
-                categories.append('Low')
-                colors.append('#d62728')  # Red
-            else:
-                categories.append('Very Low')
-                colors.append('#9467bd')  # Purple
-        
-        return categories, colors
+        """Categorize attractiveness scores into levels (vectorized via np.digitize)"""
+        return categorize_scores(scores)
     
     def add_attractiveness_scores(self, input_file='ssm_health_locations_with_zip_demographics.csv'):
         """Add attractiveness scores to the facility data"""
         print("📊 Loading facility data...")
-        df = pd.read_csv(input_file)
+        df = read_table(input_file, float32=False)
         
         # Calculate attractiveness scores
         df['attractiveness_score'] = self.calculate_composite_score(df)
@@ -195,7 +177,7 @@ class HealthcareAttractivenessScorer:
         
         # Save the enhanced data
         output_file = 'ssm_health_locations_with_attractiveness_scores.csv'
-        df.to_csv(output_file, index=False)
+        write_table(df, output_file)
         
         print(f"✅ Enhanced data saved to {output_file}")
         
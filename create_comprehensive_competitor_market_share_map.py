@@ -7,77 +7,44 @@ Popups show the market share breakdown for all systems in that ZIP.
 Includes HHI (Herfindahl-Hirschman Index) scores for market concentration analysis.
 """
 
-import pandas as pd
 import folium
-import json
-from collections import defaultdict
-
-def main():
+from market_share import MARKET_SHARE_FILES, MarketShares, load_market_records
+from simplify_zip_polygons import load_simplified_feature_collection
+from layer_assets import EXTERNAL_LAYERS, ExternalZCTALayer, write_layer_asset, zcta_geometry_asset
+
+def main(external_layers=EXTERNAL_LAYERS, output_file='ssm_health_comprehensive_competitor_market_share_map.html'):
+    """
+    Build the competitor market share map
+
+    external_layers: write ZIP polygons and popups to cacheable layer files
+    instead of inlining them (see layer_assets)
+    output_file: where to save the map HTML
+    """
     # Load all market share data
     print("📊 Loading market share data from all regions...")
 
-    # STL/SoIL data
-    stl_soil_df = pd.read_excel('STL_SoIL_2024IP_MktShare.xlsx')
-    stl_soil_df['Region'] = 'STL/SoIL'
-
-    # Wisconsin data
-    wi_df = pd.read_excel('WI_2024IP_MktShare.xlsx')
-    wi_df['Region'] = 'Wisconsin'
-
-    # Oklahoma data
-    ok_df = pd.read_excel('OK_2024IP_MktShare.xlsx')
-    ok_df['Region'] = 'Oklahoma'
-
-    # Combine all datasets
-    all_market_df = pd.concat([stl_soil_df, wi_df, ok_df], ignore_index=True)
+    all_market_df = load_market_records()
+    region_counts = all_market_df['Region'].value_counts()
 
     print(f"📈 Total records loaded: {len(all_market_df)}")
-    print(f"   - STL/SoIL: {len(stl_soil_df)}")
-    print(f"   - Wisconsin: {len(wi_df)}")
-    print(f"   - Oklahoma: {len(ok_df)}")
-
-    # Only keep rows with valid ZIP codes and hospital systems
-    all_market_df = all_market_df.dropna(subset=['Zip Code', 'Hospital System'])
-    all_market_df['Zip Code'] = all_market_df['Zip Code'].astype(float).astype(int).astype(str).str.zfill(5)
-
-    print(f"📊 Valid records after cleaning: {len(all_market_df)}")
+    for region in MARKET_SHARE_FILES:
+        print(f"   - {region}: {region_counts.get(region, 0)}")
 
-    # Aggregate: count interactions per ZIP per system
-    zip_sys_counts = all_market_df.groupby(['Zip Code', 'Hospital System']).size().reset_index(name='count')
+    # Shares, HHI and dominant system per ZIP, from the ZIP x system discharge counts
+    # (rows without a ZIP code or hospital system are left out)
+    market = MarketShares.from_records(all_market_df)
 
-    # For each ZIP, get total and per-system counts
-    zip_totals = zip_sys_counts.groupby('Zip Code')['count'].sum().to_dict()
+    print(f"📊 Valid records after cleaning: {int(market.counts.sum())}")
 
-    # For each ZIP, build a dict of system: market share and calculate HHI
-    zip_market_share = defaultdict(dict)
-    zip_hhi = {}
-
-    for _, row in zip_sys_counts.iterrows():
-        zip_code = row['Zip Code']
-        system = row['Hospital System']
-        count = row['count']
-        total = zip_totals[zip_code]
-        share = count / total if total > 0 else 0
-        zip_market_share[zip_code][system] = share
-
-    # Calculate HHI for each ZIP (sum of squared market shares)
-    for zip_code, systems in zip_market_share.items():
-        hhi = sum(share ** 2 for share in systems.values()) * 10000  # Scale to 0-10,000 range
-        zip_hhi[zip_code] = hhi
-
-    # For each ZIP, find the dominant system
-    zip_dominant = {z: max(systems, key=systems.get) for z, systems in zip_market_share.items()}
-
-    dominant_systems = set(zip_dominant.values())
+    dominant_systems = set(market.dominant)
     print(f"🏥 Dominant systems across all regions: {len(dominant_systems)}")
     print("   Systems:", sorted(dominant_systems))
 
     # HHI statistics
-    hhi_values = list(zip_hhi.values())
     print(f"📊 HHI Statistics:")
-    print(f"   - Average HHI: {sum(hhi_values)/len(hhi_values):.0f}")
-    print(f"   - Min HHI: {min(hhi_values):.0f}")
-    print(f"   - Max HHI: {max(hhi_values):.0f}")
+    print(f"   - Average HHI: {market.hhi.mean():.0f}")
+    print(f"   - Min HHI: {market.hhi.min():.0f}")
+    print(f"   - Max HHI: {market.hhi.max():.0f}")
 
     # Assign a color to each hospital system
     system_list = sorted(dominant_systems)
@@ -97,10 +64,8 @@ def main():
 
     # Load ZIP code polygons
     print("🗺️ Loading geographic data...")
-    with open('zipcodes_mn_wi_il_scored.geojson', 'r') as f:
-        mn_wi_il_geojson = json.load(f)
-    with open('zipcodes_mo_ok.geojson', 'r') as f:
-        mo_ok_geojson = json.load(f)
+    mn_wi_il_geojson = load_simplified_feature_collection('zipcodes_mn_wi_il_scored.geojson', 'medium')
+    mo_ok_geojson = load_simplified_feature_collection('zipcodes_mo_ok.geojson', 'medium')
 
     # Combine features
     all_features = mn_wi_il_geojson['features'] + mo_ok_geojson['features']
@@ -116,8 +81,8 @@ def main():
         if zc:
             geojson_zips.add(zc)
 
-    overlap = set(zip_dominant.keys()) & geojson_zips
-    print(f"📍 ZIP codes with market share data: {len(zip_dominant)}")
+    overlap = set(market.zip_position) & geojson_zips
+    print(f"📍 ZIP codes with market share data: {len(market.zips)}")
     print(f"🗺️ ZIP codes in geographic data: {len(geojson_zips)}")
     print(f"✅ Overlapping ZIP codes: {len(overlap)}")
 
@@ -133,14 +98,16 @@ def main():
     # Add ZIP polygons colored by dominant system
     colored_zips = 0
     ssm_dominant_zips = 0
+    zip_properties = {}
     for feature in all_features:
         zip_code = feature['properties'].get('ZCTA5CE10') or feature['properties'].get('ZCTA5CE20')
-        if not zip_code or zip_code not in zip_dominant:
+        position = market.zip_position.get(zip_code)
+        if not zip_code or position is None:
             continue
         
-        dominant_system = zip_dominant[zip_code]
+        dominant_system = market.dominant[position]
         color = system_colors.get(dominant_system, '#cccccc')
-        hhi = zip_hhi[zip_code]
+        hhi = market.hhi[position]
         hhi_interpretation = get_hhi_interpretation(hhi)
         
         # Check if SSM is the dominant system
@@ -155,7 +122,7 @@ def main():
         <b>HHI Score:</b> {hhi:.0f} ({hhi_interpretation})<br>
         <b>Market Share Breakdown:</b><ul>
         '''
-        for sys, share in sorted(zip_market_share[zip_code].items(), key=lambda x: -x[1]):
+        for sys, share in market.breakdown(position):
             popup_html += f'<li>{sys}: {share:.1%}</li>'
         popup_html += '</ul>'
         
@@ -175,15 +142,27 @@ def main():
                 })
             return style
         
-        folium.GeoJson(
-            feature,
-            style_function=style_fn,
-            highlight_function=lambda f: {'weight': 2, 'color': 'blue'},
-            tooltip=f"ZIP: {zip_code} | {dominant_system} | HHI: {hhi:.0f}",
-            popup=folium.Popup(popup_html, max_width=400)
-        ).add_to(m)
+        tooltip = f"ZIP: {zip_code} | {dominant_system} | HHI: {hhi:.0f}"
+        if external_layers:
+            zip_properties[zip_code] = {'style': style_fn(feature), 'popup': popup_html, 'tooltip': tooltip}
+        else:
+            folium.GeoJson(
+                feature,
+                style_function=style_fn,
+                highlight_function=lambda f: {'weight': 2, 'color': 'blue'},
+                tooltip=tooltip,
+                popup=folium.Popup(popup_html, max_width=400)
+            ).add_to(m)
         colored_zips += 1
 
+    if external_layers:
+        # Geometry assets are shared with the other portal maps
+        properties_url = write_layer_asset('market_share_zips', zip_properties)
+        for geojson_file, geojson in [('zipcodes_mn_wi_il_scored', mn_wi_il_geojson), ('zipcodes_mo_ok', mo_ok_geojson)]:
+            geometry_url = zcta_geometry_asset(geojson, f'{geojson_file}.medium')
+            ExternalZCTALayer(geometry_url, properties_url, highlight={'weight': 2, 'color': 'blue'},
+                              control=False).add_to(m)
+
     print(f"🎨 Colored {colored_zips} ZIP codes on the map")
     print(f"🏥 SSM Health is market leader in {ssm_dominant_zips} ZIP codes")
 
@@ -219,10 +198,9 @@ def main():
     m.get_root().html.add_child(folium.Element(title_html))
 
     # Save map
-    output_file = 'ssm_health_comprehensive_competitor_market_share_map.html'
     m.save(output_file)
     print(f"✅ Comprehensive competitor market share map saved to: {output_file}")
-    print(f"📊 Map covers {len(zip_dominant)} ZIP codes across all regions")
+    print(f"📊 Map covers {len(market.zips)} ZIP codes across all regions")
     print(f"🏥 Shows market share for {len(dominant_systems)} hospital systems")
     print(f"📈 HHI analysis included for market concentration insights")
 
@@ -10,14 +10,52 @@ import json
 import numpy as np
 from folium import plugins
 from folium.plugins import Geocoder
-import re
+import os
+from attractiveness_bins import map_fill_colors
+from input_cache import read_csv, read_table
+from columnar_store import FACILITY_MAP_COLUMNS, ZIP_SCORE_COLUMNS
+from simplify_zip_polygons import load_simplified_feature_collection, add_zoom_switched_layer
+from vector_tiles import VectorTileLayer, TILESETS
+from layer_assets import EXTERNAL_LAYERS, ExternalZCTALayer, write_layer_asset, zcta_geometry_asset
+from facility_layer import FACILITY_COLORS, FacilityClusterLayer, build_facility_records, facility_coordinates, facility_types
+from name_matcher import NameMatcher
+
+# Polygon precision levels embedded in inline maps, switched by zoom (see
+# SIMPLIFICATION_LEVELS); both are embedded so the HTML works on its own
+ZIP_POLYGON_LEVELS = ['low', 'medium']
+
+# Precision level of the shared ZCTA geometry asset in external_layers mode
+EXTERNAL_POLYGON_LEVEL = 'medium'
+
+# ZIP GeoJSON, ZCTA property, state FIPS codes to keep (WI: 55, IL: 17; MN is
+# left out) and layer name
+ZIP_POLYGON_SOURCES = [
+    ('zipcodes_mn_wi_il_scored.geojson', 'ZCTA5CE10', ('55', '17'), 'WI/IL ZIP Codes'),
+    ('zipcodes_mo_ok.geojson', 'ZCTA5CE20', None, 'MO/OK ZIP Codes')
+]
+
+# Legend label and FACILITY_COLORS key of each non-hospital facility type
+LEGEND_FACILITY_TYPES = [
+    ('Emergency Department', 'Emergency Department'),
+    ('Urgent Care', 'Urgent Care'),
+    ('Clinic', 'Clinic'),
+    ('Imaging Center / Radiology', 'Imaging Center / Radiology'),
+    ('Rehabilitation Center', 'Rehabilitation Center (or Physical Therapy)'),
+    ('Surgery Center', 'Surgery Center (or Ambulatory Surgery Center – ASC)'),
+    ('Pharmacy', 'Pharmacy'),
+    ('Laboratory / Lab', 'Laboratory / Lab'),
+    ('Other', 'Other')
+]
+
+# Served by deploy_secure_map.py
+ZCTA_TILE_URL = '/tiles/zcta/{z}/{x}/{y}.pbf'
 
 def load_and_merge_zip_data():
     """Load and merge all ZIP demographics data, excluding MN"""
     print("📊 Loading ZIP demographics data...")
     
     # Load MN/WI/IL data
-    mn_wi_il_data = pd.read_csv('all_mn_wi_il_zip_demographics_scored.csv')
+    mn_wi_il_data = read_table('all_mn_wi_il_zip_demographics_scored.csv', columns=ZIP_SCORE_COLUMNS)
     print(f"  Loaded {len(mn_wi_il_data)} MN/WI/IL ZIP codes (before filtering)")
     
     # Remove MN ZIPs (state == 'MN')
@@ -28,7 +66,7 @@ def load_and_merge_zip_data():
     print(f"  After removing MN: {len(mn_wi_il_data)} WI/IL ZIP codes")
     
     # Load OK/MO data
-    ok_mo_data = pd.read_csv('all_ok_mo_zip_demographics_scored.csv')
+    ok_mo_data = read_table('all_ok_mo_zip_demographics_scored.csv', columns=ZIP_SCORE_COLUMNS)
     print(f"  Loaded {len(ok_mo_data)} OK/MO ZIP codes")
     
     # Combine the datasets
@@ -52,7 +90,7 @@ def load_ssm_facilities():
     facilities = None
     for file in facility_files:
         try:
-            facilities = pd.read_csv(file)
+            facilities = read_table(file, columns=FACILITY_MAP_COLUMNS)
             print(f"  Loaded {len(facilities)} facilities from {file}")
             break
         except FileNotFoundError:
@@ -64,7 +102,7 @@ def load_ssm_facilities():
     
     # Load the hospitals masterlist to identify which facilities are hospitals
     try:
-        hospitals_masterlist = pd.read_csv('hospitals_masterlist.csv', skiprows=2)
+        hospitals_masterlist = read_csv('hospitals_masterlist.csv', skiprows=2)
         hospitals_masterlist = hospitals_masterlist[hospitals_masterlist['name'].notna()]
         hospitals_masterlist = hospitals_masterlist[hospitals_masterlist['name'].str.strip() != '']
         
@@ -72,29 +110,27 @@ def load_ssm_facilities():
         hospital_names = set(hospitals_masterlist['name'].str.strip().str.lower())
         print(f"  Loaded {len(hospital_names)} hospital names from masterlist")
         
-        # Only change facility type to "Hospital" if name matches masterlist
-        def classify_hospitals(row):
-            facility_name = str(row.get('name', '')).strip().lower()
-            original_type = str(row.get('facility_type', '')).strip()
-            
-            # Check if this facility name exactly matches a hospital name from masterlist
-            if facility_name in hospital_names:
-                return 'Hospital'
-            # Handle Emergency Department vs Urgent Care classification
-            elif original_type.lower() == 'emergency department (ed) / urgent care':
-                if 'urgent care' in facility_name:
-                    return 'Urgent Care'
-                else:
-                    return 'Emergency Department'
-            # If it was originally "Hospital" but not on masterlist, fallback to Clinic
-            elif original_type.lower() == 'hospital':
-                return 'Clinic'
-            else:
-                # Keep the original facility type for everything else
-                return original_type
+        # Only change facility type to "Hospital" if name matches masterlist.
+        # Evaluated column-wise; np.select takes the first matching condition.
+        facility_names = facilities['name'].astype(str).str.strip().str.lower()
+        original_types = facilities['facility_type'].astype(str).str.strip()
+        original_types_lower = original_types.str.lower()
+        is_ed_urgent = original_types_lower == 'emergency department (ed) / urgent care'
         
-        # Apply classification
-        facilities['facility_type'] = facilities.apply(classify_hospitals, axis=1)
+        facilities['facility_type'] = np.select(
+            [
+                # Exact match with a hospital name from masterlist
+                facility_names.isin(hospital_names),
+                # Handle Emergency Department vs Urgent Care classification
+                is_ed_urgent & facility_names.str.contains('urgent care', regex=False),
+                is_ed_urgent,
+                # If it was originally "Hospital" but not on masterlist, fallback to Clinic
+                original_types_lower == 'hospital',
+            ],
+            ['Hospital', 'Urgent Care', 'Emergency Department', 'Clinic'],
+            # Keep the original facility type for everything else
+            default=original_types,
+        )
         
         # Check how many hospitals we found
         hospital_facilities = facilities[facilities['facility_type'] == 'Hospital']
@@ -117,8 +153,106 @@ def load_ssm_facilities():
         print("  ⚠️ hospitals_masterlist.csv not found, using original facility types")
         return facilities
 
-def create_comprehensive_map(zip_data, facilities):
-    """Create comprehensive map with all ZIP codes and facilities"""
+def prepare_zip_features(geojson, zip_field, zip_score_lookup, statefps=None):
+    """Filter ZIP features by state FIPS and add popup fields and fill color"""
+    if statefps is not None:
+        geojson['features'] = [
+            feature for feature in geojson['features']
+            if feature['properties'].get('STATEFP10') in statefps
+        ]
+    for feature in geojson['features']:
+        zip_code = feature['properties'].get(zip_field, '')
+        data = zip_score_lookup.get(zip_code, {})
+        feature['properties']['attractiveness_score'] = data.get('score', 'N/A')
+        feature['properties']['attractiveness_category'] = data.get('category', 'N/A')
+        feature['properties']['total_population'] = data.get('population', 'N/A')
+        feature['properties']['median_household_income'] = data.get('income', 'N/A')
+        feature['properties']['senior_population_pct'] = data.get('senior_pct', 'N/A')
+        feature['properties']['fill_color'] = data.get('color', '#gray')
+    return geojson
+
+def zip_feature_display(feature, zip_field):
+    """Style, popup and tooltip of one ZIP polygon, as stored in an external layer asset"""
+    properties = feature['properties']
+    rows = [
+        ('ZIP Code', properties.get(zip_field)),
+        ('Attractiveness Score', properties['attractiveness_score']),
+        ('Category', properties['attractiveness_category']),
+        ('Population', properties['total_population']),
+        ('Median Income', properties['median_household_income']),
+        ('Senior Population %', properties['senior_population_pct'])
+    ]
+    popup = '<table>' + ''.join(f'<tr><th style="text-align:left">{label}</th><td>{value}</td></tr>' for label, value in rows) + '</table>'
+    return {
+        'style': {'fillColor': properties['fill_color'], 'color': 'black', 'weight': 1, 'fillOpacity': 0.6},
+        'popup': popup,
+        'tooltip': f"ZIP Code: {properties.get(zip_field)}"
+    }
+
+def create_zip_polygon_layer(geojson, zip_field):
+    """Create the attractiveness-colored GeoJson layer for one precision level"""
+    return folium.GeoJson(
+        geojson,
+        style_function=lambda feature: {
+            'fillColor': feature['properties']['fill_color'],
+            'color': 'black',
+            'weight': 1,
+            'fillOpacity': 0.6
+        },
+        tooltip=folium.GeoJsonTooltip(
+            fields=[zip_field],
+            aliases=['ZIP Code'],
+            localize=True,
+            sticky=False,
+            labels=True,
+            style="""
+                background-color: #YELLOW;
+                border: 2px solid black;
+                border-radius: 3px;
+                box-shadow: 3px;
+            """
+        ),
+        popup=folium.GeoJsonPopup(
+            fields=[zip_field, 'attractiveness_score', 'attractiveness_category', 'total_population', 'median_household_income', 'senior_population_pct'],
+            aliases=['ZIP Code', 'Attractiveness Score', 'Category', 'Population', 'Median Income', 'Senior Population %'],
+            localize=True,
+            labels=True,
+            style="background-color: white; border-radius: 5px; padding: 10px;"
+        )
+    )
+
+def create_external_zip_layer(geojson_file, zip_field, statefps, level, zip_score_lookup, **layer_options):
+    """
+    ExternalZCTALayer for one precision level of a ZIP GeoJSON: the shared
+    geometry asset plus this map's styling/popup asset. Returns the layer and
+    the geometry asset URL.
+    """
+    geojson = load_simplified_feature_collection(geojson_file, level)
+    geometry_url = zcta_geometry_asset(geojson, f"{geojson_file.rsplit('.', 1)[0]}.{level}")
+    prepare_zip_features(geojson, zip_field, zip_score_lookup, statefps=statefps)
+    zip_properties = {
+        feature['properties'][zip_field]: zip_feature_display(feature, zip_field)
+        for feature in geojson['features']
+    }
+    properties_url = write_layer_asset(f"attractiveness_{geojson_file.rsplit('.', 1)[0]}", zip_properties)
+    return ExternalZCTALayer(geometry_url, properties_url, **layer_options), geometry_url
+
+def facility_legend_html():
+    """Legend rows for the non-hospital facility types, drawn as the circle markers FacilityClusterLayer uses"""
+    return '\n'.join(
+        f'''    <p><span style="display: inline-block; width: 12px; height: 12px; border-radius: 50%; '''
+        f'''background-color: {FACILITY_COLORS[facility_type]}; border: 1px solid white; '''
+        f'''box-shadow: 0 0 1px #333; margin-right: 6px;"></span> {label}</p>'''
+        for label, facility_type in LEGEND_FACILITY_TYPES
+    )
+
+def create_comprehensive_map(zip_data, facilities, vector_tiles=False, external_layers=False):
+    """
+    Create comprehensive map with all ZIP codes and facilities
+
+    vector_tiles: reference the ZCTA tile set instead of inlining polygons
+    external_layers: write polygons and markers to cacheable layer files (see layer_assets)
+    """
     print("🗺️ Creating comprehensive map...")
     
     # Calculate center point for the map (middle of all states)
@@ -135,179 +269,67 @@ def create_comprehensive_map(zip_data, facilities):
     # Add ZIP code polygons with attractiveness scores
     print("  Adding ZIP code polygons...")
     
-    # Color mapping for attractiveness scores
-    def get_color(score):
-        if score >= 80:
-            return '#00e600'  # Bright Green - Very Attractive
-        elif score >= 60:
-            return '#99ff99'  # Light Green - High
-        elif score >= 40:
-            return '#ffff66'  # Yellow - Medium
-        elif score >= 20:
-            return '#ff9933'  # Orange - Low
-        else:
-            return '#ff3333'  # Bright Red - Very Unattractive
-    
-    # Create a lookup dictionary for ZIP codes to their attractiveness scores
-    zip_score_lookup = {}
-    for _, row in zip_data.iterrows():
-        zip_code = str(row['zip'])
-        zip_score_lookup[zip_code] = {
-            'score': row['attractiveness_score'],
-            'category': row['attractiveness_category'],
-            'population': row['total_population'],
-            'income': row['median_household_income'],
-            'senior_pct': row['senior_population_pct']
-        }
-    
-    # Load existing GeoJSON for WI/IL only (filter out MN polygons)
-    try:
-        with open('zipcodes_mn_wi_il_scored.geojson', 'r') as f:
-            mn_wi_il_geojson = json.load(f)
-        # Filter features to only WI and IL
-        wi_il_features = []
-        for feature in mn_wi_il_geojson['features']:
-            statefp = feature['properties'].get('STATEFP10')
-            # WI: 55, IL: 17 (FIPS codes)
-            if statefp in ('55', '17'):
-                wi_il_features.append(feature)
-        mn_wi_il_geojson['features'] = wi_il_features
-        # Add extra popup fields to WI/IL features
-        for feature in mn_wi_il_geojson['features']:
-            zip_code = feature['properties'].get('ZCTA5CE10', '')
-            data = zip_score_lookup.get(zip_code, {})
-            feature['properties']['attractiveness_score'] = data.get('score', 'N/A')
-            feature['properties']['attractiveness_category'] = data.get('category', 'N/A')
-            feature['properties']['total_population'] = data.get('population', 'N/A')
-            feature['properties']['median_household_income'] = data.get('income', 'N/A')
-            feature['properties']['senior_population_pct'] = data.get('senior_pct', 'N/A')
-
-        folium.GeoJson(
-            mn_wi_il_geojson,
-            name='WI/IL ZIP Codes',
-            style_function=lambda feature: {
-                'fillColor': get_color_from_csv(feature['properties'].get('ZCTA5CE10'), zip_score_lookup),
-                'color': 'black',
-                'weight': 1,
-                'fillOpacity': 0.6
-            },
-            tooltip=folium.GeoJsonTooltip(
-                fields=['ZCTA5CE10'],
-                aliases=['ZIP Code'],
-                localize=True,
-                sticky=False,
-                labels=True,
-                style="""
-                    background-color: #YELLOW;
-                    border: 2px solid black;
-                    border-radius: 3px;
-                    box-shadow: 3px;
-                """
-            ),
-            popup=folium.GeoJsonPopup(
-                fields=['ZCTA5CE10', 'attractiveness_score', 'attractiveness_category', 'total_population', 'median_household_income', 'senior_population_pct'],
-                aliases=['ZIP Code', 'Attractiveness Score', 'Category', 'Population', 'Median Income', 'Senior Population %'],
-                localize=True,
-                labels=True,
-                style="background-color: white; border-radius: 5px; padding: 10px;"
-            )
+    # Create a lookup dictionary for ZIP codes to their attractiveness scores.
+    # Fill colors are binned once for the whole table so the style function
+    # only reads a precomputed property per feature.
+    zip_score_lookup = build_zip_score_lookup(zip_data)
+    
+    if vector_tiles:
+        # Polygons come from the MBTiles tile set served by deploy_secure_map.py;
+        # the browser fetches only the tiles in view
+        VectorTileLayer(
+            ZCTA_TILE_URL,
+            popup_fields=[
+                ('zcta', 'ZIP Code'),
+                ('attractiveness_score', 'Attractiveness Score'),
+                ('attractiveness_category', 'Category'),
+                ('total_population', 'Population'),
+                ('median_household_income', 'Median Income'),
+                ('senior_population_pct', 'Senior Population %'),
+                ('dominant_system', 'Dominant System'),
+                ('hhi', 'HHI')
+            ],
+            name='ZIP Codes (vector tiles)'
         ).add_to(m)
-        print("    Added WI/IL ZIP polygons")
-    except FileNotFoundError:
-        print("    ⚠️ WI/IL GeoJSON not found")
+        print("    Added ZIP vector tile layer")
+    elif external_layers:
+        # Geometry assets are shared with the other portal maps; only the
+        # per-ZIP styling and popups are specific to this map
+        for geojson_file, zip_field, statefps, layer_name in ZIP_POLYGON_SOURCES:
+            try:
+                layer, geometry_url = create_external_zip_layer(geojson_file, zip_field, statefps, EXTERNAL_POLYGON_LEVEL,
+                                                                zip_score_lookup, name=layer_name)
+            except FileNotFoundError:
+                print(f"    ⚠️ {geojson_file} not found")
+                continue
+            layer.add_to(m)
+            print(f"    Added {layer_name} ({geometry_url})")
+    else:
+        # Each precision level becomes its own layer, embedded in the HTML so
+        # the map also works opened from disk; only the one matching the
+        # current zoom is attached to the map.
+        for geojson_file, zip_field, statefps, layer_name in ZIP_POLYGON_SOURCES:
+            layers, sizes = {}, []
+            try:
+                for level in ZIP_POLYGON_LEVELS:
+                    geojson = load_simplified_feature_collection(geojson_file, level)
+                    prepare_zip_features(geojson, zip_field, zip_score_lookup, statefps=statefps)
+                    layers[level] = create_zip_polygon_layer(geojson, zip_field)
+                    sizes.append(f"{level} {len(json.dumps(geojson, separators=(',', ':'))) / 1e6:.2f} MB")
+            except FileNotFoundError:
+                print(f"    ⚠️ {geojson_file} not found")
+                continue
+            add_zoom_switched_layer(m, folium.FeatureGroup(name=layer_name), layers)
+            print(f"    Added {layer_name} inline ({', '.join(sizes)}; "
+                  f"{os.path.getsize(geojson_file) / 1e6:.2f} MB source)")
     
-    # Add OK/MO ZIP polygons from new GeoJSON
-    try:
-        with open('zipcodes_mo_ok.geojson', 'r') as f:
-            mo_ok_geojson = json.load(f)
-        # Add MO/OK ZIP polygons with colors from CSV data and popups
-        # Add extra popup fields to MO/OK features
-        for feature in mo_ok_geojson['features']:
-            zip_code = feature['properties'].get('ZCTA5CE20', '')
-            data = zip_score_lookup.get(zip_code, {})
-            feature['properties']['attractiveness_score'] = data.get('score', 'N/A')
-            feature['properties']['attractiveness_category'] = data.get('category', 'N/A')
-            feature['properties']['total_population'] = data.get('population', 'N/A')
-            feature['properties']['median_household_income'] = data.get('income', 'N/A')
-            feature['properties']['senior_population_pct'] = data.get('senior_pct', 'N/A')
-
-        folium.GeoJson(
-            mo_ok_geojson,
-            name='MO/OK ZIP Codes',
-            style_function=lambda feature: {
-                'fillColor': get_color_from_csv(feature['properties'].get('ZCTA5CE20'), zip_score_lookup),
-                'color': 'black',
-                'weight': 1,
-                'fillOpacity': 0.6
-            },
-            tooltip=folium.GeoJsonTooltip(
-                fields=['ZCTA5CE20'],
-                aliases=['ZIP Code'],
-                localize=True,
-                sticky=False,
-                labels=True,
-                style="""
-                    background-color: #YELLOW;
-                    border: 2px solid black;
-                    border-radius: 3px;
-                    box-shadow: 3px;
-                """
-            ),
-            popup=folium.GeoJsonPopup(
-                fields=['ZCTA5CE20', 'attractiveness_score', 'attractiveness_category', 'total_population', 'median_household_income', 'senior_population_pct'],
-                aliases=['ZIP Code', 'Attractiveness Score', 'Category', 'Population', 'Median Income', 'Senior Population %'],
-                localize=True,
-                labels=True,
-                style="background-color: white; border-radius: 5px; padding: 10px;"
-            )
-        ).add_to(m)
-        print("    Added MO/OK ZIP polygons")
-    except FileNotFoundError:
-        print("    ⚠️ MO/OK GeoJSON not found")
+    # Resolve facility coordinates once (columns, then uszips.csv by ZIP)
+    facility_lat, facility_lng = facility_coordinates(facilities, get_zip_coordinates)
     
     # Add SSM Health facilities
     if not facilities.empty:
         print("  Adding SSM Health facilities...")
         
-        # Create a feature group for facilities
-        facility_group = folium.FeatureGroup(name="SSM Health Facilities", show=True)
-        
-        # Create a separate feature group for hospitals to make them stand out
-        hospital_group = folium.FeatureGroup(name="🏥 SSM Health Hospitals", show=True)
-        
-        # Facility type colors
-        facility_colors = {
-            'Hospital': '#d62728',      # Red
-            'Emergency Department': '#ff7f0e', # Orange
-            'Emergency Room': '#ff7f0e', # Orange
-            'Urgent Care': '#ff9933',    # Dark Orange
-            'Clinic': '#2ca02c',        # Green
-            'Clinic (or Outpatient Clinic)': '#2ca02c',        # Green
-            'Imaging Center / Radiology': '#1f77b4',        # Blue
-            'Rehabilitation Center (or Physical Therapy)': '#9467bd', # Purple
-            'Surgery Center (or Ambulatory Surgery Center – ASC)': '#8c564b', # Brown
-            'Pharmacy': '#e377c2',      # Pink
-            'Laboratory / Lab': '#17becf', # Cyan
-            'Other': '#7f7f7f'          # Gray
-        }
-        
-        # Convert hex colors to Folium color names
-        def hex_to_folium_color(hex_color):
-            color_map = {
-                '#d62728': 'red',
-                '#ff7f0e': 'orange', 
-                '#ff9933': 'orange',    # Dark Orange -> Orange
-                '#2ca02c': 'green',
-                '#1f77b4': 'blue',
-                '#9467bd': 'purple',
-                '#8c564b': 'darkred',   # Brown -> Dark Red (valid Folium color)
-                '#e377c2': 'pink',
-                '#17becf': 'lightblue',
-                '#7f7f7f': 'gray'
-            }
-            mapped_color = color_map.get(hex_color, 'red')
-            return mapped_color
-        
         # --- Hospital statistics from image ---
         hospital_stats = {
             "SSM Health St. Mary's Hospital - Jefferson City": {"Region": "MID-MISSOURI", "Avg Cases/Month": "7,522", "Net Rev/Case": "$1,425", "Direct Cost/Case": "$974", "Direct Labor/Case": "$535", "Direct Supplies/Case": "$242", "Direct Purch Svc/Case": "$60", "Direct Physician Cost/Case": "$73", "Direct Other Cost/Case": "$65", "MBO/Case": "$451"},
@@ -332,220 +354,51 @@ def create_comprehensive_map(zip_data, facilities):
             "waupun memorial": {"Region": "WISCONSIN", "Avg Cases/Month": "3,909", "Net Rev/Case": "$1,349", "Direct Cost/Case": "$688", "Direct Labor/Case": "$380", "Direct Supplies/Case": "$184", "Direct Purch Svc/Case": "$71", "Direct Physician Cost/Case": "$0", "Direct Other Cost/Case": "$56", "MBO/Case": "$561"}
         }
 
-        def normalize_name(name):
-            # Lowercase, remove punctuation, extra spaces, and common stopwords
-            name = name.lower()
-            name = re.sub(r"[^a-z0-9 ]+", " ", name)
-            stopwords = [
-                "ssm", "health", "hospital", "center", "medical", "community", "memorial", "children", "children s", "saint", "st", "the", "of", "-", "'s", "'"
-            ]
-            for word in stopwords:
-                name = name.replace(word, " ")
-            name = re.sub(r"\s+", " ", name).strip()
-            return name
+        # Hospital name -> stats key, by token similarity (one indexed lookup per distinct name)
+        stats_matcher = NameMatcher(hospital_stats)
         
-        for idx, facility in facilities.iterrows():
-            try:
-                # Get coordinates - try multiple column name variations
-                lat = None
-                lng = None
-                
-                # Try different possible column names
-                if 'lat' in facility.index and pd.notna(facility['lat']):
-                    lat = facility['lat']
-                elif 'latitude' in facility.index and pd.notna(facility['latitude']):
-                    lat = facility['latitude']
-                
-                if 'lon' in facility.index and pd.notna(facility['lon']):
-                    lng = facility['lon']
-                elif 'longitude' in facility.index and pd.notna(facility['longitude']):
-                    lng = facility['longitude']
-                
-                # If no coordinates in the data, try to get them from uszips.csv using ZIP code
-                if pd.isna(lat) or pd.isna(lng):
-                    zip_code = facility.get('zip')
-                    if pd.notna(zip_code):
-                        coords = get_zip_coordinates(zip_code)
-                        if coords:
-                            lat, lng = coords
-                
-                if pd.notna(lat) and pd.notna(lng):
-                    facility_type = facility.get('facility_type', facility.get('type', 'Hospital'))
-                    hex_color = facility_colors.get(facility_type, facility_colors['Hospital'])
-                    folium_color = hex_to_folium_color(hex_color)
-                    
-                    # Map facility types to supported Folium icons
-                    icon_mapping = {
-                        'Hospital': 'plus',
-                        'Emergency Department': 'exclamation-sign',
-                        'Emergency Room': 'exclamation-sign',
-                        'Emergency Department (ED) / Urgent Care': 'exclamation-sign',
-                        'Urgent Care': 'exclamation-sign',
-                        'Clinic': 'info-sign',
-                        'Clinic (or Outpatient Clinic)': 'info-sign',
-                        'Rehabilitation Center': 'heart',
-                        'Rehabilitation Center (or Physical Therapy)': 'heart',
-                        'Imaging Center': 'star',
-                        'Imaging Center / Radiology': 'star',
-                        'Surgery Center': 'ok-sign',
-                        'Surgery Center (or Ambulatory Surgery Center – ASC)': 'ok-sign',
-                        'Pharmacy': 'leaf',
-                        'Laboratory': 'cloud',
-                        'Laboratory / Lab': 'cloud',
-                        'Other': 'home'
-                    }
-                    # Get icon based on facility type
-                    icon_name = icon_mapping.get(facility_type, 'info-sign')
-                    
-                    # Create popup content with supplemental attributes
-                    popup_content = f"""
-                    <b>{facility.get('name', 'Unknown')}</b><br>
-                    Type: {facility_type}<br>
-                    Address: {facility.get('street', 'N/A')}<br>
-                    City: {facility.get('city', 'N/A')}, {facility.get('state', 'N/A')}<br>
-                    ZIP: {facility.get('zip', 'N/A')}<br>
-                    MSA: {facility.get('msa_name', 'N/A')}
-                    """
-                    
-                    # Add supplemental attributes if available
-                    if 'fte_count' in facility.index and pd.notna(facility['fte_count']):
-                        popup_content += f"<br>FTE Count: {facility['fte_count']:,.0f}"
-                    if 'discharges (inpatient volume, 2023)' in facility.index and pd.notna(facility['discharges (inpatient volume, 2023)']):
-                        popup_content += f"<br>Discharges (2023): {facility['discharges (inpatient volume, 2023)']:,.0f}"
-                    if 'patient_days (2023)' in facility.index and pd.notna(facility['patient_days (2023)']):
-                        popup_content += f"<br>Patient Days (2023): {facility['patient_days (2023)']:,.0f}"
-                    if 'cmi (12/2023)' in facility.index and pd.notna(facility['cmi (12/2023)']):
-                        popup_content += f"<br>CMI (12/2023): {facility['cmi (12/2023)']:.2f}"
-                    
-                    # Special handling for hospitals - make them stand out
-                    if facility_type == 'Hospital':
-                        # Try to match hospital name to stats (fuzzy set-based)
-                        norm_name = normalize_name(facility.get('name', ''))
-                        print(f"DEBUG: Hospital name: {facility.get('name', '')} | Normalized: {norm_name}")
-                        matched_stats = None
-                        norm_name_set = set(norm_name.split())
-                        for key in hospital_stats:
-                            key_norm = normalize_name(key)
-                            key_set = set(key_norm.split())
-                            # Fuzzy match: if at least 2 words overlap, or one is subset of the other
-                            if len(norm_name_set & key_set) >= 2 or key_norm in norm_name or norm_name in key_norm:
-                                matched_stats = hospital_stats[key]
-                                print(f"DEBUG: Matched stats for {facility.get('name', '')} -> {key}")
-                                break
-                        if not matched_stats:
-                            print(f"DEBUG: No stats found for {facility.get('name', '')} (normalized: {norm_name})")
-                        # Create a custom HTML marker for hospitals with pulsing effect
-                        hospital_icon_html = f'''
-                        <div style="
-                            background-color: {hex_color};
-                            border: 3px solid white;
-                            border-radius: 50%;
-                            width: 25px;
-                            height: 25px;
-                            display: flex;
-                            align-items: center;
-                            justify-content: center;
-                            box-shadow: 0 0 10px rgba(0,0,0,0.5);
-                            animation: pulse 2s infinite;
-                        ">
-                            <i class="fa fa-plus" style="color: white; font-size: 12px;"></i>
-                        </div>
-                        <style>
-                        @keyframes pulse {{
-                            0% {{
-                                transform: scale(1);
-                                box-shadow: 0 0 10px rgba(0,0,0,0.5);
-                            }}
-                            50% {{
-                                transform: scale(1.2);
-                                box-shadow: 0 0 20px rgba(214, 39, 40, 0.8);
-                            }}
-                            100% {{
-                                transform: scale(1);
-                                box-shadow: 0 0 10px rgba(0,0,0,0.5);
-                            }}
-                        }}
-                        </style>
-                        '''
-                        # Add hospital stats to popup if available
-                        if matched_stats:
-                            popup_content += "<br><b>Hospital Statistics:</b>"
-                            for stat_label, stat_value in matched_stats.items():
-                                popup_content += f"<br>{stat_label}: {stat_value}"
-                        
-                        # Create hospital marker with custom icon
-                        marker = folium.Marker(
-                            location=[lat, lng],
-                            popup=folium.Popup(popup_content, max_width=350),
-                            icon=folium.DivIcon(
-                                html=hospital_icon_html,
-                                icon_size=(25, 25),
-                                icon_anchor=(12, 12)
-                            ),
-                            tooltip=f"🏥 {facility.get('name', 'Unknown')} (Hospital)"
-                        )
-                        
-                        # Add to hospital group
-                        marker.add_to(hospital_group)
-                    else:
-                        # Regular facility marker
-                        marker = folium.Marker(
-                            location=[lat, lng],
-                            popup=folium.Popup(popup_content, max_width=300),
-                            icon=folium.Icon(color=folium_color, icon=icon_name),
-                            tooltip=f"{facility.get('name', 'Unknown')} ({facility_type})"
-                        )
-                        
-                        # Add to regular facility group
-                        marker.add_to(facility_group)
-            except Exception as e:
-                print(f"    ⚠️ Error adding facility {facility.get('name', 'Unknown')}: {e}")
-                continue
+        # One compact record array per layer; popups are built in the browser on click
+        types = facility_types(facilities)
+        is_hospital = (types == 'Hospital').to_numpy()
+        names = facilities['name'].fillna('') if 'name' in facilities.columns else pd.Series('', index=facilities.index)
+        stats_keys = [stats_matcher.match(str(name))[0] if hospital else None
+                      for name, hospital in zip(names, is_hospital)]
+        facility_payload = build_facility_records(facilities[~is_hospital], facility_lat[~is_hospital], facility_lng[~is_hospital])
+        hospital_payload = build_facility_records(facilities[is_hospital], facility_lat[is_hospital], facility_lng[is_hospital],
+                                                  stats_keys=[k for k, h in zip(stats_keys, is_hospital) if h],
+                                                  hospital_stats=hospital_stats)
         
-        # Add both groups to map
-        facility_group.add_to(m)
-        hospital_group.add_to(m)
+        if external_layers:
+            facility_layer = FacilityClusterLayer(url=write_layer_asset('facility_records', facility_payload),
+                                                  name="SSM Health Facilities")
+            hospital_layer = FacilityClusterLayer(url=write_layer_asset('hospital_records', hospital_payload),
+                                                  name="🏥 SSM Health Hospitals", cluster=False, hospital=True,
+                                                  popup_max_width=350)
+        else:
+            facility_layer = FacilityClusterLayer(data=facility_payload, name="SSM Health Facilities")
+            hospital_layer = FacilityClusterLayer(data=hospital_payload, name="🏥 SSM Health Hospitals",
+                                                  cluster=False, hospital=True, popup_max_width=350)
+        facility_layer.add_to(m)
+        hospital_layer.add_to(m)
+        print(f"    Added {len(facility_payload['records'])} facilities and {len(hospital_payload['records'])} hospitals")
     
     # Add custom search functionality for markers
     print("  Adding search functionality...")
     
     # Create a list of all facility data for search
     facility_search_data = []
-    for _, facility in facilities.iterrows():
-        try:
-            lat = None
-            lng = None
-            
-            # Get coordinates
-            if 'lat' in facility.index and pd.notna(facility['lat']):
-                lat = facility['lat']
-            elif 'latitude' in facility.index and pd.notna(facility['latitude']):
-                lat = facility['latitude']
-            
-            if 'lon' in facility.index and pd.notna(facility['lon']):
-                lng = facility['lon']
-            elif 'longitude' in facility.index and pd.notna(facility['longitude']):
-                lng = facility['longitude']
-            
-            if pd.isna(lat) or pd.isna(lng):
-                zip_code = facility.get('zip')
-                if pd.notna(zip_code):
-                    coords = get_zip_coordinates(zip_code)
-                    if coords:
-                        lat, lng = coords
-            
-            if pd.notna(lat) and pd.notna(lng):
-                facility_search_data.append({
-                    'name': str(facility.get('name', 'Unknown')),
-                    'type': str(facility.get('facility_type', 'Unknown')),
-                    'zip': str(facility.get('zip', 'N/A')),
-                    'city': str(facility.get('city', 'N/A')),
-                    'state': str(facility.get('state', 'N/A')),
-                    'lat': lat,
-                    'lng': lng
-                })
-        except:
-            continue
+    for index, facility in facilities.iterrows():
+        lat, lng = facility_lat[index], facility_lng[index]
+        if pd.notna(lat) and pd.notna(lng):
+            facility_search_data.append({
+                'name': str(facility.get('name', 'Unknown')),
+                'type': str(facility.get('facility_type', 'Unknown')),
+                'zip': str(facility.get('zip', 'N/A')),
+                'city': str(facility.get('city', 'N/A')),
+                'state': str(facility.get('state', 'N/A')),
+                'lat': lat,
+                'lng': lng
+            })
     
     # Add custom search box that works with the original markers
     search_html = f'''
@@ -690,15 +543,7 @@ def create_comprehensive_map(zip_data, facilities):
     </div>
     <hr style="margin: 10px 0;">
     <p><b>Other SSM Health Facilities</b></p>
-    <p><i class="glyphicon glyphicon-exclamation-sign" style="color:#ff7f0e"></i> Emergency Department</p>
-    <p><i class="glyphicon glyphicon-exclamation-sign" style="color:#ff9933"></i> Urgent Care</p>
-    <p><i class="glyphicon glyphicon-info-sign" style="color:#2ca02c"></i> Clinic</p>
-    <p><i class="glyphicon glyphicon-star" style="color:#1f77b4"></i> Imaging Center / Radiology</p>
-    <p><i class="glyphicon glyphicon-heart" style="color:#9467bd"></i> Rehabilitation Center</p>
-    <p><i class="glyphicon glyphicon-ok-sign" style="color:#8c564b"></i> Surgery Center</p>
-    <p><i class="glyphicon glyphicon-leaf" style="color:#e377c2"></i> Pharmacy</p>
-    <p><i class="glyphicon glyphicon-cloud" style="color:#17becf"></i> Laboratory / Lab</p>
-    <p><i class="glyphicon glyphicon-home" style="color:#7f7f7f"></i> Other</p>
+    ''' + facility_legend_html() + '''
     <hr style="margin: 10px 0;">
     <p style="font-size: 12px; color: #666; font-style: italic;">
         💡 Hospitals are displayed with pulsing red circles to make them stand out prominently
@@ -713,20 +558,24 @@ def create_comprehensive_map(zip_data, facilities):
     
     return m
 
+def build_zip_score_lookup(zip_data):
+    """Build the ZIP -> score/popup lookup with a precomputed fill color per ZIP"""
+    lookup_df = pd.DataFrame({
+        'score': zip_data['attractiveness_score'].values,
+        'category': zip_data['attractiveness_category'].values,
+        'population': zip_data['total_population'].values,
+        'income': zip_data['median_household_income'].values,
+        'senior_pct': zip_data['senior_population_pct'].values,
+        'color': map_fill_colors(zip_data['attractiveness_score']),
+    }, index=zip_data['zip'].astype(str))
+    # Later rows win on duplicate ZIPs, as with the old row-by-row dict build
+    lookup_df = lookup_df[~lookup_df.index.duplicated(keep='last')]
+    return lookup_df.to_dict(orient='index')
+
 def get_color_from_csv(zip_code, zip_score_lookup):
     """Get color for ZIP code based on CSV data"""
     if zip_code in zip_score_lookup:
-        score = zip_score_lookup[zip_code]['score']
-        if score >= 80:
-            return '#00e600'  # Bright Green - Very Attractive
-        elif score >= 60:
-            return '#99ff99'  # Light Green - High
-        elif score >= 40:
-            return '#ffff66'  # Yellow - Medium
-        elif score >= 20:
-            return '#ff9933'  # Orange - Low
-        else:
-            return '#ff3333'  # Bright Red - Very Unattractive
+        return zip_score_lookup[zip_code]['color']
     else:
         return '#gray'  # Gray for ZIP codes not in CSV
 
@@ -735,7 +584,7 @@ def get_zip_coordinates(zip_code):
     try:
         # Load uszips.csv if not already loaded
         if not hasattr(get_zip_coordinates, 'uszips_data'):
-            get_zip_coordinates.uszips_data = pd.read_csv('uszips.csv')
+            get_zip_coordinates.uszips_data = read_csv('uszips.csv')
         
         # Find the ZIP code
         zip_row = get_zip_coordinates.uszips_data[
@@ -748,7 +597,7 @@ def get_zip_coordinates(zip_code):
     except:
         return None
 
-def main():
+def main(output_file='ssm_health_comprehensive_final_map.html'):
     """Main function to create comprehensive map"""
     print("🏥 SSM Health Comprehensive Final Map")
     print("=" * 50)
@@ -757,14 +606,18 @@ def main():
     zip_data = load_and_merge_zip_data()
     facilities = load_ssm_facilities()
     
+    # Use the vector tile set once vector_tiles.py has built it (build_maps keeps it current)
+    vector_tiles = os.path.exists(TILESETS['zcta'])
+    if vector_tiles:
+        print(f"🧩 Using vector tiles from {TILESETS['zcta']}")
+    
     # Create map
-    m = create_comprehensive_map(zip_data, facilities)
+    m = create_comprehensive_map(zip_data, facilities, vector_tiles=vector_tiles, external_layers=EXTERNAL_LAYERS)
     
     # Save map
-    output_file = 'ssm_health_comprehensive_final_map.html'
     m.save(output_file)
     
-    print(f"\n✅ Comprehensive map saved to: {output_file}")
+    print(f"\n✅ Comprehensive map saved to: {output_file} ({os.path.getsize(output_file) / 1e6:.1f} MB)")
     print(f"📊 Map includes:")
     print(f"  - {len(zip_data)} ZIP codes with attractiveness scores")
     print(f"  - {len(facilities)} SSM Health facilities")
@@ -6,9 +6,11 @@ Combines scored ZIP demographics with GeoJSON polygons and SSM facilities
 
 import pandas as pd
 import folium
-import json
 import numpy as np
 from folium import plugins
+from geometry_store import load_feature_collection
+from columnar_store import read_table
+from facility_categorizer import MAP_CATEGORIES
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -48,16 +50,15 @@ class FinalZIPAttractivenessMapper:
         print("📊 Loading data files...")
         
         # Load scored ZIP demographics
-        self.zip_scores = pd.read_csv('all_mn_wi_il_zip_demographics_scored.csv')
+        self.zip_scores = read_table('all_mn_wi_il_zip_demographics_scored.csv')
         print(f"  ✅ Loaded {len(self.zip_scores)} scored ZIP codes")
         
         # Load SSM facilities with coordinates
-        self.facilities = pd.read_csv('ssm_health_locations_with_attractiveness_scores_and_coords.csv')
+        self.facilities = read_table('ssm_health_locations_with_attractiveness_scores_and_coords.csv')
         print(f"  ✅ Loaded {len(self.facilities)} SSM facilities")
         
-        # Load GeoJSON
-        with open('zipcodes_mn_wi_il.geojson', 'r') as f:
-            self.geojson = json.load(f)
+        # Load GeoJSON (from the binary geometry store when one is current)
+        self.geojson = load_feature_collection('zipcodes_mn_wi_il.geojson')
         print(f"  ✅ Loaded GeoJSON with {len(self.geojson['features'])} ZIP polygons")
         
         # Clean facility data
@@ -70,44 +71,14 @@ class FinalZIPAttractivenessMapper:
         # Remove facilities without coordinates
         self.facilities = self.facilities.dropna(subset=['lat', 'lon'])
         
-        # Ensure ZIP codes are strings and match format
-        self.facilities['zip'] = self.facilities['zip'].astype(str).str.zfill(5)
-        self.zip_scores['zip'] = self.zip_scores['zip'].astype(str).str.zfill(5)
-        
         # Categorize facility types
-        self.facilities['facility_category'] = self.facilities['type'].apply(self.categorize_facility)
+        self.facilities['facility_category'] = MAP_CATEGORIES.categorize(type=self.facilities['type'])
         
         print(f"  ✅ Cleaned {len(self.facilities)} facilities with coordinates")
     
     def categorize_facility(self, facility_type):
         """Categorize facility types for consistent mapping"""
-        if pd.isna(facility_type):
-            return 'Other'
-        
-        facility_type = str(facility_type).lower()
-        
-        if 'hospital' in facility_type:
-            return 'Hospital'
-        elif 'emergency' in facility_type or 'er' in facility_type:
-            return 'Emergency Room'
-        elif 'urgent' in facility_type:
-            return 'Urgent Care'
-        elif 'clinic' in facility_type:
-            return 'Clinic'
-        elif 'office' in facility_type:
-            return 'Medical Office'
-        elif 'specialty' in facility_type:
-            return 'Specialty Center'
-        elif 'rehab' in facility_type:
-            return 'Rehabilitation'
-        elif 'lab' in facility_type:
-            return 'Laboratory'
-        elif 'imaging' in facility_type or 'radiology' in facility_type:
-            return 'Imaging Center'
-        elif 'pharmacy' in facility_type:
-            return 'Pharmacy'
-        else:
-            return 'Other'
+        return MAP_CATEGORIES(type=facility_type)
     
     def join_scores_to_geojson(self):
         """Join attractiveness scores to GeoJSON features"""
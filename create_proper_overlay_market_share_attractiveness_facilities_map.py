@@ -7,87 +7,47 @@ Uses proper data loading and geocoding from the working scripts
 
 import pandas as pd
 import folium
-import json
-from collections import defaultdict
 import numpy as np
 from folium import plugins
 import re
+from input_cache import read_csv, read_table
+from market_share import MARKET_SHARE_FILES, MarketShares, load_market_records
+from columnar_store import FACILITY_MAP_COLUMNS, ZIP_SCORE_COLUMNS
+from simplify_zip_polygons import load_simplified_feature_collection
+from layer_assets import (EXTERNAL_LAYERS, ExternalZCTALayer, ExternalMarkerLayer,
+                          write_layer_asset, zcta_geometry_asset)
 
 def load_market_share_data():
-    """Load and process market share data from all regions"""
+    """Load the market share data from all regions as per-ZIP shares, HHI and dominant system"""
     print("📊 Loading market share data from all regions...")
 
-    # STL/SoIL data
-    stl_soil_df = pd.read_excel('STL_SoIL_2024IP_MktShare.xlsx')
-    stl_soil_df['Region'] = 'STL/SoIL'
-
-    # Wisconsin data
-    wi_df = pd.read_excel('WI_2024IP_MktShare.xlsx')
-    wi_df['Region'] = 'Wisconsin'
-
-    # Oklahoma data
-    ok_df = pd.read_excel('OK_2024IP_MktShare.xlsx')
-    ok_df['Region'] = 'Oklahoma'
-
-    # Combine all datasets
-    all_market_df = pd.concat([stl_soil_df, wi_df, ok_df], ignore_index=True)
+    all_market_df = load_market_records()
+    region_counts = all_market_df['Region'].value_counts()
 
     print(f"📈 Total records loaded: {len(all_market_df)}")
-    print(f"   - STL/SoIL: {len(stl_soil_df)}")
-    print(f"   - Wisconsin: {len(wi_df)}")
-    print(f"   - Oklahoma: {len(ok_df)}")
-
-    # Only keep rows with valid ZIP codes and hospital systems
-    all_market_df = all_market_df.dropna(subset=['Zip Code', 'Hospital System'])
-    all_market_df['Zip Code'] = all_market_df['Zip Code'].astype(float).astype(int).astype(str).str.zfill(5)
-
-    # Consolidate SSM systems into a single category
-    all_market_df['Hospital System'] = all_market_df['Hospital System'].apply(
-        lambda x: 'SSM Health' if 'SSM' in str(x).upper() else x
-    )
-
-    print(f"📊 Valid records after cleaning: {len(all_market_df)}")
-
-    # Aggregate: count interactions per ZIP per system
-    zip_sys_counts = all_market_df.groupby(['Zip Code', 'Hospital System']).size().reset_index(name='count')
-
-    # For each ZIP, get total and per-system counts
-    zip_totals = zip_sys_counts.groupby('Zip Code')['count'].sum().to_dict()
-
-    # For each ZIP, build a dict of system: market share and calculate HHI
-    zip_market_share = defaultdict(dict)
-    zip_hhi = {}
+    for region in MARKET_SHARE_FILES:
+        print(f"   - {region}: {region_counts.get(region, 0)}")
 
-    for _, row in zip_sys_counts.iterrows():
-        zip_code = row['Zip Code']
-        system = row['Hospital System']
-        count = row['count']
-        total = zip_totals[zip_code]
-        share = count / total if total > 0 else 0
-        zip_market_share[zip_code][system] = share
+    # SSM systems are consolidated into a single category; rows without a ZIP
+    # code or hospital system are left out
+    market = MarketShares.from_records(all_market_df, consolidate_ssm=True)
 
-    # Calculate HHI for each ZIP (sum of squared market shares)
-    for zip_code, systems in zip_market_share.items():
-        hhi = sum(share ** 2 for share in systems.values()) * 10000  # Scale to 0-10,000 range
-        zip_hhi[zip_code] = hhi
+    print(f"📊 Valid records after cleaning: {int(market.counts.sum())}")
 
-    # For each ZIP, find the dominant system
-    zip_dominant = {z: max(systems, key=systems.get) for z, systems in zip_market_share.items()}
-
-    return zip_dominant, zip_market_share, zip_hhi
+    return market
 
 def load_attractiveness_data():
     """Load attractiveness scores data"""
     print("📊 Loading attractiveness scores data...")
     
     # Load MN/WI/IL data (excluding MN)
-    mn_wi_il_data = pd.read_csv('all_mn_wi_il_zip_demographics_scored.csv')
+    mn_wi_il_data = read_table('all_mn_wi_il_zip_demographics_scored.csv', columns=ZIP_SCORE_COLUMNS)
     if 'state' in mn_wi_il_data.columns:
         mn_wi_il_data = mn_wi_il_data[~(mn_wi_il_data['state'] == 'MN')]
     print(f"  Loaded {len(mn_wi_il_data)} WI/IL ZIP codes")
     
     # Load OK/MO data
-    ok_mo_data = pd.read_csv('all_ok_mo_zip_demographics_scored.csv')
+    ok_mo_data = read_table('all_ok_mo_zip_demographics_scored.csv', columns=ZIP_SCORE_COLUMNS)
     print(f"  Loaded {len(ok_mo_data)} OK/MO ZIP codes")
     
     # Combine the datasets
@@ -122,7 +82,7 @@ def load_ssm_facilities():
     facilities = None
     for file in facility_files:
         try:
-            facilities = pd.read_csv(file)
+            facilities = read_table(file, columns=FACILITY_MAP_COLUMNS)
             print(f"  Loaded {len(facilities)} facilities from {file}")
             break
         except FileNotFoundError:
@@ -134,7 +94,7 @@ def load_ssm_facilities():
     
     # Load hospitals masterlist for classification
     try:
-        hospitals_masterlist = pd.read_csv('hospitals_masterlist.csv', skiprows=2)
+        hospitals_masterlist = read_csv('hospitals_masterlist.csv', skiprows=2)
         hospitals_masterlist = hospitals_masterlist[hospitals_masterlist['name'].notna()]
         hospitals_masterlist = hospitals_masterlist[hospitals_masterlist['name'].str.strip() != '']
         
@@ -177,7 +137,7 @@ def get_zip_coordinates(zip_code):
     """Get coordinates for a ZIP code from uszips.csv"""
     try:
         if not hasattr(get_zip_coordinates, 'uszips_data'):
-            get_zip_coordinates.uszips_data = pd.read_csv('uszips.csv')
+            get_zip_coordinates.uszips_data = read_csv('uszips.csv')
         
         zip_row = get_zip_coordinates.uszips_data[
             get_zip_coordinates.uszips_data['zip'] == str(zip_code)
@@ -189,8 +149,12 @@ def get_zip_coordinates(zip_code):
     except:
         return None
 
-def create_overlay_map(zip_dominant, zip_market_share, zip_hhi, zip_attractiveness, facilities):
-    """Create the overlay map with market share, attractiveness, and facilities"""
+def create_overlay_map(market, zip_attractiveness, facilities, external_layers=False):
+    """
+    Create the overlay map with market share, attractiveness, and facilities
+
+    external_layers: write polygons and markers to cacheable layer files (see layer_assets)
+    """
     print("🗺️ Creating overlay map...")
     
     # Create base map
@@ -198,7 +162,7 @@ def create_overlay_map(zip_dominant, zip_market_share, zip_hhi, zip_attractivene
     m = folium.Map(location=center, zoom_start=5, tiles='cartodbpositron')
     
     # Assign colors to hospital systems
-    dominant_systems = set(zip_dominant.values())
+    dominant_systems = set(market.dominant)
     system_list = sorted(dominant_systems)
     colors = [
         '#e41a1c', '#377eb8', '#4daf4a', '#984ea3', '#ff7f00', '#a65628', '#f781bf', '#999999', 
@@ -214,10 +178,8 @@ def create_overlay_map(zip_dominant, zip_market_share, zip_hhi, zip_attractivene
     
     # Load ZIP code polygons
     print("  Loading geographic data...")
-    with open('zipcodes_mn_wi_il_scored.geojson', 'r') as f:
-        mn_wi_il_geojson = json.load(f)
-    with open('zipcodes_mo_ok.geojson', 'r') as f:
-        mo_ok_geojson = json.load(f)
+    mn_wi_il_geojson = load_simplified_feature_collection('zipcodes_mn_wi_il_scored.geojson', 'medium')
+    mo_ok_geojson = load_simplified_feature_collection('zipcodes_mo_ok.geojson', 'medium')
     
     # Combine features
     all_features = mn_wi_il_geojson['features'] + mo_ok_geojson['features']
@@ -235,15 +197,17 @@ def create_overlay_map(zip_dominant, zip_market_share, zip_hhi, zip_attractivene
     print("  Adding ZIP code polygons...")
     colored_zips = 0
     ssm_dominant_zips = 0
+    zip_properties = {}
     
     for feature in all_features:
         zip_code = feature['properties'].get('ZCTA5CE10') or feature['properties'].get('ZCTA5CE20')
-        if not zip_code or zip_code not in zip_dominant:
+        position = market.zip_position.get(zip_code)
+        if not zip_code or position is None:
             continue
         
-        dominant_system = zip_dominant[zip_code]
+        dominant_system = market.dominant[position]
         color = system_colors.get(dominant_system, '#cccccc')
-        hhi = zip_hhi[zip_code]
+        hhi = market.hhi[position]
         hhi_interpretation = get_hhi_interpretation(hhi)
         
         # Get attractiveness data for opacity
@@ -270,7 +234,7 @@ def create_overlay_map(zip_dominant, zip_market_share, zip_hhi, zip_attractivene
         <b>Senior Population %:</b> {attractiveness_data.get('senior_pct', 'N/A'):.1f}%<br>
         <b>Market Share Breakdown:</b><ul>
         '''
-        for sys, share in sorted(zip_market_share[zip_code].items(), key=lambda x: -x[1]):
+        for sys, share in market.breakdown(position):
             popup_html += f'<li>{sys}: {share:.1%}</li>'
         popup_html += '</ul>'
         
@@ -290,15 +254,27 @@ def create_overlay_map(zip_dominant, zip_market_share, zip_hhi, zip_attractivene
                 })
             return style
         
-        folium.GeoJson(
-            feature,
-            style_function=style_fn,
-            highlight_function=lambda f: {'weight': 2, 'color': 'blue'},
-            tooltip=f"ZIP: {zip_code} | {dominant_system} | Attractiveness: {attractiveness_score:.1f}",
-            popup=folium.Popup(popup_html, max_width=400)
-        ).add_to(m)
+        tooltip = f"ZIP: {zip_code} | {dominant_system} | Attractiveness: {attractiveness_score:.1f}"
+        if external_layers:
+            zip_properties[zip_code] = {'style': style_fn(feature), 'popup': popup_html, 'tooltip': tooltip}
+        else:
+            folium.GeoJson(
+                feature,
+                style_function=style_fn,
+                highlight_function=lambda f: {'weight': 2, 'color': 'blue'},
+                tooltip=tooltip,
+                popup=folium.Popup(popup_html, max_width=400)
+            ).add_to(m)
         colored_zips += 1
     
+    if external_layers:
+        # Geometry assets are shared with the other portal maps
+        properties_url = write_layer_asset('overlay_zips', zip_properties)
+        for geojson_file, geojson in [('zipcodes_mn_wi_il_scored', mn_wi_il_geojson), ('zipcodes_mo_ok', mo_ok_geojson)]:
+            geometry_url = zcta_geometry_asset(geojson, f'{geojson_file}.medium')
+            ExternalZCTALayer(geometry_url, properties_url, highlight={'weight': 2, 'color': 'blue'},
+                              control=False).add_to(m)
+    
     print(f"🎨 Colored {colored_zips} ZIP codes on the map")
     print(f"🏥 SSM Health is market leader in {ssm_dominant_zips} ZIP codes")
     
@@ -310,6 +286,10 @@ def create_overlay_map(zip_dominant, zip_market_share, zip_hhi, zip_attractivene
         facility_group = folium.FeatureGroup(name="SSM Health Facilities", show=True)
         hospital_group = folium.FeatureGroup(name="🏥 SSM Health Hospitals", show=True)
         
+        # Marker specs collected instead of folium markers in external_layers mode
+        facility_markers = []
+        hospital_markers = []
+        
         # Facility type colors and icons
         facility_colors = {
             'Hospital': '#d62728',      # Red
@@ -446,6 +426,15 @@ def create_overlay_map(zip_dominant, zip_market_share, zip_hhi, zip_attractivene
                         </style>
                         '''
                         
+                        if external_layers:
+                            hospital_markers.append({
+                                'lat': float(lat), 'lng': float(lng),
+                                'popup': popup_content, 'max_width': 350,
+                                'tooltip': f"🏥 {facility.get('name', 'Unknown')} (Hospital)",
+                                'icon': {'html': hospital_icon_html, 'size': [25, 25], 'anchor': [12, 12]}
+                            })
+                            continue
+                        
                         marker = folium.Marker(
                             location=[lat, lng],
                             popup=folium.Popup(popup_content, max_width=350),
@@ -459,6 +448,15 @@ def create_overlay_map(zip_dominant, zip_market_share, zip_hhi, zip_attractivene
                         
                         marker.add_to(hospital_group)
                     else:
+                        if external_layers:
+                            facility_markers.append({
+                                'lat': float(lat), 'lng': float(lng),
+                                'popup': popup_content, 'max_width': 300,
+                                'tooltip': f"{facility.get('name', 'Unknown')} ({facility_type})",
+                                'icon': {'color': folium_color, 'icon': icon_name}
+                            })
+                            continue
+                        
                         # Regular facility marker
                         marker = folium.Marker(
                             location=[lat, lng],
@@ -473,8 +471,14 @@ def create_overlay_map(zip_dominant, zip_market_share, zip_hhi, zip_attractivene
                 continue
         
         # Add both groups to map
-        facility_group.add_to(m)
-        hospital_group.add_to(m)
+        if external_layers:
+            ExternalMarkerLayer(write_layer_asset('facility_markers', facility_markers),
+                                name="SSM Health Facilities").add_to(m)
+            ExternalMarkerLayer(write_layer_asset('hospital_markers', hospital_markers),
+                                name="🏥 SSM Health Hospitals").add_to(m)
+        else:
+            facility_group.add_to(m)
+            hospital_group.add_to(m)
     
     # Add legend
     print("  Adding legend...")
@@ -550,26 +554,26 @@ def create_overlay_map(zip_dominant, zip_market_share, zip_hhi, zip_attractivene
     
     return m
 
-def main():
+def main(output_file='ssm_health_proper_overlay_market_share_attractiveness_facilities_map.html'):
     """Main function to create the overlay map"""
     print("🏥 SSM Health Market Share + Attractiveness + Facilities Overlay Map")
     print("=" * 70)
     
     # Load all data
-    zip_dominant, zip_market_share, zip_hhi = load_market_share_data()
+    market = load_market_share_data()
     zip_attractiveness = load_attractiveness_data()
     facilities = load_ssm_facilities()
     
     # Create overlay map
-    m = create_overlay_map(zip_dominant, zip_market_share, zip_hhi, zip_attractiveness, facilities)
+    m = create_overlay_map(market, zip_attractiveness, facilities,
+                           external_layers=EXTERNAL_LAYERS)
     
     # Save map
-    output_file = 'ssm_health_proper_overlay_market_share_attractiveness_facilities_map.html'
     m.save(output_file)
     
     print(f"\n✅ Proper overlay map saved to: {output_file}")
     print(f"📊 Map includes:")
-    print(f"  - Market share data for {len(zip_dominant)} ZIP codes")
+    print(f"  - Market share data for {len(market.zips)} ZIP codes")
     print(f"  - Attractiveness scores for {len(zip_attractiveness)} ZIP codes")
     print(f"  - {len(facilities)} SSM Health facilities")
     print(f"  - Dual-layer visualization with opacity for attractiveness")
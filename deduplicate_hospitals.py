@@ -5,60 +5,57 @@ Keep only the main hospital entries, remove duplicate service/clinic entries
 """
 
 import pandas as pd
-import re
+from facility_model import FacilityModel
+from name_matcher import NameMatcher
 
 def deduplicate_hospitals():
     """Deduplicate hospital entries in the dataset"""
     print("🏥 Deduplicating hospital entries...")
     
-    # Load the dataset
+    # Load the dataset, and split it into sites and listings so the masterlist
+    # check runs once per site (listings keep the dataset's row order)
     df = pd.read_csv('ssm_health_locations_with_attractiveness_scores_and_coords.csv')
-    print(f"  Original dataset: {len(df)} facilities")
+    model = FacilityModel.from_wide(df)
+    listings = model.specialties
+    print(f"  Original dataset: {len(listings)} facilities ({len(model.sites)} sites)")
     
     # Get hospital entries
-    hospitals = df[df['facility_type'] == 'Hospital'].copy()
-    print(f"  Original hospitals: {len(hospitals)}")
+    is_hospital = listings['facility_type'] == 'Hospital'
+    print(f"  Original hospitals: {is_hospital.sum()}")
     
     # Load masterlist to get the exact hospital names we want to keep
     masterlist = pd.read_csv('hospitals_masterlist.csv', skiprows=2)
     masterlist = masterlist[masterlist['name'].notna()]
     masterlist = masterlist[masterlist['name'].str.strip() != '']
     
-    masterlist_hospital_names = set(masterlist['name'].str.strip().str.lower())
-    print(f"  Masterlist hospitals: {len(masterlist_hospital_names)}")
+    # No stopwords: only case, punctuation and spacing may differ from the masterlist
+    masterlist_matcher = NameMatcher(masterlist['name'], stopwords=())
+    print(f"  Masterlist hospitals: {len(masterlist_matcher.candidates)}")
     
-    # Function to check if a hospital name is a main hospital (exact match with masterlist)
-    def is_main_hospital(name):
-        name_lower = name.lower().strip()
-        
-        # Check if it's an exact match with masterlist
-        if name_lower in masterlist_hospital_names:
-            return True
-        
-        return False
+    # A site is a main hospital if its name exactly matches the masterlist
+    main_sites = model.sites.loc[model.sites['name'].map(masterlist_matcher.is_exact), 'site_id']
+    is_main_hospital = is_hospital & listings['site_id'].isin(main_sites)
     
-    # Identify main hospitals vs service/clinic entries
-    hospitals['is_main_hospital'] = hospitals['name'].apply(is_main_hospital)
-    
-    main_hospitals = hospitals[hospitals['is_main_hospital'] == True]
-    service_entries = hospitals[hospitals['is_main_hospital'] == False]
+    site_names = model.sites.set_index('site_id')['name']
+    main_hospitals = site_names[listings.loc[is_main_hospital, 'site_id']]
+    service_entries = site_names[listings.loc[is_hospital & ~is_main_hospital, 'site_id']]
     
     print(f"  Main hospitals (exact matches): {len(main_hospitals)}")
     print(f"  Service/clinic entries: {len(service_entries)}")
     
     # Show the main hospitals we're keeping
     print(f"\n  Main hospitals to keep:")
-    for _, hospital in main_hospitals.iterrows():
-        print(f"    - {hospital['name']}")
+    for name in main_hospitals:
+        print(f"    - {name}")
     
     # Show some examples of service entries we're removing
     print(f"\n  Examples of service entries being removed:")
-    for _, hospital in service_entries.head(10).iterrows():
-        print(f"    - {hospital['name']}")
+    for name in service_entries.head(10):
+        print(f"    - {name}")
     
-    # Create new dataset: keep all non-hospital entries + only main hospitals
-    non_hospitals = df[df['facility_type'] != 'Hospital']
-    deduplicated_df = pd.concat([non_hospitals, main_hospitals.drop('is_main_hospital', axis=1)], ignore_index=True)
+    # Keep all non-hospital listings + only main hospitals; the rows are taken
+    # from the dataset as read, so every other value is written back unchanged
+    deduplicated_df = df[(~is_hospital | is_main_hospital).to_numpy()]
     
     print(f"\n  Final dataset: {len(deduplicated_df)} facilities")
     print(f"  Final hospitals: {len(deduplicated_df[deduplicated_df['facility_type'] == 'Hospital'])}")
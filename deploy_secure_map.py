@@ -3,10 +3,15 @@
 Secure SSM Health Facility Map Server with Authentication
 """
 
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, session, flash, abort
 from functools import wraps
 import os
 from simple_color_coded_map import create_simple_color_coded_map
+from vector_tiles import TILESETS, MBTilesReader
+from layer_assets import LAYER_ASSET_DIR
+from static_delivery import send_precompressed
+from portal_tables import get_portal_tables, parse_bbox, MAX_LIMIT
+from portal_metrics import init_metrics
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-change-this-in-production')
@@ -16,6 +21,12 @@ USERNAME = os.environ.get('MAP_USERNAME', 'ssm_team')
 PASSWORD = os.environ.get('MAP_PASSWORD', 'your_secure_password_here')
 PORT = int(os.environ.get('PORT', 8080))
 
+# Request metrics, served on /metrics
+init_metrics(app)
+
+# Open MBTiles readers, one per tile layer, created on first request
+tile_readers = {}
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -56,17 +67,92 @@ def dashboard():
 @app.route('/map')
 @login_required
 def map_view():
-    return send_from_directory('.', 'ssm_health_comprehensive_final_map.html')
+    return send_precompressed('.', 'ssm_health_comprehensive_final_map.html')
 
 @app.route('/market-share-map')
 @login_required
 def market_share_map():
-    return send_from_directory('.', 'ssm_health_comprehensive_competitor_market_share_map.html')
+    return send_precompressed('.', 'ssm_health_comprehensive_competitor_market_share_map.html')
 
 @app.route('/overlay-map')
 @login_required
 def overlay_map():
-    return send_from_directory('.', 'ssm_health_proper_overlay_market_share_attractiveness_facilities_map.html')
+    return send_precompressed('.', 'ssm_health_proper_overlay_market_share_attractiveness_facilities_map.html')
+
+@app.route('/tiles/<layer>/<int:z>/<int:x>/<int:y>.pbf')
+@login_required
+def vector_tile(layer, z, x, y):
+    if layer not in TILESETS or not os.path.exists(TILESETS[layer]):
+        abort(404)
+    if layer not in tile_readers:
+        tile_readers[layer] = MBTilesReader(TILESETS[layer])
+    data = tile_readers[layer].tile(z, x, y)
+    if data is None:
+        # Empty tile: nothing to draw here
+        return '', 204
+    return data, 200, {
+        'Content-Type': 'application/vnd.mapbox-vector-tile',
+        'Content-Encoding': 'gzip',
+        'Cache-Control': 'private, max-age=3600'
+    }
+
+@app.route('/layers/<path:filename>')
+@login_required
+def layer_asset(filename):
+    # File names carry a content hash, so a cached copy never goes stale
+    return send_precompressed(LAYER_ASSET_DIR, filename, mimetype='application/json',
+                              cache_control='private, max-age=31536000, immutable')
+
+def api_error(message, status):
+    return {'error': message}, status
+
+@app.errorhandler(FileNotFoundError)
+def missing_input(e):
+    # The API tables could not be loaded; answer in JSON rather than an HTML 500
+    if request.path.startswith('/api/'):
+        return api_error(f"Portal data unavailable: {e}", 503)
+    abort(500)
+
+def query_limit():
+    limit = request.args.get('limit', MAX_LIMIT, type=int)
+    return max(0, min(limit, MAX_LIMIT))
+
+@app.route('/api/zip/<zip_code>')
+@login_required
+def api_zip(zip_code):
+    record = get_portal_tables().zip_record(zip_code)
+    if record is None:
+        return api_error(f"ZIP {zip_code} not found", 404)
+    return record
+
+@app.route('/api/zips')
+@login_required
+def api_zips():
+    try:
+        bbox = parse_bbox(request.args.get('bbox'))
+    except ValueError as e:
+        return api_error(str(e), 400)
+    min_score = request.args.get('min_score', type=float)
+    return get_portal_tables().zips_in_bbox(bbox, min_score=min_score, limit=query_limit())
+
+@app.route('/api/facilities')
+@login_required
+def api_facilities():
+    bbox = None
+    if 'bbox' in request.args:
+        try:
+            bbox = parse_bbox(request.args['bbox'])
+        except ValueError as e:
+            return api_error(str(e), 400)
+    return get_portal_tables().facilities_in_bbox(bbox, facility_type=request.args.get('type'), limit=query_limit())
+
+@app.route('/api/market-share/<zip_code>')
+@login_required
+def api_market_share(zip_code):
+    shares = get_portal_tables().market_share(zip_code)
+    if shares is None:
+        return api_error(f"No market share data for ZIP {zip_code}", 404)
+    return shares
 
 @app.route('/health')
 def health():
@@ -75,23 +161,11 @@ def health():
 if __name__ == '__main__':
     print("🔐 Starting secure SSM Health Facility Map server...")
     
-    # Generate the comprehensive final map
-    try:
-        print("🗺️ Generating comprehensive final map...")
-        from create_comprehensive_final_map import main as generate_map
-        generate_map()
-        print("✅ Comprehensive map generated successfully!")
-    except Exception as e:
-        print(f"⚠️ Warning: Could not generate comprehensive map: {e}")
-    
-    # Generate the comprehensive competitor market share map
-    try:
-        print("📊 Generating comprehensive competitor market share map...")
-        from create_comprehensive_competitor_market_share_map import main as generate_market_share_map
-        generate_market_share_map()
-        print("✅ Market share map generated successfully!")
-    except Exception as e:
-        print(f"⚠️ Warning: Could not generate market share map: {e}")
+    # Rebuild changed maps and the API table store in the background, so the
+    # server starts serving (the previous maps) right away
+    from map_rebuilder import start_background_rebuilder
+    rebuilder = start_background_rebuilder()
+    print(f"🗺️ Map rebuilder running in the background (pid {rebuilder.pid})")
     
     print(f"🌐 Server will be available at: http://localhost:{PORT}")
     print(f"👤 Username: {USERNAME}")
@@ -1,8 +1,8 @@
 import requests
 import zipfile
 import os
-import json
 import pandas as pd
+from geojson_stream import stream_features
 
 def download_and_extract_zip_geojson():
     """Download and extract ZIP code GeoJSON for MO and OK using real ZIP codes"""
@@ -93,33 +93,24 @@ def filter_zip_codes_for_mo_ok(geojson_file):
             real_zip_set.add(str(zip_code))
         print(f"Using fallback: {len(real_zip_set)} ZIP codes from ranges")
     
-    # Load the GeoJSON file
-    with open(geojson_file, 'r') as f:
-        data = json.load(f)
-    
-    # Filter features to only include ZIP codes in our real ZIP set
-    filtered_features = []
-    for feature in data['features']:
+    # Stream the national GeoJSON, keeping only ZIP codes in our real ZIP set.
+    # Only one feature is in memory at a time, even for the full US extract.
+    zip_codes = []
+    def in_real_zip_set(feature):
         zip_code = feature['properties'].get('ZCTA5CE20', '')
         if zip_code in real_zip_set:
-            filtered_features.append(feature)
-    
-    # Create filtered GeoJSON
-    filtered_data = {
-        'type': 'FeatureCollection',
-        'features': filtered_features
-    }
+            zip_codes.append(zip_code)
+            return True
+        return False
     
     # Save filtered GeoJSON
     filtered_filename = f"zipcodes_mo_ok.geojson"
-    with open(filtered_filename, 'w') as f:
-        json.dump(filtered_data, f)
+    filtered_count = stream_features(geojson_file, filtered_filename, predicate=in_real_zip_set)
     
-    print(f"Filtered to {len(filtered_features)} ZIP codes for MO and OK")
+    print(f"Filtered to {filtered_count} ZIP codes for MO and OK")
     print(f"Saved to: {filtered_filename}")
     
     # Extract ZIP codes to CSV for verification
-    zip_codes = [feature['properties']['ZCTA5CE20'] for feature in filtered_features]
     zip_df = pd.DataFrame({'zip': zip_codes})
     csv_filename = f"mo_ok_extracted_zips.csv"
     zip_df.to_csv(csv_filename, index=False)
@@ -15,6 +15,8 @@ from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut
 import time
 import warnings
+from facility_categorizer import SERVICE_LINES
+from aggregate_cube import load_cube
 warnings.filterwarnings('ignore')
 
 class EnhancedFacilityAnalyzer:
@@ -38,40 +40,7 @@ class EnhancedFacilityAnalyzer:
         self.df['facility_type'] = self.df['type'].fillna('Unknown')
         
         # Create a simplified facility type category
-        def categorize_facility_type(row):
-            name = str(row['name']).lower()
-            specialty = str(row['specialty']).lower()
-            
-            if 'hospital' in name:
-                return 'Hospital'
-            elif 'urgent care' in name or 'urgent care' in specialty:
-                return 'Urgent Care'
-            elif 'express clinic' in name or 'retail clinic' in specialty:
-                return 'Express/Retail Clinic'
-            elif 'pharmacy' in name or 'pharmacy' in specialty:
-                return 'Pharmacy'
-            elif 'imaging' in name or 'mammography' in specialty:
-                return 'Imaging Services'
-            elif 'laboratory' in name or 'lab' in specialty:
-                return 'Laboratory'
-            elif 'therapy' in name:
-                return 'Therapy Services'
-            elif 'cancer' in name or 'oncology' in specialty:
-                return 'Cancer Care'
-            elif 'cardiology' in name or 'heart' in name:
-                return 'Cardiology'
-            elif 'orthopedics' in name or 'orthopedics' in specialty:
-                return 'Orthopedics'
-            elif 'pediatrics' in specialty:
-                return 'Pediatrics'
-            elif 'obstetrics' in specialty or 'gynecology' in specialty:
-                return 'OB/GYN'
-            elif 'family medicine' in specialty or 'internal medicine' in specialty:
-                return 'Primary Care'
-            else:
-                return 'Specialty Care'
-        
-        self.df['facility_category'] = self.df.apply(categorize_facility_type, axis=1)
+        self.df['facility_category'] = SERVICE_LINES.categorize(name=self.df['name'], specialty=self.df['specialty'])
         
         # Clean up MSA data
         self.df['msa_name_clean'] = self.df['msa_name'].fillna('Unknown MSA')
@@ -94,6 +63,9 @@ class EnhancedFacilityAnalyzer:
         print(f"Unique facilities: {self.df['facility_id'].nunique()}")
         print(f"Unique MSAs: {self.df['msa_name_clean'].nunique()}")
         print(f"Average median household income: ${self.df['msa_median_household_income'].mean():,.0f}")
+        
+        # Materialized aggregates the income dashboard reads (recomputed only for changed MSAs)
+        self.cube = load_cube(self.df.assign(msa_name=self.df['msa_name_clean']), 'enhanced')
     
     def analyze_market_coverage_with_income(self):
         """Analyze market coverage including income factors"""
@@ -281,10 +253,11 @@ class EnhancedFacilityAnalyzer:
         income_dist = self.df['msa_median_household_income'].value_counts(bins=10).sort_index()
         
         # Facility distribution by income category
-        facility_by_income = self.df.groupby('income_category').size().reset_index(name='facility_count')
+        facility_by_income = self.cube.rollup(['income_category'])
         
         # Facility type distribution by income
-        facility_type_by_income = self.df.groupby(['income_category', 'facility_category']).size().reset_index(name='count')
+        facility_type_by_income = self.cube.rollup(['income_category', 'facility_category']).rename(
+            columns={'facility_count': 'count'})
         
         # Create subplots
         fig = make_subplots(
@@ -2,17 +2,14 @@
 """
 Extract all ZIP codes from zipcodes_mn_wi_il.geojson and save to all_mn_wi_il_zips.csv
 """
-import json
 import csv
-
-with open('zipcodes_mn_wi_il.geojson', 'r') as f:
-    geo = json.load(f)
+from geojson_stream import iter_features, feature_zip
 
 zip_codes = set()
-for feature in geo['features']:
-    zip_code = feature['properties'].get('ZCTA5CE10') or feature['properties'].get('ZCTA5CE') or feature['properties'].get('ZIPCODE')
+for feature in iter_features('zipcodes_mn_wi_il.geojson'):
+    zip_code = feature_zip(feature, keys=['ZCTA5CE10', 'ZCTA5CE', 'ZIPCODE'])
     if zip_code:
-        zip_codes.add(str(zip_code).zfill(5))
+        zip_codes.add(zip_code)
 
 with open('all_mn_wi_il_zips.csv', 'w', newline='') as f:
     writer = csv.writer(f)
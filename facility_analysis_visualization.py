@@ -10,6 +10,7 @@ from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut
 import time
 import warnings
+from facility_categorizer import SERVICE_LINES
 warnings.filterwarnings('ignore')
 
 class FacilityAnalyzer:
@@ -33,40 +34,7 @@ class FacilityAnalyzer:
         self.df['facility_type'] = self.df['type'].fillna('Unknown')
         
         # Create a simplified facility type category
-        def categorize_facility_type(row):
-            name = str(row['name']).lower()
-            specialty = str(row['specialty']).lower()
-            
-            if 'hospital' in name:
-                return 'Hospital'
-            elif 'urgent care' in name or 'urgent care' in specialty:
-                return 'Urgent Care'
-            elif 'express clinic' in name or 'retail clinic' in specialty:
-                return 'Express/Retail Clinic'
-            elif 'pharmacy' in name or 'pharmacy' in specialty:
-                return 'Pharmacy'
-            elif 'imaging' in name or 'mammography' in specialty:
-                return 'Imaging Services'
-            elif 'laboratory' in name or 'lab' in specialty:
-                return 'Laboratory'
-            elif 'therapy' in name:
-                return 'Therapy Services'
-            elif 'cancer' in name or 'oncology' in specialty:
-                return 'Cancer Care'
-            elif 'cardiology' in name or 'heart' in name:
-                return 'Cardiology'
-            elif 'orthopedics' in name or 'orthopedics' in specialty:
-                return 'Orthopedics'
-            elif 'pediatrics' in specialty:
-                return 'Pediatrics'
-            elif 'obstetrics' in specialty or 'gynecology' in specialty:
-                return 'OB/GYN'
-            elif 'family medicine' in specialty or 'internal medicine' in specialty:
-                return 'Primary Care'
-            else:
-                return 'Specialty Care'
-        
-        self.df['facility_category'] = self.df.apply(categorize_facility_type, axis=1)
+        self.df['facility_category'] = SERVICE_LINES.categorize(name=self.df['name'], specialty=self.df['specialty'])
         
         # Clean up MSA data
         self.df['msa_name_clean'] = self.df['msa_name'].fillna('Unknown MSA')
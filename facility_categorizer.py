@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Compiled Keyword Categorizer for Facility Names, Specialties and Types
+The analysis and map scripts each categorize facilities with a chain of
+`any(word in text for word in [...])` checks, run row by row through
+DataFrame.apply. KeywordCategorizer holds such a chain as priority-ordered
+rules and compiles every field's keywords into one alternation regex:
+  - categorize() works on whole Series, scanning each distinct combination of
+    field values once (name/specialty pairs repeat heavily across listings)
+  - results are cached per combination, across calls
+The first rule (in order) with a keyword in one of its fields wins, exactly
+as in the if/elif chains these rules come from.
+"""
+
+import re
+import pandas as pd
+
+
+class KeywordCategorizer:
+    """
+    Priority-ordered keyword rules over one or more text fields
+
+    rules: [(category, {field: [keywords]})]; a rule matches when any of its
+           fields contains one of its keywords (case-insensitive substring)
+    default: category when no rule matches
+    missing: category when every field is missing (default: match as empty text)
+    """
+
+    def __init__(self, rules, default, missing=None):
+        self.rules = rules
+        self.default = default
+        self.missing = missing
+        self.fields = list(dict.fromkeys(field for _, keywords in rules for field in keywords))
+        self._priority = {field: {} for field in self.fields}
+        for priority, (_, keywords) in enumerate(rules):
+            for field, words in keywords.items():
+                for word in words:
+                    self._priority[field].setdefault(word.lower(), priority)
+        # A zero-width lookahead at every position finds overlapping keywords too; at each
+        # position the alternation takes the highest-priority keyword starting there
+        self._patterns = {
+            field: re.compile('(?=(' + '|'.join(
+                re.escape(word) for word in sorted(priorities, key=lambda word: (priorities[word], -len(word)))
+            ) + '))')
+            for field, priorities in self._priority.items()
+        }
+        self._cache = {}
+
+    def _rule_priority(self, field, texts):
+        """Highest-priority (lowest) rule index with a keyword in each text, len(rules) if none"""
+        priorities = self._priority[field]
+        matches = texts.str.lower().str.findall(self._patterns[field])
+        return matches.map(lambda words: min((priorities[word] for word in words), default=len(self.rules)))
+
+    def _categorize_unique(self, combinations):
+        """Categories of a frame of distinct field-value combinations (None where missing)"""
+        best = pd.Series(len(self.rules), index=combinations.index)
+        for field in self.fields:
+            texts = combinations[field].map(lambda value: '' if value is None else str(value))
+            best = best.combine(self._rule_priority(field, texts), min)
+        categories = best.map(lambda priority: self.rules[priority][0] if priority < len(self.rules) else self.default)
+        if self.missing is not None:
+            categories[combinations[self.fields].isna().all(axis=1)] = self.missing
+        return categories
+
+    def categorize(self, **columns):
+        """
+        Category of every row, given a Series (or sequence) per field,
+        e.g. categorize(name=df['name'], specialty=df['specialty'])
+        """
+        first = columns[self.fields[0]]
+        index = first.index if isinstance(first, pd.Series) else None
+        frame = pd.DataFrame({field: pd.Series(columns[field], index=index).astype(object)
+                              for field in self.fields})
+        frame = frame.where(frame.notna(), None)
+        keys = list(zip(*(frame[field] for field in self.fields)))
+
+        new = list(dict.fromkeys(key for key in keys if key not in self._cache))
+        if new:
+            combinations = pd.DataFrame(new, columns=self.fields, dtype=object)
+            self._cache.update(zip(new, self._categorize_unique(combinations)))
+        return pd.Series([self._cache[key] for key in keys], index=frame.index, dtype=object)
+
+    def __call__(self, **values):
+        """Category of one facility, e.g. categorizer(name='...', specialty='...')"""
+        return self.categorize(**{field: [values.get(field)] for field in self.fields}).iloc[0]
+
+
+# facility_type from name and specialty (categorize_facilities.py)
+FACILITY_TYPES = KeywordCategorizer([
+    ('Hospital', {'name': ['hospital', 'medical center', 'health center']}),
+    ('Emergency Department (ED) / Urgent Care', dict.fromkeys(['name', 'specialty'], [
+        'emergency', 'urgent care', 'ed ', 'er ', 'emergency room', 'urgent'])),
+    ('Pharmacy', {'name': ['pharmacy', 'drug store', 'medication', 'prescription']}),
+    ('Surgery Center (or Ambulatory Surgery Center – ASC)', dict.fromkeys(['name', 'specialty'], [
+        'surgery center', 'ambulatory surgery', 'asc', 'surgical', 'surgery'])),
+    ('Imaging Center / Radiology', dict.fromkeys(['name', 'specialty'], [
+        'imaging', 'radiology', 'x-ray', 'mri', 'ct scan', 'ultrasound', 'mammography',
+        'nuclear medicine', 'diagnostic imaging', 'medical imaging'])),
+    ('Laboratory / Lab', dict.fromkeys(['name', 'specialty'], [
+        'laboratory', 'lab ', 'pathology', 'diagnostic lab', 'clinical lab'])),
+    ('Rehabilitation Center (or Physical Therapy)', dict.fromkeys(['name', 'specialty'], [
+        'rehabilitation', 'rehab', 'physical therapy', 'pt ', 'occupational therapy',
+        'ot ', 'speech therapy', 'cardiac rehab', 'orthopedic rehab', 'therapy services'])),
+    ('Clinic (or Outpatient Clinic)', dict.fromkeys(['name', 'specialty'], [
+        'clinic', 'medical group', 'outpatient', 'primary care', 'family medicine',
+        'internal medicine', 'pediatrics', 'ob/gyn', 'obstetrics', 'gynecology',
+        'orthopedics', 'cardiology', 'dermatology', 'neurology', 'psychiatry',
+        'psychology', 'behavioral health', 'mental health', 'podiatry', 'chiropractic',
+        'audiology', 'ent', 'otolaryngology', 'nephrology', 'gastroenterology',
+        'endocrinology', 'rheumatology', 'oncology', 'hematology', 'pulmonology',
+        'urology', 'ophthalmology', 'optometry', 'eye care', 'dental', 'orthodontics',
+        'hospice', 'palliative care', 'home health', 'at home'])),
+    ('Clinic (or Outpatient Clinic)', {'name': [
+        'dean medical group', 'monroe clinic', 'health plaza', 'slucare',
+        'physician group', 'medical associates', 'healthcare partners']}),
+    ('Clinic (or Outpatient Clinic)', dict.fromkeys(['name', 'specialty'], [
+        'orthopedics', 'sports medicine', 'pain management', 'ear nose throat',
+        'audiology', 'behavioral health', 'podiatry', 'chiropractic', 'nephrology',
+        'academy', 'community'])),
+    ('Clinic (or Outpatient Clinic)', {'name': ['ssm health']}),
+], default='Unknown')
+
+# Dashboard facility_category from the scraped type (analysis dashboards and facility maps)
+TYPE_CATEGORIES = KeywordCategorizer([
+    ('Hospital', {'type': ['hospital', 'medical center']}),
+    ('Urgent Care', {'type': ['urgent', 'express', 'walk']}),
+    ('Pharmacy', {'type': ['pharmacy', 'prescription']}),
+    ('Imaging', {'type': ['imaging', 'radiology', 'mammography']}),
+    ('Laboratory', {'type': ['laboratory', 'lab']}),
+    ('Therapy', {'type': ['therapy', 'rehabilitation']}),
+    ('Cancer Care', {'type': ['cancer', 'oncology']}),
+    ('Eye Care', {'type': ['eye', 'ophthalmology']}),
+    ('Hospice', {'type': ['hospice']}),
+], default='Primary Care', missing='Unknown')
+
+# Service-line facility_category from name and specialty (facility distribution analyses)
+SERVICE_LINES = KeywordCategorizer([
+    ('Hospital', {'name': ['hospital']}),
+    ('Urgent Care', {'name': ['urgent care'], 'specialty': ['urgent care']}),
+    ('Express/Retail Clinic', {'name': ['express clinic'], 'specialty': ['retail clinic']}),
+    ('Pharmacy', {'name': ['pharmacy'], 'specialty': ['pharmacy']}),
+    ('Imaging Services', {'name': ['imaging'], 'specialty': ['mammography']}),
+    ('Laboratory', {'name': ['laboratory'], 'specialty': ['lab']}),
+    ('Therapy Services', {'name': ['therapy']}),
+    ('Cancer Care', {'name': ['cancer'], 'specialty': ['oncology']}),
+    ('Cardiology', {'name': ['cardiology', 'heart']}),
+    ('Orthopedics', {'name': ['orthopedics'], 'specialty': ['orthopedics']}),
+    ('Pediatrics', {'specialty': ['pediatrics']}),
+    ('OB/GYN', {'specialty': ['obstetrics', 'gynecology']}),
+    ('Primary Care', {'specialty': ['family medicine', 'internal medicine']}),
+], default='Specialty Care')
+
+# Map legend category from the scraped type (ZIP attractiveness map)
+MAP_CATEGORIES = KeywordCategorizer([
+    ('Hospital', {'type': ['hospital']}),
+    ('Emergency Room', {'type': ['emergency', 'er']}),
+    ('Urgent Care', {'type': ['urgent']}),
+    ('Clinic', {'type': ['clinic']}),
+    ('Medical Office', {'type': ['office']}),
+    ('Specialty Center', {'type': ['specialty']}),
+    ('Rehabilitation', {'type': ['rehab']}),
+    ('Laboratory', {'type': ['lab']}),
+    ('Imaging Center', {'type': ['imaging', 'radiology']}),
+    ('Pharmacy', {'type': ['pharmacy']}),
+], default='Other', missing='Other')
+
+# Emergency rooms and urgent cares split out by name (simple color-coded map);
+# other scraped types pass through, so there is no default category
+ED_URGENT_CARE_SPLIT = KeywordCategorizer([
+    ('Emergency Department (ED/ER)', {'name': ['emergency room']}),
+    ('Urgent Care', {'name': ['urgent care']}),
+    ('Emergency Department (ED/ER)', {'type': ['emergency department (ed) / urgent care']}),
+], default=None)
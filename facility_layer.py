@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Clustered, Canvas-Rendered SSM Health Facility Layer
+Facilities are shipped to the browser as one compact JSON array (a header of
+field names plus one row per facility) instead of one folium.Marker with inline
+popup HTML each. Clinics and other sites are drawn as canvas circle markers in a
+MarkerCluster; hospitals keep their pulsing icon, whose CSS is defined once per
+page. Popups and tooltips are built from the row when a marker is opened.
+"""
+
+import json
+import numpy as np
+import pandas as pd
+from branca.element import Element
+from folium.elements import JSCSSMixin
+from folium.map import Layer
+from jinja2 import Template
+
+FACILITY_COLORS = {
+    'Hospital': '#d62728',      # Red
+    'Emergency Department': '#ff7f0e', # Orange
+    'Emergency Room': '#ff7f0e', # Orange
+    'Emergency Department (ED) / Urgent Care': '#ff7f0e', # Orange
+    'Urgent Care': '#ff9933',    # Dark Orange
+    'Clinic': '#2ca02c',        # Green
+    'Clinic (or Outpatient Clinic)': '#2ca02c',        # Green
+    'Imaging Center / Radiology': '#1f77b4',        # Blue
+    'Rehabilitation Center (or Physical Therapy)': '#9467bd', # Purple
+    'Surgery Center (or Ambulatory Surgery Center – ASC)': '#8c564b', # Brown
+    'Pharmacy': '#e377c2',      # Pink
+    'Laboratory / Lab': '#17becf', # Cyan
+    'Other': '#7f7f7f'          # Gray
+}
+
+# (column, popup label, format) for the optional supplemental attributes
+SUPPLEMENTAL_FIELDS = [
+    ('fte_count', 'FTE Count', 'int'),
+    ('discharges (inpatient volume, 2023)', 'Discharges (2023)', 'int'),
+    ('patient_days (2023)', 'Patient Days (2023)', 'int'),
+    ('cmi (12/2023)', 'CMI (12/2023)', 'float2')
+]
+
+RECORD_FIELDS = ['lat', 'lng', 'type', 'name', 'street', 'city', 'state', 'zip', 'msa_name']
+
+# Defined once per page however many hospital markers or layers there are
+PULSE_CSS = """
+<style>
+.ssm-hospital-pulse {
+    border: 3px solid white;
+    border-radius: 50%;
+    width: 25px;
+    height: 25px;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    box-shadow: 0 0 10px rgba(0,0,0,0.5);
+    animation: ssm-pulse 2s infinite;
+}
+@keyframes ssm-pulse {
+    0% { transform: scale(1); box-shadow: 0 0 10px rgba(0,0,0,0.5); }
+    50% { transform: scale(1.2); box-shadow: 0 0 20px rgba(214, 39, 40, 0.8); }
+    100% { transform: scale(1); box-shadow: 0 0 10px rgba(0,0,0,0.5); }
+}
+</style>
+"""
+
+
+def facility_types(facilities):
+    """facility_type, falling back to type, then 'Hospital' (as the marker loops did)"""
+    types = pd.Series('Hospital', index=facilities.index, dtype=object)
+    for column in ('type', 'facility_type'):
+        if column in facilities.columns:
+            # object first: the columns are categoricals, which can't take new values
+            values = facilities[column].astype(object)
+            types = values.where(values.notna(), types)
+    return types
+
+
+def facility_coordinates(facilities, zip_coordinates):
+    """
+    (lat, lng) Series for every facility: lat/latitude and lon/longitude columns,
+    then zip_coordinates(zip) for rows still missing either value
+    """
+    def first_present(*columns):
+        values = pd.Series(np.nan, index=facilities.index)
+        for column in reversed(columns):
+            if column in facilities.columns:
+                values = facilities[column].where(facilities[column].notna(), values)
+        return pd.to_numeric(values, errors='coerce')
+
+    lat = first_present('lat', 'latitude')
+    lng = first_present('lon', 'longitude')
+    missing = (lat.isna() | lng.isna())
+    if missing.any() and 'zip' in facilities.columns:
+        for index, zip_code in facilities.loc[missing, 'zip'].dropna().items():
+            coords = zip_coordinates(zip_code)
+            if coords:
+                lat[index], lng[index] = coords
+    return lat, lng
+
+
+def build_facility_records(facilities, lat, lng, stats_keys=None, hospital_stats=None):
+    """
+    Compact payload for FacilityClusterLayer
+
+    Returns {'fields', 'supplemental', 'types', 'colors', 'records', 'stats'}:
+    each record is a list aligned with fields + supplemental labels, with the
+    facility type as an index into types and the last element a key into stats
+    (or null).
+    """
+    located = lat.notna() & lng.notna()
+    facilities = facilities[located]
+    types = facility_types(facilities)
+    type_names = sorted(types.unique())
+    type_index = {name: i for i, name in enumerate(type_names)}
+
+    columns = [
+        lat[located].round(6), lng[located].round(6), types.map(type_index)
+    ] + [
+        facilities[column].astype(object) if column in facilities.columns
+        else pd.Series(None, index=facilities.index, dtype=object)
+        for column in RECORD_FIELDS[3:]
+    ]
+    supplemental = [(column, label, fmt) for column, label, fmt in SUPPLEMENTAL_FIELDS if column in facilities.columns]
+    columns += [pd.to_numeric(facilities[column], errors='coerce') for column, _, _ in supplemental]
+    if stats_keys is not None:
+        columns.append(pd.Series(list(stats_keys), index=lat.index, dtype=object)[located])
+    else:
+        columns.append(pd.Series(None, index=facilities.index, dtype=object))
+
+    table = pd.concat(columns, axis=1, ignore_index=True).astype(object)
+    table = table.where(table.notna(), None)
+    return {
+        'fields': RECORD_FIELDS,
+        'supplemental': [[label, fmt] for _, label, fmt in supplemental],
+        'types': type_names,
+        'colors': [FACILITY_COLORS.get(name, FACILITY_COLORS['Hospital']) for name in type_names],
+        'records': table.values.tolist(),
+        'stats': {key: hospital_stats[key] for key in table[table.columns[-1]].dropna().unique()} if hospital_stats else {}
+    }
+
+
+class FacilityClusterLayer(JSCSSMixin, Layer):
+    """
+    Facility markers built in the browser from a build_facility_records payload,
+    given inline (data) or as a layer asset URL (url)
+
+    cluster: group markers in a MarkerCluster (canvas circle markers)
+    hospital: draw pulsing hospital icons instead of circle markers
+    """
+
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = {% if this.cluster %}L.markerClusterGroup({chunkedLoading: true, disableClusteringAtZoom: 13}){% else %}L.featureGroup(){% endif %};
+        {% if this.show %}{{ this.get_name() }}.addTo({{ this._parent.get_name() }});{% endif %}
+        (function() {
+            var group = {{ this.get_name() }};
+            var renderer = L.canvas({padding: 0.5});
+            function fmt(value, kind) {
+                if (kind === 'float2') { return Number(value).toFixed(2); }
+                return Math.round(value).toLocaleString('en-US');
+            }
+            function show(value) { return value === null || value === undefined ? 'N/A' : value; }
+            function popupHtml(data, rec) {
+                var n = data.fields.length, type = data.types[rec[2]];
+                var html = '<b>' + show(rec[3]) + '</b><br>Type: ' + type +
+                    '<br>Address: ' + show(rec[4]) +
+                    '<br>City: ' + show(rec[5]) + ', ' + show(rec[6]) +
+                    '<br>ZIP: ' + show(rec[7]) + '<br>MSA: ' + show(rec[8]);
+                data.supplemental.forEach(function(field, i) {
+                    var value = rec[n + i];
+                    if (value !== null) { html += '<br>' + field[0] + ': ' + fmt(value, field[1]); }
+                });
+                var stats = rec[rec.length - 1] !== null ? data.stats[rec[rec.length - 1]] : null;
+                if (stats) {
+                    html += '<br><b>Hospital Statistics:</b>';
+                    Object.keys(stats).forEach(function(label) { html += '<br>' + label + ': ' + stats[label]; });
+                }
+                return html;
+            }
+            function build(data) {
+                var markers = data.records.map(function(rec) {
+                    var color = data.colors[rec[2]], marker;
+                    {% if this.hospital %}
+                    marker = L.marker([rec[0], rec[1]], {icon: L.divIcon({
+                        className: 'empty', iconSize: [25, 25], iconAnchor: [12, 12],
+                        html: '<div class="ssm-hospital-pulse" style="background-color: ' + color + ';"><i class="fa fa-plus" style="color: white; font-size: 12px;"></i></div>'
+                    })});
+                    {% else %}
+                    marker = L.circleMarker([rec[0], rec[1]], {
+                        renderer: renderer, radius: 6, color: 'white', weight: 1,
+                        fillColor: color, fillOpacity: 0.9
+                    });
+                    {% endif %}
+                    marker.bindPopup(function() { return popupHtml(data, rec); }, {maxWidth: {{ this.popup_max_width }}});
+                    marker.bindTooltip(function() {
+                        return {% if this.hospital %}'🏥 ' + {% endif %}show(rec[3]) + ' (' + data.types[rec[2]] + ')';
+                    });
+                    return marker;
+                });
+                {% if this.cluster %}group.addLayers(markers);{% else %}markers.forEach(function(m) { group.addLayer(m); });{% endif %}
+            }
+            {% if this.url %}
+            fetch({{ this.url|tojson }}).then(function(r) { return r.json(); }).then(build);
+            {% else %}
+            build({{ this.data_json }});
+            {% endif %}
+        })();
+        {% endmacro %}
+    """)
+
+    default_js = [
+        ('markerclusterjs', 'https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/leaflet.markercluster.js')
+    ]
+    default_css = [
+        ('markerclustercss', 'https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/MarkerCluster.css'),
+        ('markerclusterdefaultcss', 'https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/MarkerCluster.Default.css')
+    ]
+
+    def __init__(self, data=None, url=None, name=None, cluster=True, hospital=False,
+                 popup_max_width=300, overlay=True, control=True, show=True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = 'FacilityClusterLayer'
+        # json.dumps keeps the statistics in their original order (tojson sorts keys)
+        self.data_json = json.dumps(data, separators=(',', ':')).replace('</', '<\\/') if data is not None else None
+        self.url = url
+        self.cluster = cluster
+        self.hospital = hospital
+        self.popup_max_width = popup_max_width
+
+    def render(self, **kwargs):
+        if self.hospital:
+            # Same child name for every hospital layer, so the CSS is added once
+            self.get_root().header.add_child(Element(PULSE_CSS), name='ssm_hospital_pulse_css')
+        super().render(**kwargs)
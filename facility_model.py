@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Normalized Facility / Site / Specialty Model
+The scraped facility table has one row per (site, specialty listing), and every
+row repeats the same MSA and ZIP demographic columns. FacilityModel splits it
+into four narrow tables:
+  - sites: one row per named location (name + address) with its coordinates
+  - specialties: one row per listing (site_id, specialty, facility_type, link)
+  - zips: ZIP demographics and attractiveness scores keyed by ZCTA
+  - msas: MSA attributes keyed by CBSA code (msa_code)
+A fifth, site_gaps, lists the sites that lack a ZIP or MSA value their ZIP or
+MSA has (hand-added hospitals without demographics), so joining the ZIP and
+MSA tables back leaves those values missing instead of filling them in.
+Steps that only need sites, or only need ZIP or MSA attributes, work on those
+tables directly; site_view() and wide_view() join back the columns asked for
+when a wide table is really needed.
+"""
+
+import json
+import os
+import pandas as pd
+from columnar_store import read_table, write_table
+from table_schema import apply_schema
+
+FACILITY_FILE = 'ssm_health_locations_with_attractiveness_scores_and_coords.csv'
+
+MODEL_DIR = 'facility_model'
+
+TABLE_NAMES = ['sites', 'specialties', 'zips', 'msas', 'site_gaps']
+
+# A site is a named location; several sites can share one street address
+SITE_KEY = ['name', 'street', 'city', 'state', 'zip']
+
+# Columns that vary between the listings of one site
+SPECIALTY_COLUMNS = ['facility_type', 'specialty', 'link']
+
+# MSA-level attributes from the MSA, income and age stages
+MSA_COLUMNS = [
+    'msa_name', 'msa_population', 'msa_median_household_income',
+    'pct_under_18', 'pct_18_34', 'pct_35_54', 'pct_55_64', 'pct_65_plus', 'median_age',
+    'msa_total_population', 'age_mix_summary', 'age_mix_category'
+]
+
+# ZIP-level scores from create_attractiveness_scores.py (plus every zip_* column)
+ZIP_SCORE_COLUMNS = [
+    'attractiveness_score', 'attractiveness_category', 'attractiveness_color',
+    'density_score', 'growth_score', 'senior_score', 'income_score', 'young_family_score',
+    'senior_population_pct', 'young_family_pct'
+]
+
+
+def _constant_within(df, key, columns):
+    """The columns with at most one non-null value per key, and none where the key is missing"""
+    if not columns:
+        return []
+    counts = df.groupby(key, sort=False, observed=True)[columns].nunique()
+    keyless = df.loc[df[key].isna(), columns].notna().any()
+    return [column for column in columns
+            if (not len(counts) or counts[column].max() <= 1) and not keyless[column]]
+
+
+def _present_in_all_or_none(df, key, columns):
+    """The columns that, within each key, are missing in every row or in none"""
+    if not columns:
+        return []
+    grouped = df.groupby(key, sort=False, observed=True)[columns]
+    present = grouped.count()
+    sizes = grouped.size()
+    return [column for column in columns
+            if ((present[column] == 0) | (present[column] == sizes)).all()]
+
+
+def _site_gaps(sites, table, key, columns):
+    """(site_id, column) for each site missing a value its key's row in table has"""
+    if not columns:
+        return pd.DataFrame(columns=['site_id', 'column'])
+    values = sites[['site_id', key]].merge(table[[key] + columns], on=key, how='left')
+    gaps = sites[columns].isna().to_numpy() & values[columns].notna().to_numpy()
+    site_index, column_index = gaps.nonzero()
+    return pd.DataFrame({'site_id': sites['site_id'].to_numpy()[site_index],
+                         'column': [columns[i] for i in column_index]})
+
+
+def _table_per_key(df, key, columns):
+    """One row per key, with each column's value among the key's rows"""
+    table = df.loc[df[key].notna(), [key] + columns]
+    return table.groupby(key, sort=False, observed=True).first().reset_index()
+
+
+class FacilityModel:
+    """
+    The facility table as sites, specialties, ZIP and MSA tables, plus the
+    site_gaps that keep the joins from filling in values. columns keeps the
+    wide table's column order so wide_view() returns it unchanged.
+    """
+
+    def __init__(self, sites, specialties, zips, msas, columns, site_gaps=None):
+        self.sites = sites
+        self.specialties = specialties
+        self.zips = zips
+        self.msas = msas
+        self.columns = list(columns)
+        self.site_gaps = site_gaps if site_gaps is not None else pd.DataFrame(columns=['site_id', 'column'])
+
+    @classmethod
+    def from_wide(cls, df):
+        """Split a wide facility table (one row per listing) into the model's tables"""
+        # Typed by the schema, so ZIPs are 5-character ZCTA strings
+        df = apply_schema(df.copy())
+        df['site_id'] = df.groupby(SITE_KEY, sort=False, dropna=False, observed=True).ngroup()
+
+        # Each column goes to the coarsest table it is constant within. One that
+        # differs between rows of an MSA, ZIP or site in this data moves down a
+        # level, so wide_view() gives back the values the wide table had. A ZIP
+        # or MSA column a site lacks stays up, with the site in site_gaps; one
+        # missing in only some of a site's listings moves down to the listings.
+        candidates = [column for column in df.columns if column not in SITE_KEY + SPECIALTY_COLUMNS + ['site_id']]
+        per_site = set(_present_in_all_or_none(df, 'site_id', candidates))
+        msa_columns = []
+        if 'msa_code' in df.columns:
+            msa_columns = _constant_within(df, 'msa_code', [column for column in MSA_COLUMNS
+                                                            if column in df.columns and column in per_site])
+        zip_columns = _constant_within(df, 'zip', [
+            column for column in df.columns if column not in msa_columns and column in per_site and
+            (column.startswith('zip_') or column in ZIP_SCORE_COLUMNS or column in MSA_COLUMNS)
+        ])
+        placed = set(SITE_KEY + SPECIALTY_COLUMNS + msa_columns + zip_columns + ['site_id'])
+        site_columns = SITE_KEY + _constant_within(df, 'site_id', [column for column in df.columns
+                                                                   if column not in placed and column in per_site])
+        placed.update(site_columns)
+        specialty_columns = [column for column in df.columns
+                             if column in SPECIALTY_COLUMNS or column not in placed]
+
+        sites = _table_per_key(df, 'site_id', site_columns)
+        specialties = df[['site_id'] + specialty_columns].reset_index(drop=True)
+        zips = _table_per_key(df, 'zip', zip_columns)
+        msas = _table_per_key(df, 'msa_code', msa_columns) if 'msa_code' in df.columns else pd.DataFrame()
+
+        # Each site's own ZIP and MSA values (the same in all its listings)
+        site_values = _table_per_key(df, 'site_id', ['zip'] + zip_columns +
+                                     (['msa_code'] + msa_columns if 'msa_code' in df.columns else []))
+        site_gaps = pd.concat([_site_gaps(site_values, zips, 'zip', zip_columns),
+                               _site_gaps(site_values, msas, 'msa_code', msa_columns) if msa_columns else None],
+                              ignore_index=True)
+        return cls(sites, specialties, zips, msas, df.columns.drop('site_id'), site_gaps)
+
+    @classmethod
+    def from_csv(cls, path=FACILITY_FILE):
+        return cls.from_wide(read_table(path))
+
+    @classmethod
+    def load(cls, model_dir=MODEL_DIR):
+        """Read a model written by save()"""
+        with open(os.path.join(model_dir, 'columns.json'), 'r') as f:
+            columns = json.load(f)
+        tables = {name: read_table(os.path.join(model_dir, f"{name}.csv")) for name in TABLE_NAMES}
+        return cls(tables['sites'], tables['specialties'], tables['zips'], tables['msas'], columns,
+                   tables['site_gaps'])
+
+    def save(self, model_dir=MODEL_DIR):
+        """Write each table through the columnar store"""
+        os.makedirs(model_dir, exist_ok=True)
+        for name in TABLE_NAMES:
+            write_table(getattr(self, name), os.path.join(model_dir, f"{name}.csv"))
+        with open(os.path.join(model_dir, 'columns.json'), 'w') as f:
+            json.dump(self.columns, f, indent=2)
+        return model_dir
+
+    def _join_attributes(self, df, columns):
+        """Left-join the ZIP and MSA columns among columns onto df (which has site_id)"""
+        zip_columns = [column for column in columns if column in self.zips.columns and column != 'zip']
+        if zip_columns and 'zip' in df.columns:
+            df = df.merge(self.zips[['zip'] + zip_columns], on='zip', how='left')
+        msa_columns = [column for column in columns if column in self.msas.columns and column != 'msa_code']
+        if msa_columns and 'msa_code' in df.columns:
+            df = df.merge(self.msas[['msa_code'] + msa_columns], on='msa_code', how='left')
+        # Sites without their ZIP's or MSA's value for a column keep it missing
+        for column, gaps in self.site_gaps.groupby('column', sort=False):
+            if column in df.columns and (column in zip_columns or column in msa_columns):
+                df.loc[df['site_id'].isin(gaps['site_id']), column] = None
+        return df
+
+    def site_view(self, columns=None):
+        """
+        One row per site with the requested site, ZIP and MSA columns, plus
+        facility_type (the site's first listing) and its specialties joined with '; '
+        """
+        columns = list(columns) if columns is not None else self.columns
+        listings = self.specialties.groupby('site_id', sort=False, observed=True)
+        view = self.sites.copy()
+        if 'facility_type' in self.specialties.columns:
+            view['facility_type'] = view['site_id'].map(listings['facility_type'].first())
+        if 'specialty' in self.specialties.columns:
+            view['specialties'] = view['site_id'].map(
+                listings['specialty'].agg(lambda values: '; '.join(values.dropna().astype(str).unique())))
+        view = self._join_attributes(view, columns)
+        keep = ['site_id'] + [column for column in columns if column in view.columns and column != 'site_id']
+        return view[keep + [column for column in ('specialties',) if column in view.columns]]
+
+    def wide_view(self, columns=None):
+        """
+        The original one-row-per-listing table, with only the requested columns
+        (default all, in the original order); only the tables they need are joined
+        """
+        columns = list(columns) if columns is not None else self.columns
+        site_columns = ['site_id'] + [column for column in self.sites.columns
+                                      if column in columns or column in ('zip', 'msa_code')]
+        view = self.specialties.merge(self.sites[site_columns], on='site_id', how='left')
+        view = self._join_attributes(view, columns)
+        return view[[column for column in columns if column in view.columns]]
+
+    def memory_usage(self):
+        """Bytes held by each table (deep)"""
+        return {name: int(getattr(self, name).memory_usage(deep=True).sum()) for name in TABLE_NAMES}
+
+
+def is_model_current(source=FACILITY_FILE, model_dir=MODEL_DIR):
+    """True if the saved model is at least as new as the wide facility table"""
+    marker = os.path.join(model_dir, 'columns.json')
+    tables = [os.path.join(model_dir, f"{name}.csv") for name in TABLE_NAMES]
+    return (os.path.exists(marker) and os.path.exists(source) and all(map(os.path.exists, tables))
+            and os.path.getmtime(marker) >= os.path.getmtime(source))
+
+
+def load_facility_model(source=FACILITY_FILE, model_dir=MODEL_DIR):
+    """The saved model when current, otherwise split (and save) the wide table"""
+    if is_model_current(source, model_dir):
+        return FacilityModel.load(model_dir)
+    model = FacilityModel.from_csv(source)
+    model.save(model_dir)
+    return model
+
+
+def main():
+    """Split the facility table into the normalized model and compare footprints"""
+    print("🏥 SSM Health Normalized Facility Model")
+    print("=" * 50)
+    wide = read_table(FACILITY_FILE)
+    model = FacilityModel.from_wide(wide)
+    model.save()
+    print(f"✅ Saved model to {MODEL_DIR}/")
+
+    usage = model.memory_usage()
+    for name in TABLE_NAMES:
+        table = getattr(model, name)
+        print(f"  {name}: {len(table)} rows x {len(table.columns)} columns, {usage[name] / 1e3:.0f} KB")
+    wide_bytes = wide.memory_usage(deep=True).sum()
+    print(f"  Wide table: {len(wide)} rows x {len(wide.columns)} columns, {wide_bytes / 1e3:.0f} KB")
+    print(f"📉 Normalized footprint is {sum(usage.values()) / wide_bytes:.0%} of the wide table")
+
+    # Columns the data didn't allow at their intended level
+    moved = [column for column in MSA_COLUMNS if column in wide.columns and column not in model.msas.columns]
+    moved += [column for column in ZIP_SCORE_COLUMNS if column in wide.columns and column not in model.zips.columns]
+    if moved:
+        print(f"⚠️ Kept at a finer level because they differ within an MSA or ZIP: {', '.join(moved)}")
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ import numpy as np
 import requests
 import time
 import warnings
+from columnar_store import read_table, write_table
 warnings.filterwarnings('ignore')
 
 class AllZIPDemographicsFetcher:
@@ -276,8 +277,8 @@ class AllZIPDemographicsFetcher:
         print("=" * 70)
         
         # Load the ZIP codes
-        df = pd.read_csv(input_file)
-        zip_codes = df['zip'].astype(str).str.zfill(5).tolist()
+        df = read_table(input_file, float32=False)
+        zip_codes = df['zip'].dropna().tolist()
         
         print(f"📊 Found {len(zip_codes)} ZIP codes to process")
         
@@ -350,7 +351,7 @@ class AllZIPDemographicsFetcher:
         
         # Save the complete dataset
         output_file = 'all_ok_mo_zip_demographics.csv'
-        final_df.to_csv(output_file, index=False)
+        write_table(final_df, output_file)
         
         print(f"✅ Complete demographics data saved to {output_file}")
         print(f"📊 Processed {len(results)} ZIP codes")
@@ -8,6 +8,7 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from analytics_db import msa_rollup
 
 def clean_msa_name(msa_name):
     """Clean MSA names by removing statistical area suffixes"""
@@ -33,40 +34,24 @@ def clean_msa_name(msa_name):
 def create_fixed_market_analysis(csv_file):
     """Create market analysis with correct facilities per 100k calculation"""
     
-    # Load data
-    df = pd.read_csv(csv_file)
-    df = df.dropna(subset=['name', 'city', 'state', 'msa_name', 'msa_population'])
-    
-    # Clean MSA names
-    df['msa_name_clean'] = df['msa_name'].apply(clean_msa_name)
-    
-    print(f"Processing {len(df)} facilities across {df['msa_name_clean'].nunique()} MSAs")
-    
-    # CORRECT calculation: Count facilities per MSA and divide by population
-    msa_facility_counts = df.groupby('msa_name_clean').size().reset_index(name='facility_count')
-    msa_populations = df.groupby('msa_name_clean')['msa_population'].first().reset_index()
-    
-    # Merge facility counts with populations
-    msa_analysis = msa_facility_counts.merge(msa_populations, on='msa_name_clean')
-    
-    # Calculate correct facilities per 100k
-    msa_analysis['facilities_per_100k'] = (msa_analysis['facility_count'] / msa_analysis['msa_population']) * 100000
-    
-    # Add other MSA-level data
-    msa_income = df.groupby('msa_name_clean')['msa_median_household_income'].first().reset_index()
-    msa_age = df.groupby('msa_name_clean')['median_age'].first().reset_index()
-    msa_demographics = df.groupby('msa_name_clean').agg({
-        'pct_under_18': 'first',
-        'pct_18_34': 'first', 
-        'pct_35_54': 'first',
-        'pct_55_64': 'first',
-        'pct_65_plus': 'first'
-    }).reset_index()
-    
-    # Merge all MSA data
-    msa_analysis = msa_analysis.merge(msa_income, on='msa_name_clean')
-    msa_analysis = msa_analysis.merge(msa_age, on='msa_name_clean')
-    msa_analysis = msa_analysis.merge(msa_demographics, on='msa_name_clean')
+    # One indexed rollup query: facility count and the first MSA-level values per
+    # cleaned MSA name, over facilities with a name, location and MSA population
+    msa_analysis = msa_rollup(
+        csv_file,
+        where="name IS NOT NULL AND city IS NOT NULL AND state IS NOT NULL AND msa_population IS NOT NULL",
+        keys={'msa_name_clean': 'clean_msa_name(msa_name)'},
+        functions={'clean_msa_name': clean_msa_name}
+    ).sort_values('msa_name_clean', ignore_index=True)
+    
+    print(f"Processing {msa_analysis['facility_count'].sum()} facilities across {len(msa_analysis)} MSAs")
+    
+    # CORRECT calculation: facilities per MSA divided by its population
+    # (facilities_per_100k = facility_count / msa_population * 100,000, from the rollup)
+    msa_analysis = msa_analysis[[
+        'msa_name_clean', 'facility_count', 'msa_population', 'facilities_per_100k',
+        'msa_median_household_income', 'median_age',
+        'pct_under_18', 'pct_18_34', 'pct_35_54', 'pct_55_64', 'pct_65_plus'
+    ]]
     
     # Categorize market status
     def categorize_market(facilities_per_100k):
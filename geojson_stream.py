@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Streaming GeoJSON Reader/Writer
+Parses a FeatureCollection one feature at a time and writes features back out as
+they are produced, so filtering or joining the national ZCTA extract never holds
+more than a single feature (plus a read buffer) in memory.
+"""
+
+import json
+
+ZIP_PROPERTY_KEYS = ['ZCTA5CE10', 'ZCTA5CE20', 'ZCTA5CE', 'ZIPCODE', 'zip']
+
+_WHITESPACE = ' \t\n\r'
+
+
+def feature_zip(feature, keys=ZIP_PROPERTY_KEYS):
+    """Return the 5-digit ZIP/ZCTA code of a feature, or None"""
+    properties = feature.get('properties') or {}
+    for key in keys:
+        value = properties.get(key)
+        if value:
+            return str(value).zfill(5)
+    return None
+
+
+class _StreamDecoder:
+    """Incremental JSON tokenizer over a text file with a growable buffer"""
+
+    def __init__(self, handle, chunk_size):
+        self.handle = handle
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, min_size=0):
+        """Drop the consumed prefix and read at least one more chunk"""
+        if self.eof:
+            return False
+        chunk = self.handle.read(max(self.chunk_size, min_size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it ('' at EOF)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed GeoJSON: expected {char!r}, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value, reading more input as needed"""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Value is cut off by the buffer end; grow geometrically so a large
+                # feature costs amortized linear time rather than one reparse per chunk
+                if not self._fill(len(self.buffer) - self.pos):
+                    raise
+                continue
+            if end == len(self.buffer) and self._fill():
+                # A number at the buffer edge may continue in the next chunk
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_features(path, chunk_size=1 << 20):
+    """
+    Yield the features of a GeoJSON FeatureCollection one at a time
+
+    Top-level members other than "features" (type, name, crs, ...) are parsed and
+    discarded; they are small. Peak memory is one feature plus the read buffer.
+    """
+    with open(path, 'r') as handle:
+        stream = _StreamDecoder(handle, chunk_size)
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+        while True:
+            key = stream.value()
+            stream.expect(':')
+            if key == 'features':
+                stream.expect('[')
+                if stream.peek() == ']':
+                    stream.pos += 1
+                else:
+                    while True:
+                        yield stream.value()
+                        separator = stream.peek()
+                        stream.pos += 1
+                        if separator == ']':
+                            break
+                        if separator != ',':
+                            raise ValueError(f"Malformed GeoJSON: unexpected {separator!r} in features")
+            else:
+                stream.value()
+            separator = stream.peek()
+            stream.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"Malformed GeoJSON: unexpected {separator!r} after {key!r}")
+
+
+class FeatureCollectionWriter:
+    """
+    Write a FeatureCollection incrementally
+
+    with FeatureCollectionWriter('out.geojson') as writer:
+        for feature in iter_features('in.geojson'):
+            writer.write(feature)
+    """
+
+    def __init__(self, path, **members):
+        self.path = path
+        self.members = members
+        self.count = 0
+        self.handle = None
+
+    def __enter__(self):
+        self.handle = open(self.path, 'w')
+        self.handle.write('{"type": "FeatureCollection", ')
+        for key, value in self.members.items():
+            self.handle.write(f'{json.dumps(key)}: {json.dumps(value)}, ')
+        self.handle.write('"features": [')
+        return self
+
+    def write(self, feature):
+        if self.count:
+            self.handle.write(', ')
+        json.dump(feature, self.handle)
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self.handle.write(']}')
+        self.handle.close()
+        return False
+
+
+def stream_features(input_paths, output_path, predicate=None, transform=None):
+    """
+    Copy features from one or more GeoJSON files into output_path
+
+    predicate(feature) -> bool drops features that return False
+    transform(feature) -> feature applies property joins on the fly
+
+    Returns the number of features written.
+    """
+    if isinstance(input_paths, str):
+        input_paths = [input_paths]
+    with FeatureCollectionWriter(output_path) as writer:
+        for input_path in input_paths:
+            for feature in iter_features(input_path):
+                if predicate is not None and not predicate(feature):
+                    continue
+                if transform is not None:
+                    feature = transform(feature)
+                writer.write(feature)
+    return writer.count
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Compact Binary Geometry Store for ZCTA Polygons
+One-time conversion of a ZIP GeoJSON into flat, memory-mappable arrays:
+  - coords.bin            float64 (x, y) pairs for every vertex, exactly as parsed
+  - ring_offsets.bin      int64 vertex offset of each ring (n_rings + 1)
+  - part_offsets.bin      int64 ring offset of each polygon part (n_parts + 1)
+  - feature_offsets.bin   int64 part offset of each feature (n_features + 1)
+  - geom_types.bin        uint8 geometry type per feature
+  - zcta_codes.bin        sorted 5-byte ZCTA codes, with zcta_features.bin -> feature index
+  - properties.bin        one JSON object per feature, addressed by property_offsets.bin
+Map builders load polygons from the store instead of reparsing GeoJSON text, and
+because the arrays are memory-mapped, every process reading them shares one copy
+in the OS page cache. Callers that only need coordinates (bounds, tiles) can use
+the offset arrays directly; feature_collection() rebuilds the GeoJSON dicts with
+one array-to-list conversion for all vertices.
+"""
+
+import gc
+import json
+import os
+import shutil
+import numpy as np
+from geojson_stream import iter_features, feature_zip
+
+STORE_SUFFIX = '.geostore'
+
+GEOM_NONE = 0
+GEOM_POLYGON = 1
+GEOM_MULTIPOLYGON = 2
+
+# Bumped when the file layout changes, so older stores are rebuilt
+# (format 2: float64 coordinates, which round-trip the GeoJSON exactly)
+STORE_FORMAT = 2
+
+
+def store_path_for(geojson_path):
+    """Default store directory for a GeoJSON file (zipcodes_mo_ok.geojson -> zipcodes_mo_ok.geostore)"""
+    return os.path.splitext(geojson_path)[0] + STORE_SUFFIX
+
+
+def _source_signature(geojson_path):
+    stat = os.stat(geojson_path)
+    return {'source': os.path.abspath(geojson_path), 'source_size': stat.st_size, 'source_mtime': stat.st_mtime}
+
+
+def build_geometry_store(geojson_path, store_dir=None):
+    """
+    Convert a GeoJSON FeatureCollection into a geometry store
+
+    The source is streamed feature by feature, and vertex data is appended to disk
+    as it is read, so the conversion itself never holds the whole file in memory.
+    The store is written beside store_dir and swapped in, so processes still
+    mapping the old files keep reading them intact.
+    """
+    store_dir = store_dir or store_path_for(geojson_path)
+    temp_dir = store_dir + '.tmp'
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    print(f"🗜️ Building geometry store {store_dir} from {geojson_path}...")
+
+    ring_offsets = [0]
+    part_offsets = [0]
+    feature_offsets = [0]
+    property_offsets = [0]
+    geom_types = []
+    zcta_codes = []
+
+    with open(os.path.join(temp_dir, 'coords.bin'), 'wb') as coords_file, \
+            open(os.path.join(temp_dir, 'properties.bin'), 'wb') as properties_file:
+        for feature in iter_features(geojson_path):
+            geometry = feature.get('geometry') or {}
+            geom_type = geometry.get('type')
+            if geom_type == 'Polygon':
+                parts = [geometry['coordinates']]
+                geom_types.append(GEOM_POLYGON)
+            elif geom_type == 'MultiPolygon':
+                parts = geometry['coordinates']
+                geom_types.append(GEOM_MULTIPOLYGON)
+            else:
+                parts = []
+                geom_types.append(GEOM_NONE)
+
+            for part in parts:
+                for ring in part:
+                    ring_array = np.asarray(ring, dtype=np.float64)[:, :2]
+                    ring_array.tofile(coords_file)
+                    ring_offsets.append(ring_offsets[-1] + len(ring_array))
+                part_offsets.append(len(ring_offsets) - 1)
+            feature_offsets.append(len(part_offsets) - 1)
+
+            encoded = json.dumps(feature.get('properties') or {}).encode('utf-8')
+            properties_file.write(encoded)
+            property_offsets.append(property_offsets[-1] + len(encoded))
+
+            zcta_codes.append(feature_zip(feature) or '')
+
+    np.asarray(ring_offsets, dtype=np.int64).tofile(os.path.join(temp_dir, 'ring_offsets.bin'))
+    np.asarray(part_offsets, dtype=np.int64).tofile(os.path.join(temp_dir, 'part_offsets.bin'))
+    np.asarray(feature_offsets, dtype=np.int64).tofile(os.path.join(temp_dir, 'feature_offsets.bin'))
+    np.asarray(property_offsets, dtype=np.int64).tofile(os.path.join(temp_dir, 'property_offsets.bin'))
+    np.asarray(geom_types, dtype=np.uint8).tofile(os.path.join(temp_dir, 'geom_types.bin'))
+
+    codes = np.asarray(zcta_codes, dtype='S5')
+    order = np.argsort(codes, kind='stable')
+    codes[order].tofile(os.path.join(temp_dir, 'zcta_codes.bin'))
+    order.astype(np.int64).tofile(os.path.join(temp_dir, 'zcta_features.bin'))
+
+    meta = _source_signature(geojson_path)
+    meta.update({
+        'format': STORE_FORMAT,
+        'n_features': len(geom_types),
+        'n_parts': len(part_offsets) - 1,
+        'n_rings': len(ring_offsets) - 1,
+        'n_points': int(ring_offsets[-1])
+    })
+    with open(os.path.join(temp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    old_dir = store_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(store_dir):
+        os.rename(store_dir, old_dir)
+    os.rename(temp_dir, store_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    print(f"  ✅ {meta['n_features']} features, {meta['n_rings']} rings, {meta['n_points']} vertices")
+    return store_dir
+
+
+def is_store_current(geojson_path, store_dir=None):
+    """True if the store exists and was built from the current version of geojson_path"""
+    store_dir = store_dir or store_path_for(geojson_path)
+    meta_path = os.path.join(store_dir, 'meta.json')
+    if not os.path.exists(meta_path) or not os.path.exists(geojson_path):
+        return False
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    signature = _source_signature(geojson_path)
+    return (meta.get('format') == STORE_FORMAT and
+            meta.get('source_size') == signature['source_size'] and
+            meta.get('source_mtime') == signature['source_mtime'])
+
+
+class GeometryStore:
+    def __init__(self, store_dir):
+        """Open a geometry store; all arrays are memory-mapped read-only"""
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, 'meta.json'), 'r') as f:
+            self.meta = json.load(f)
+
+        self.coords = self._map('coords.bin', np.float64, (self.meta['n_points'], 2))
+        self.ring_offsets = self._map('ring_offsets.bin', np.int64)
+        self.part_offsets = self._map('part_offsets.bin', np.int64)
+        self.feature_offsets = self._map('feature_offsets.bin', np.int64)
+        self.property_offsets = self._map('property_offsets.bin', np.int64)
+        self.geom_types = self._map('geom_types.bin', np.uint8)
+        self.zcta_codes = self._map('zcta_codes.bin', 'S5')
+        self.zcta_features = self._map('zcta_features.bin', np.int64)
+        self.properties_blob = self._map('properties.bin', np.uint8)
+
+    def _map(self, name, dtype, shape=None):
+        path = os.path.join(self.store_dir, name)
+        if os.path.getsize(path) == 0:
+            # np.memmap refuses empty files
+            return np.empty(shape or (0,), dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+    def __len__(self):
+        return self.meta['n_features']
+
+    def index_of(self, zcta):
+        """Feature index for a ZCTA code via binary search, or None"""
+        key = str(zcta).zfill(5).encode('ascii')
+        pos = np.searchsorted(self.zcta_codes, key)
+        if pos < len(self.zcta_codes) and self.zcta_codes[pos] == key:
+            return int(self.zcta_features[pos])
+        return None
+
+    def feature_codes(self):
+        """ZCTA code of every feature, in feature order"""
+        codes = np.empty(len(self), dtype='S5')
+        codes[self.zcta_features] = self.zcta_codes
+        return codes
+
+    def feature_bounds(self):
+        """(n_features, 4) float64 array of west, south, east, north; NaN for empty geometries"""
+        bounds = np.full((len(self), 4), np.nan)
+        # A feature's vertices are contiguous: from its first ring's start to the next feature's
+        vertex_offsets = self.ring_offsets[self.part_offsets[self.feature_offsets]]
+        starts = vertex_offsets[:-1]
+        has_points = vertex_offsets[1:] > starts
+        if has_points.any():
+            x = self.coords[:, 0]
+            y = self.coords[:, 1]
+            # reduceat over the starts of non-empty features only, so every slice is non-empty
+            bounds[has_points, 0] = np.minimum.reduceat(x, starts[has_points])
+            bounds[has_points, 1] = np.minimum.reduceat(y, starts[has_points])
+            bounds[has_points, 2] = np.maximum.reduceat(x, starts[has_points])
+            bounds[has_points, 3] = np.maximum.reduceat(y, starts[has_points])
+        return bounds
+
+    def _offset_lists(self):
+        """The offset arrays as Python lists (indexing lists is much faster than memmaps)"""
+        if not hasattr(self, '_offsets'):
+            self._offsets = (self.ring_offsets.tolist(), self.part_offsets.tolist(),
+                             self.feature_offsets.tolist(), self.property_offsets.tolist())
+        return self._offsets
+
+    def _vertex_range(self, index):
+        """First and end vertex of a feature (its vertices are contiguous)"""
+        ring_offsets, part_offsets, feature_offsets, _ = self._offset_lists()
+        return (ring_offsets[part_offsets[feature_offsets[index]]],
+                ring_offsets[part_offsets[feature_offsets[index + 1]]])
+
+    def properties(self, index):
+        start, end = self.property_offsets[index], self.property_offsets[index + 1]
+        return json.loads(self.properties_blob[start:end].tobytes().decode('utf-8'))
+
+    def _geometry(self, index, coords, base):
+        """
+        GeoJSON geometry dict of a feature, slicing its rings out of coords, a
+        list of [x, y] vertices starting at vertex base
+        """
+        geom_type = self.geom_types[index]
+        if geom_type == GEOM_NONE:
+            return None
+        ring_offsets, part_offsets, feature_offsets, _ = self._offset_lists()
+        parts = [
+            [coords[ring_offsets[ring] - base:ring_offsets[ring + 1] - base]
+             for ring in range(part_offsets[part], part_offsets[part + 1])]
+            for part in range(feature_offsets[index], feature_offsets[index + 1])
+        ]
+        if geom_type == GEOM_POLYGON:
+            return {'type': 'Polygon', 'coordinates': parts[0]}
+        return {'type': 'MultiPolygon', 'coordinates': parts}
+
+    def geometry(self, index):
+        """Rebuild the GeoJSON geometry dict of a feature"""
+        start, end = self._vertex_range(index)
+        return self._geometry(index, self.coords[start:end].tolist(), start)
+
+    def feature(self, index):
+        return {'type': 'Feature', 'properties': self.properties(index), 'geometry': self.geometry(index)}
+
+    def features(self, indices=None):
+        """Yield features, optionally restricted to the given indices"""
+        if indices is not None:
+            for index in indices:
+                yield self.feature(index)
+            return
+        # Every feature: convert all vertices and properties in one pass each
+        coords = self.coords.tolist()
+        blob = self.properties_blob.tobytes()
+        property_offsets = self._offset_lists()[3]
+        for index in range(len(self)):
+            properties = json.loads(blob[property_offsets[index]:property_offsets[index + 1]])
+            yield {'type': 'Feature', 'properties': properties, 'geometry': self._geometry(index, coords, 0)}
+
+    def feature_collection(self, zctas=None):
+        """Build a FeatureCollection dict, optionally limited to a set of ZCTA codes"""
+        if zctas is None:
+            indices = None
+        else:
+            indices = sorted(i for i in (self.index_of(z) for z in zctas) if i is not None)
+        # Millions of new vertex lists would otherwise trigger a cyclic GC pass every
+        # few hundred allocations; none of them can form a cycle
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            features = list(self.features(indices))
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return {'type': 'FeatureCollection', 'features': features}
+
+
+def load_feature_collection(geojson_path):
+    """
+    Load a ZIP GeoJSON, preferring its binary geometry store when it is current.
+    Falls back to parsing the GeoJSON text so builders keep working without a store.
+    """
+    if is_store_current(geojson_path):
+        return GeometryStore(store_path_for(geojson_path)).feature_collection()
+    with open(geojson_path, 'r') as f:
+        return json.load(f)
+
+
+def main():
+    """Build geometry stores for the ZIP GeoJSONs used by the map builders"""
+    print("🏥 SSM Health ZCTA Geometry Store Builder")
+    print("=" * 50)
+
+    geojson_files = [
+        'zipcodes_mn_wi_il.geojson',
+        'zipcodes_mn_wi_il_scored.geojson',
+        'zipcodes_mo_ok.geojson'
+    ]
+    for geojson_file in geojson_files:
+        if not os.path.exists(geojson_file):
+            print(f"  ⚠️ {geojson_file} not found, skipping")
+            continue
+        if is_store_current(geojson_file):
+            print(f"  ✅ {store_path_for(geojson_file)} is up to date")
+            continue
+        build_geometry_store(geojson_file)
+
+
+if __name__ == "__main__":
+    main()
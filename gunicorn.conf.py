@@ -0,0 +1,54 @@
+"""
+Gunicorn Settings for the SSM Health Portal
+Loaded automatically by `gunicorn deploy_secure_map:app` from the working
+directory. The app is imported once in the master and forked into the workers,
+and the API tables are written to their memory-mapped store before any worker
+starts, so workers share both the imported code and the table data instead of
+each holding a copy. Map rebuilds run in a separate map_rebuilder.py process.
+"""
+
+import subprocess
+import sys
+
+# Run in the child: ZIP bounds come from the geometry stores, and a store that is
+# missing or stale would be skipped, so those are (re)built first
+BUILD_STORES = """
+import os
+from build_maps import ZIP_GEOJSON_FILES
+from geometry_store import build_geometry_store, is_store_current
+from portal_tables import build_table_store
+for geojson_file in ZIP_GEOJSON_FILES:
+    if os.path.exists(geojson_file) and not is_store_current(geojson_file):
+        build_geometry_store(geojson_file)
+build_table_store()
+"""
+
+# Import the app (Flask, pandas, folium) in the master; workers inherit it copy-on-write
+preload_app = True
+
+
+def on_starting(server):
+    # Worker metrics snapshots from a previous run would be merged into this one's
+    from portal_metrics import clear_snapshots
+    clear_snapshots()
+
+    # Built in a child process so the master never holds the pandas frames the
+    # tables are loaded from (those pages would otherwise be copied into every
+    # worker as soon as reference counting touched them)
+    result = subprocess.run([sys.executable, '-c', BUILD_STORES])
+    if result.returncode != 0:
+        server.log.warning("Could not build the API table store; workers will load the tables themselves")
+
+
+def when_ready(server):
+    # Maps are rebuilt by a sidecar, never by the master or a worker, so
+    # startup and requests never wait on a build
+    from map_rebuilder import start_background_rebuilder
+    server.map_rebuilder = start_background_rebuilder()
+    server.log.info("Started map rebuilder (pid %s)", server.map_rebuilder.pid)
+
+
+def on_exit(server):
+    rebuilder = getattr(server, 'map_rebuilder', None)
+    if rebuilder is not None and rebuilder.poll() is None:
+        rebuilder.terminate()
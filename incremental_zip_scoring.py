@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Incremental ZIP Attractiveness Re-scoring
+Keeps sorted component arrays so refreshed or newly added ZIP demographics can be
+re-ranked with binary search instead of re-ranking the whole table, and emits a
+delta of the ZIPs whose scores actually moved so downstream GeoJSON and map
+regeneration can be limited to them.
+"""
+
+import pandas as pd
+import numpy as np
+from score_all_zip_demographics import AllZIPAttractivenessScorer
+from attractiveness_bins import categorize_scores
+from columnar_store import read_table, write_table
+
+
+def _normalize_zip_index(df):
+    """Index a demographics table (ZIPs typed by read_table) by ZIP, last row wins on duplicates"""
+    df = df.drop_duplicates('zip', keep='last')
+    return df.set_index('zip')
+
+
+def _merge_intervals(lows, highs):
+    """Merge [low, high] intervals into a sorted, non-overlapping set"""
+    order = np.argsort(lows)
+    lows, highs = lows[order], highs[order]
+    merged_lows, merged_highs = [lows[0]], [highs[0]]
+    for low, high in zip(lows[1:], highs[1:]):
+        if low <= merged_highs[-1]:
+            merged_highs[-1] = max(merged_highs[-1], high)
+        else:
+            merged_lows.append(low)
+            merged_highs.append(high)
+    return np.array(merged_lows), np.array(merged_highs)
+
+
+class IncrementalZIPScorer:
+    def __init__(self, scorer=None, tolerance=0.05):
+        """
+        Initialize the incremental scorer
+
+        tolerance: minimum change in attractiveness score (points) for a ZIP that
+                   was only re-ranked, not edited, to be reported in the delta
+        """
+        self.scorer = scorer or AllZIPAttractivenessScorer()
+        self.tolerance = tolerance
+        self.table = None
+        self.raw = None
+        self.sorted_values = {}
+        self.components = None
+        self.scores = None
+
+    def fit(self, df):
+        """Score the full table once and build the sorted component arrays"""
+        self.table = _normalize_zip_index(df)
+        self.raw = self.scorer.component_raw_values(self.table)
+        self.sorted_values = {
+            component: np.sort(self.raw[component].dropna().to_numpy(dtype=float))
+            for component in self.raw.columns
+        }
+        self.components = pd.DataFrame(index=self.table.index, columns=self.raw.columns, dtype=float)
+        self.scores = pd.Series(np.nan, index=self.table.index)
+        self._rescore(self.table.index)
+        return self.scores
+
+    def percentile_ranks(self, component, values):
+        """
+        Percentile rank (0-100) of values within the maintained sorted array.
+        Matches Series.rank(pct=True, method='average'): ties share the mean rank.
+        """
+        sorted_values = self.sorted_values[component]
+        values = np.asarray(values, dtype=float)
+        below = np.searchsorted(sorted_values, values, side='left')
+        at_or_below = np.searchsorted(sorted_values, values, side='right')
+        ranks = (below + (at_or_below - below + 1) / 2) / max(len(sorted_values), 1) * 100
+        ranks[np.isnan(values)] = np.nan
+        return ranks
+
+    def _rescore(self, zips):
+        """Recompute component and composite scores for the given ZIPs only"""
+        rows = self.table.loc[zips]
+        percentiles = {
+            component: self.percentile_ranks(component, self.raw.loc[zips, component])
+            for component in self.raw.columns
+        }
+        matrix = self.scorer.component_score_matrix(rows, percentiles)
+        weights = np.array([self.scorer.weights[c] for c in self.raw.columns])
+        self.components.loc[zips] = matrix
+        self.scores.loc[zips] = np.clip(matrix @ weights, 0, 100)
+
+    def _replace_sorted_values(self, component, old_values, new_values):
+        """Remove old values from and insert new values into one sorted array"""
+        sorted_values = self.sorted_values[component]
+        old_values = np.sort(old_values[~np.isnan(old_values)])
+        if len(old_values):
+            # Equal values removed together need distinct positions within their run
+            positions = np.searchsorted(sorted_values, old_values, side='left')
+            positions += np.arange(len(old_values)) - np.searchsorted(old_values, old_values, side='left')
+            sorted_values = np.delete(sorted_values, positions)
+        new_values = np.sort(new_values[~np.isnan(new_values)])
+        if len(new_values):
+            sorted_values = np.insert(sorted_values, np.searchsorted(sorted_values, new_values), new_values)
+        self.sorted_values[component] = sorted_values
+
+    def update(self, changed_df):
+        """
+        Apply refreshed or inserted ZIP rows and re-score only what they affect
+
+        Columns missing from changed_df keep their previous values. When the number
+        of ranked ZIPs is unchanged, only ZIPs whose raw value lies between an edited
+        row's old and new value change rank. Inserts (or values appearing/disappearing)
+        change the denominator of every percentile, so they re-rank the whole
+        component, still by binary search rather than a full sort.
+
+        Returns a DataFrame delta with one row per ZIP whose score changed.
+        """
+        if self.table is None:
+            raise ValueError("fit() must be called before update()")
+
+        changed = _normalize_zip_index(changed_df)
+        existing = changed.index.intersection(self.table.index)
+        inserted = changed.index.difference(self.table.index)
+
+        carried = self.table.columns.difference(changed.columns)
+        merged = changed.join(self.table.reindex(changed.index)[carried])
+        old_raw = self.raw.reindex(changed.index)
+        new_raw = self.scorer.component_raw_values(merged)
+
+        columns = self.table.columns.append(changed.columns.difference(self.table.columns))
+        order = self.table.index.append(inserted)
+        self.table = pd.concat([self.table.drop(existing), merged]).reindex(index=order, columns=columns)
+        self.raw = pd.concat([self.raw.drop(existing), new_raw]).reindex(order)
+        self.components = self.components.reindex(order)
+        old_scores = self.scores.copy()
+        self.scores = self.scores.reindex(order)
+
+        affected = pd.Index(changed.index)
+        for component in self.raw.columns:
+            old_values = old_raw[component].to_numpy(dtype=float)
+            new_values = new_raw[component].to_numpy(dtype=float)
+            count_before = len(self.sorted_values[component])
+            self._replace_sorted_values(component, old_values, new_values)
+
+            values = self.raw[component]
+            gained_or_lost = np.isnan(old_values) != np.isnan(new_values)
+            if len(self.sorted_values[component]) != count_before or gained_or_lost.any():
+                affected = affected.union(values.dropna().index)
+                continue
+
+            # Same denominator: only values inside an (old, new) interval change rank
+            moved = (old_values != new_values) & ~np.isnan(old_values)
+            if not moved.any():
+                continue
+            lows = np.fmin(old_values[moved], new_values[moved])
+            highs = np.fmax(old_values[moved], new_values[moved])
+            lows, highs = _merge_intervals(lows, highs)
+            candidate = values.to_numpy(dtype=float)
+            slot = np.searchsorted(lows, candidate, side='right') - 1
+            inside = (slot >= 0) & (candidate <= highs[np.clip(slot, 0, None)])
+            affected = affected.union(values.index[inside])
+
+        self._rescore(affected)
+
+        new_scores = self.scores.loc[affected]
+        previous = old_scores.reindex(affected)
+        old_categories, _ = categorize_scores(previous)
+        new_categories, new_colors = categorize_scores(new_scores)
+        delta = pd.DataFrame({
+            'zip': affected,
+            'change_type': np.where(affected.isin(inserted), 'inserted',
+                                    np.where(affected.isin(existing), 'updated', 'reranked')),
+            'old_score': previous.to_numpy(),
+            'attractiveness_score': new_scores.to_numpy(),
+            'old_category': np.where(previous.isna(), None, np.asarray(old_categories, dtype=object)),
+            'attractiveness_category': np.asarray(new_categories, dtype=object),
+            'attractiveness_color': new_colors
+        })
+        score_change = (delta['attractiveness_score'] - delta['old_score']).abs()
+        keep = (
+            (delta['change_type'] != 'reranked') |
+            (score_change > self.tolerance) |
+            (delta['old_category'] != delta['attractiveness_category'])
+        )
+        return delta[keep].reset_index(drop=True)
+
+    def scored_table(self):
+        """Return the full table in the same layout as score_all_zip_demographics"""
+        df = self.table.copy()
+        df['attractiveness_score'] = self.scores
+        categories, colors = categorize_scores(self.scores)
+        df['attractiveness_category'] = categories
+        df['attractiveness_color'] = colors
+        df['density_score'] = self.components['population_density']
+        df['growth_score'] = self.components['population_growth']
+        df['senior_score'] = self.components['senior_population']
+        df['income_score'] = self.components['income_level']
+        df['young_family_score'] = self.components['young_family']
+        df['senior_population_pct'] = self.raw['senior_population']
+        df['young_family_pct'] = self.raw['young_family']
+        return df.reset_index()
+
+
+def main(base_file='all_ok_mo_zip_demographics.csv',
+         refreshed_file='refreshed_zip_demographics.csv',
+         output_file='all_ok_mo_zip_demographics_scored.csv',
+         delta_file='zip_score_delta.csv'):
+    """Re-score a demographics table after a partial refresh"""
+    print("🏥 SSM Health Incremental ZIP Attractiveness Re-scoring")
+    print("=" * 55)
+
+    scorer = IncrementalZIPScorer()
+    base = read_table(base_file, float32=False)
+    scorer.fit(base)
+    print(f"📊 Indexed {len(scorer.table)} ZIP codes from {base_file}")
+
+    refreshed = read_table(refreshed_file, float32=False)
+    print(f"🔄 Applying {len(refreshed)} refreshed rows from {refreshed_file}...")
+    delta = scorer.update(refreshed)
+
+    write_table(scorer.scored_table(), output_file)
+    delta.to_csv(delta_file, index=False)
+
+    print(f"✅ Scored data saved to {output_file}")
+    print(f"✅ {len(delta)} changed ZIP codes saved to {delta_file}")
+    for change_type, count in delta['change_type'].value_counts().items():
+        print(f"  {change_type}: {count}")
+
+
+if __name__ == "__main__":
+    main()
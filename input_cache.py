@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Shared Map Input Cache
+In-process cache for the CSV and Excel inputs read by the map builders. Each
+file is parsed once per process (keyed on path, size, mtime and read options)
+and callers get their own copy, so builders can keep mutating what they read.
+build_maps.py preloads the cache before forking its worker processes, so the
+comprehensive, market-share and overlay builds all share one parse.
+Pipeline tables go through read_table, which reads the columnar store's
+Parquet copy when it is current and only the requested columns. Every frame
+comes back with the table_schema dtypes (zero-padded ZIP strings, categoricals,
+float32 scores).
+"""
+
+import os
+import columnar_store
+import table_schema
+
+_frames = {}
+
+
+def _cache_key(kind, path, kwargs):
+    stat = os.stat(path)  # raises FileNotFoundError like pandas would
+    # repr, so unhashable options such as a dtype dict can be part of the key
+    return (kind, os.path.abspath(path), stat.st_size, stat.st_mtime,
+            tuple(sorted((name, repr(value)) for name, value in kwargs.items())))
+
+
+def _read(kind, reader, path, kwargs):
+    key = _cache_key(kind, path, kwargs)
+    if key not in _frames:
+        _frames[key] = reader(path, **kwargs)
+    return _frames[key].copy()
+
+
+def read_csv(path, **kwargs):
+    """pd.read_csv through the cache, typed by table_schema"""
+    return _read('csv', table_schema.read_csv, path, kwargs)
+
+
+def read_excel(path, **kwargs):
+    """pd.read_excel through the cache, typed by table_schema"""
+    return _read('excel', table_schema.read_excel, path, kwargs)
+
+
+def read_table(path, columns=None, **kwargs):
+    """columnar_store.read_table through the cache, keyed on the file actually read"""
+    source = columnar_store.table_source(path)
+    key = _cache_key('table', source, dict(kwargs, columns=tuple(columns) if columns is not None else None))
+    if key not in _frames:
+        _frames[key] = columnar_store.read_table(path, columns=columns, **kwargs)
+    return _frames[key].copy()
+
+
+def preload(csv_files=(), excel_files=(), tables=()):
+    """
+    Parse the given inputs into the cache, skipping files that don't exist
+
+    tables: (path, columns) pairs read with read_table
+    """
+    loaded = 0
+    for path, columns in tables:
+        if os.path.exists(path) or os.path.exists(columnar_store.parquet_path_for(path)):
+            read_table(path, columns=columns)
+            loaded += 1
+    for path, kwargs in csv_files:
+        if os.path.exists(path):
+            read_csv(path, **kwargs)
+            loaded += 1
+    for path in excel_files:
+        if os.path.exists(path):
+            read_excel(path)
+            loaded += 1
+    return loaded
+
+
+def clear():
+    _frames.clear()
@@ -13,6 +13,7 @@ from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut
 import time
 import warnings
+from facility_categorizer import TYPE_CATEGORIES
 warnings.filterwarnings('ignore')
 
 class InteractiveFacilityMapper:
@@ -35,7 +36,7 @@ class InteractiveFacilityMapper:
         self.df['specialty'] = self.df['specialty'].fillna('General')
         
         # Create facility categories for better visualization
-        self.df['facility_category'] = self.df['type'].apply(self.categorize_facility)
+        self.df['facility_category'] = TYPE_CATEGORIES.categorize(type=self.df['type'])
         
         # Calculate facilities per 100k population
         self.df['facilities_per_100k'] = (1 / self.df['msa_population']) * 100000
@@ -57,31 +58,7 @@ class InteractiveFacilityMapper:
     
     def categorize_facility(self, facility_type):
         """Categorize facility types for visualization"""
-        if pd.isna(facility_type):
-            return 'Unknown'
-        
-        facility_type = str(facility_type).lower()
-        
-        if any(word in facility_type for word in ['hospital', 'medical center']):
-            return 'Hospital'
-        elif any(word in facility_type for word in ['urgent', 'express', 'walk']):
-            return 'Urgent Care'
-        elif any(word in facility_type for word in ['pharmacy', 'prescription']):
-            return 'Pharmacy'
-        elif any(word in facility_type for word in ['imaging', 'radiology', 'mammography']):
-            return 'Imaging'
-        elif any(word in facility_type for word in ['laboratory', 'lab']):
-            return 'Laboratory'
-        elif any(word in facility_type for word in ['therapy', 'rehabilitation']):
-            return 'Therapy'
-        elif any(word in facility_type for word in ['cancer', 'oncology']):
-            return 'Cancer Care'
-        elif any(word in facility_type for word in ['eye', 'ophthalmology']):
-            return 'Eye Care'
-        elif any(word in facility_type for word in ['hospice']):
-            return 'Hospice'
-        else:
-            return 'Primary Care'
+        return TYPE_CATEGORIES(type=facility_type)
     
     def categorize_market(self, facilities_per_100k):
         """Categorize market status"""
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+External Map Layer Assets
+Writes map layer data (ZCTA geometry, per-map ZIP styling/popups, facility
+markers) to content-hashed JSON files with gzip-precompressed copies, and
+provides folium layers that fetch them asynchronously. The map HTML becomes a
+small shell; layers shared between the portal maps (the ZCTA geometry) have
+identical content, hence identical file names, so the browser downloads them
+once and reuses them from cache.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from folium.map import Layer
+from jinja2 import Template
+from geojson_stream import feature_zip
+
+# Directory the assets are written to, served by deploy_secure_map.py under /layers/
+LAYER_ASSET_DIR = 'map_layers'
+LAYER_ASSET_URL = 'layers'
+
+# Builders write external layer files instead of inlining data when MAP_EXTERNAL_LAYERS=1
+EXTERNAL_LAYERS = os.environ.get('MAP_EXTERNAL_LAYERS', '0') == '1'
+
+# Length of the content hash embedded in asset file names
+HASH_LENGTH = 16
+
+
+def write_layer_asset(name, data, asset_dir=LAYER_ASSET_DIR):
+    """
+    Write data as <name>.<hash>.json plus a .json.gz copy and return its URL
+
+    Files are only written when that content does not exist yet, so unchanged
+    layers keep their name (and the browser's cached copy) across rebuilds.
+    """
+    payload = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(payload).hexdigest()[:HASH_LENGTH]
+    filename = f"{name}.{digest}.json"
+    os.makedirs(asset_dir, exist_ok=True)
+    path = os.path.join(asset_dir, filename)
+    if not os.path.exists(path + '.gz'):
+        # Written under temporary names and renamed, so a concurrent build or
+        # request never sees a partial file; the .gz lands last as the marker
+        for target, content in [(path, payload), (path + '.gz', gzip.compress(payload, compresslevel=9, mtime=0))]:
+            with open(target + '.tmp', 'wb') as f:
+                f.write(content)
+            os.replace(target + '.tmp', target)
+    return f"{LAYER_ASSET_URL}/{filename}"
+
+
+def zcta_geometry_asset(feature_collection, name):
+    """
+    Write a geometry-only copy of a ZIP FeatureCollection (properties reduced to
+    the ZCTA code) so every map drawing these polygons shares one asset
+    """
+    geometry_only = {
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'properties': {'zcta': feature_zip(feature)}, 'geometry': feature.get('geometry')}
+            for feature in feature_collection['features']
+        ]
+    }
+    return write_layer_asset(name, geometry_only)
+
+
+class ExternalZCTALayer(Layer):
+    """
+    ZCTA polygons loaded from a shared geometry asset and joined in the browser
+    with a per-map properties asset: {zcta: {style, popup, tooltip}}.
+    ZCTAs without an entry in the properties asset are not drawn.
+    """
+
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = L.featureGroup();
+        {% if this.show %}{{ this.get_name() }}.addTo({{ this._parent.get_name() }});{% endif %}
+        Promise.all([
+            fetch({{ this.geometry_url|tojson }}).then(function(r) { return r.json(); }),
+            fetch({{ this.properties_url|tojson }}).then(function(r) { return r.json(); })
+        ]).then(function(results) {
+            var geometry = results[0], properties = results[1];
+            var highlight = {{ this.highlight|tojson }};
+            L.geoJSON(geometry, {
+                filter: function(feature) { return feature.properties.zcta in properties; },
+                style: function(feature) { return properties[feature.properties.zcta].style; },
+                onEachFeature: function(feature, layer) {
+                    var p = properties[feature.properties.zcta];
+                    if (p.popup) { layer.bindPopup(p.popup, {maxWidth: {{ this.popup_max_width }}}); }
+                    if (p.tooltip) { layer.bindTooltip(p.tooltip, {sticky: true}); }
+                    if (highlight) {
+                        layer.on('mouseover', function() { layer.setStyle(highlight); });
+                        layer.on('mouseout', function() { layer.setStyle(p.style); });
+                    }
+                }
+            }).addTo({{ this.get_name() }});
+        });
+        {% endmacro %}
+    """)
+
+    def __init__(self, geometry_url, properties_url, name=None, highlight=None,
+                 popup_max_width=400, overlay=True, control=True, show=True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = 'ExternalZCTALayer'
+        self.geometry_url = geometry_url
+        self.properties_url = properties_url
+        self.highlight = highlight
+        self.popup_max_width = popup_max_width
+
+
+class ExternalMarkerLayer(Layer):
+    """
+    Markers loaded from an asset holding a list of
+    {lat, lng, popup, tooltip, max_width, icon}, where icon is either
+    {html, size, anchor} for a DivIcon or {color, icon} for an awesome marker
+    """
+
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = L.featureGroup();
+        {% if this.show %}{{ this.get_name() }}.addTo({{ this._parent.get_name() }});{% endif %}
+        fetch({{ this.url|tojson }}).then(function(r) { return r.json(); }).then(function(markers) {
+            markers.forEach(function(m) {
+                var icon = m.icon.html
+                    ? L.divIcon({html: m.icon.html, iconSize: m.icon.size, iconAnchor: m.icon.anchor, className: 'empty'})
+                    : L.AwesomeMarkers.icon({icon: m.icon.icon, markerColor: m.icon.color, iconColor: 'white', prefix: 'glyphicon'});
+                var marker = L.marker([m.lat, m.lng], {icon: icon});
+                if (m.popup) { marker.bindPopup(m.popup, {maxWidth: m.max_width || 300}); }
+                if (m.tooltip) { marker.bindTooltip(m.tooltip); }
+                marker.addTo({{ this.get_name() }});
+            });
+        });
+        {% endmacro %}
+    """)
+
+    def __init__(self, url, name=None, overlay=True, control=True, show=True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = 'ExternalMarkerLayer'
+        self.url = url
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Background Map Rebuilder
+Sidecar process that keeps the portal maps current without blocking the web
+server. It polls the map inputs (data files, builder code) and whenever any of
+them changed runs build_all_maps(), which rebuilds only the affected maps and
+swaps each one in atomically, then refreshes the API table store. Requests keep
+getting the previous complete map until the new one is in place.
+
+Started by gunicorn.conf.py and by deploy_secure_map.py's dev server; can also
+be run on its own. A lock file keeps it to one rebuilder per directory.
+"""
+
+import fcntl
+import os
+import subprocess
+import sys
+import time
+from build_maps import MAP_BUILDS, SHARED_CODE, build_all_maps
+
+# Seconds between input checks
+REBUILD_INTERVAL = int(os.environ.get('MAP_REBUILD_INTERVAL', 300))
+
+LOCK_FILE = 'map_rebuild.lock'
+
+
+def watched_files():
+    """Every file a map build depends on"""
+    files = set(SHARED_CODE)
+    for build in MAP_BUILDS.values():
+        files.update(build['inputs'])
+        files.add(build['module'] + '.py')
+    return sorted(files)
+
+
+def files_signature(paths):
+    """(size, mtime) per path, None if missing: cheap enough to poll, unlike build_maps' content hashes"""
+    signature = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature[path] = (stat.st_size, stat.st_mtime)
+        except FileNotFoundError:
+            signature[path] = None
+    return signature
+
+
+def acquire_lock(path=LOCK_FILE):
+    """Open and exclusively lock path; returns the open file, or None if another rebuilder holds it"""
+    lock_file = open(path, 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    return lock_file
+
+
+def rebuild():
+    """Rebuild stale maps, then the API table store; failures are reported, not raised"""
+    try:
+        results = build_all_maps()
+        print("🗺️ Maps: " + ", ".join(f"{name} {status}" for name, status in results.items()))
+    except Exception as e:
+        print(f"⚠️ Warning: Could not build maps: {e}")
+    try:
+        from portal_tables import build_table_store
+        build_table_store()
+    except Exception as e:
+        print(f"⚠️ Warning: Could not build API table store: {e}")
+
+
+def run(interval=REBUILD_INTERVAL, once=False):
+    """Rebuild now, then again whenever the watched inputs change"""
+    lock = acquire_lock()
+    if lock is None:
+        print("⏭️ Another map rebuilder is running, exiting")
+        return
+    try:
+        last_signature = None
+        while True:
+            signature = files_signature(watched_files())
+            if signature != last_signature:
+                rebuild()
+                last_signature = signature
+            if once:
+                return
+            time.sleep(interval)
+    finally:
+        lock.close()
+
+
+def start_background_rebuilder():
+    """Launch the rebuilder as a child process and return its Popen"""
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__)])
+
+
+def main():
+    """Run the rebuilder in the foreground"""
+    print("🏥 SSM Health Background Map Rebuilder")
+    print("=" * 50)
+    print(f"👀 Checking map inputs every {REBUILD_INTERVAL}s")
+    run()
+
+
+if __name__ == "__main__":
+    main()
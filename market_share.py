@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Vectorized Market Share Engine for the 2024 Inpatient Market Share Extracts
+The competitor and overlay maps, the vector tiles and the portal tables all
+turn the extracts' discharge records into per-ZIP system shares. MarketShares
+does it once, as array operations:
+  - discharges are counted per (ZIP, system) with one groupby, which gives a
+    sparse ZIP x system matrix in coordinate form (zip_index, system_index,
+    counts), sorted by ZIP
+  - shares, HHI (sum of squared shares, 0-10,000), the dominant system and the
+    SSM Health share are per-ZIP sums and maxima over that matrix
+    (np.bincount / lexsort), one array entry per ZIP
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from input_cache import read_excel
+
+MARKET_SHARE_FILES = {
+    'STL/SoIL': 'STL_SoIL_2024IP_MktShare.xlsx',
+    'Wisconsin': 'WI_2024IP_MktShare.xlsx',
+    'Oklahoma': 'OK_2024IP_MktShare.xlsx'
+}
+
+ZIP_COLUMN = 'Zip Code'
+SYSTEM_COLUMN = 'Hospital System'
+
+
+def load_market_records(files=MARKET_SHARE_FILES):
+    """All extracts' discharge records with a Region column; missing files are skipped"""
+    frames = []
+    for region, path in files.items():
+        if os.path.exists(path):
+            df = read_excel(path)
+            df['Region'] = region
+            frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=[ZIP_COLUMN, SYSTEM_COLUMN, 'Region'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def is_ssm_system(systems):
+    """True for SSM Health system names (array)"""
+    return np.array(['SSM' in str(system).upper() for system in systems], dtype=bool)
+
+
+class MarketShares:
+    """
+    Per-ZIP system shares as a sparse ZIP x system matrix
+
+    zips, systems: sorted ZIP codes and system names
+    zip_index, system_index, counts, shares: one entry per (ZIP, system) with
+        discharges, sorted by ZIP and then system
+    totals, hhi, dominant, ssm_share: one entry per ZIP
+    """
+
+    def __init__(self, zips, systems, zip_index, system_index, counts):
+        self.zips = zips
+        self.systems = systems
+        self.zip_index = zip_index
+        self.system_index = system_index
+        self.counts = counts
+        self.zip_position = {zip_code: position for position, zip_code in enumerate(zips)}
+
+        n = len(zips)
+        self.totals = np.bincount(zip_index, weights=counts, minlength=n)
+        self.shares = counts / self.totals[zip_index] if n else np.zeros(0)
+        self.hhi = np.bincount(zip_index, weights=self.shares ** 2, minlength=n) * 10000
+        ssm = is_ssm_system(systems)[system_index] if len(systems) else np.zeros(0, dtype=bool)
+        self.ssm_share = np.bincount(zip_index, weights=np.where(ssm, self.shares, 0.0), minlength=n)
+
+        # Largest count per ZIP; ties go to the alphabetically first system
+        order = np.lexsort((system_index, -counts, zip_index))
+        firsts = order[np.unique(zip_index[order], return_index=True)[1]]
+        self.dominant = systems[system_index[firsts]] if n else np.array([], dtype=object)
+
+        # Entries of ZIP p are starts[p]:starts[p + 1]
+        self.starts = np.searchsorted(zip_index, np.arange(n + 1))
+
+    @classmethod
+    def from_records(cls, records, consolidate_ssm=False):
+        """
+        Shares from discharge records (one row each, with Zip Code and Hospital
+        System); rows missing either are left out
+
+        consolidate_ssm: count every SSM system as one 'SSM Health'
+        """
+        records = records.dropna(subset=[ZIP_COLUMN, SYSTEM_COLUMN])
+        systems = records[SYSTEM_COLUMN].to_numpy()
+        if consolidate_ssm:
+            codes, names = pd.factorize(systems)
+            systems = np.where(is_ssm_system(names), 'SSM Health', np.asarray(names, dtype=object))[codes]
+        counts = pd.DataFrame({'zip': records[ZIP_COLUMN].to_numpy(), 'system': systems})
+        counts = counts.groupby(['zip', 'system']).size()
+        zip_index, zips = pd.factorize(counts.index.get_level_values('zip'), sort=True)
+        system_index, system_names = pd.factorize(counts.index.get_level_values('system'), sort=True)
+        return cls(np.asarray(zips, dtype=object), np.asarray(system_names, dtype=object),
+                   zip_index.astype(np.int64), system_index.astype(np.int64), counts.to_numpy(dtype=float))
+
+    @classmethod
+    def load(cls, files=MARKET_SHARE_FILES, consolidate_ssm=False):
+        return cls.from_records(load_market_records(files), consolidate_ssm)
+
+    def breakdown(self, position):
+        """[(system, share)] of the ZIP at position, largest share first"""
+        entries = np.arange(self.starts[position], self.starts[position + 1])
+        entries = entries[np.argsort(-self.shares[entries], kind='stable')]
+        return [(self.systems[self.system_index[entry]], self.shares[entry]) for entry in entries]
+
+    def summary(self):
+        """One row per ZIP: zip, dominant_system, hhi, ssm_market_share"""
+        return pd.DataFrame({'zip': self.zips, 'dominant_system': self.dominant,
+                             'hhi': self.hhi, 'ssm_market_share': self.ssm_share})
+
+    def entries(self):
+        """One row per (zip, system) with discharges: zip, system, count, share"""
+        return pd.DataFrame({'zip': self.zips[self.zip_index], 'system': self.systems[self.system_index],
+                             'count': self.counts.astype(np.int64), 'share': self.shares})
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 """
 Merge Minnesota, Wisconsin, and Illinois ZIP code GeoJSONs into a single file.
+Features are streamed one at a time, so the merged file is never held in memory.
 """
-import json
+from geojson_stream import stream_features
 
 # Input files
 files = [
@@ -11,18 +12,6 @@ files = [
     'zipcodes_il.geojson',
 ]
 
-all_features = []
-for f in files:
-    with open(f, 'r') as infile:
-        data = json.load(infile)
-        all_features.extend(data['features'])
+feature_count = stream_features(files, 'zipcodes_mn_wi_il.geojson')
 
-merged = {
-    "type": "FeatureCollection",
-    "features": all_features
-}
-
-with open('zipcodes_mn_wi_il.geojson', 'w') as outfile:
-    json.dump(merged, outfile)
-
-print(f"✅ Merged {len(all_features)} ZIP polygons into zipcodes_mn_wi_il.geojson") 
\ No newline at end of file
+print(f"✅ Merged {feature_count} ZIP polygons into zipcodes_mn_wi_il.geojson") 
\ No newline at end of file
@@ -5,6 +5,22 @@ Generate a detailed analysis report of the MSA data added to SSM health location
 
 import pandas as pd
 import numpy as np
+from analytics_db import msa_rollup, query, table_name_for
+
+VALID_MSA_SOURCE = 'Geography_MSA_ZIP_2018.csv'
+
+
+def extract_state(address):
+    """State from an 'street, city, ST zip' address (SQL function in the report queries)"""
+    if pd.isna(address):
+        return 'Unknown'
+    parts = address.split(',')
+    if len(parts) >= 3:
+        state_zip = parts[2].strip()
+        state = state_zip[:2].strip()
+        return state
+    return 'Unknown'
+
 
 def generate_msa_report(csv_path: str):
     """
@@ -16,41 +32,41 @@ def generate_msa_report(csv_path: str):
     print("SSM Health Locations MSA Analysis Report")
     print("="*60)
     
-    # Load the enhanced data
-    df = pd.read_csv(csv_path)
+    # Each section is one aggregate query over the indexed analytics database
+    table = table_name_for(csv_path)
+    def run(sql, params=(VALID_MSA_SOURCE,)):
+        return query(sql, params, tables=[csv_path], functions={'extract_state': extract_state})
     
-    print(f"Total SSM Health Locations: {len(df):,}")
-    print(f"Locations with MSA data: {len(df[df['msa_source'] == 'Geography_MSA_ZIP_2018.csv']):,}")
-    print(f"Match rate: {len(df[df['msa_source'] == 'Geography_MSA_ZIP_2018.csv'])/len(df)*100:.1f}%")
+    counts = run(f"SELECT COUNT(*) AS total, TOTAL(msa_source = ?) AS valid FROM {table}").iloc[0]
+    total_locations, valid_locations = int(counts['total']), int(counts['valid'])
     
-    # Filter to only locations with valid MSA data
-    valid_msa_df = df[df['msa_source'] == 'Geography_MSA_ZIP_2018.csv'].copy()
+    print(f"Total SSM Health Locations: {total_locations:,}")
+    print(f"Locations with MSA data: {valid_locations:,}")
+    print(f"Match rate: {valid_locations/total_locations*100:.1f}%")
     
     print(f"\n{'='*60}")
     print("TOP 15 METROPOLITAN STATISTICAL AREAS")
     print("="*60)
     
     # Top MSAs by number of locations
-    top_msas = valid_msa_df['msa_name'].value_counts().head(15)
+    msa_summary = msa_rollup(csv_path, where="msa_source = ?", params=(VALID_MSA_SOURCE,))
+    top_msas = msa_summary.head(15)
     
     print(f"{'Rank':<4} {'MSA Name':<50} {'Locations':<12} {'Total Pop (2016)':<15} {'Avg Pop/Location':<15}")
     print("-" * 100)
     
-    for rank, (msa_name, location_count) in enumerate(top_msas.items(), 1):
-        msa_data = valid_msa_df[valid_msa_df['msa_name'] == msa_name]
-        total_pop = msa_data['population_2016'].sum()
-        avg_pop = msa_data['population_2016'].mean()
-        
-        print(f"{rank:<4} {msa_name:<50} {location_count:<12} {total_pop:>12,.0f} {avg_pop:>14,.0f}")
+    for rank, row in enumerate(top_msas.itertuples(), 1):
+        print(f"{rank:<4} {row.msa_name:<50} {row.facility_count:<12} {row.total_population:>12,.0f} {row.avg_population:>14,.0f}")
     
     print(f"\n{'='*60}")
     print("POPULATION ANALYSIS")
     print("="*60)
     
-    # Population statistics
-    pop_stats = valid_msa_df['population_2016'].describe()
+    # Population statistics (median and std need the values themselves)
+    population = run(f"SELECT population_2016 FROM {table} WHERE msa_source = ?")['population_2016']
+    pop_stats = population.describe()
     
-    print(f"Total population covered: {valid_msa_df['population_2016'].sum():,.0f}")
+    print(f"Total population covered: {population.sum():,.0f}")
     print(f"Average population per location: {pop_stats['mean']:,.0f}")
     print(f"Median population per location: {pop_stats['50%']:,.0f}")
     print(f"Standard deviation: {pop_stats['std']:,.0f}")
@@ -58,56 +74,52 @@ def generate_msa_report(csv_path: str):
     print(f"Maximum population: {pop_stats['max']:,.0f}")
     
     # Population distribution
+    buckets = run(f"""
+        SELECT TOTAL(population_2016 < 10000) AS under_10k,
+               TOTAL(population_2016 >= 10000 AND population_2016 < 25000) AS from_10k,
+               TOTAL(population_2016 >= 25000 AND population_2016 < 50000) AS from_25k,
+               TOTAL(population_2016 >= 50000 AND population_2016 < 100000) AS from_50k,
+               TOTAL(population_2016 >= 100000) AS over_100k
+        FROM {table} WHERE msa_source = ?""").iloc[0]
     print(f"\nPopulation Distribution:")
-    print(f"  < 10,000: {len(valid_msa_df[valid_msa_df['population_2016'] < 10000]):,} locations")
-    print(f"  10,000 - 25,000: {len(valid_msa_df[(valid_msa_df['population_2016'] >= 10000) & (valid_msa_df['population_2016'] < 25000)]):,} locations")
-    print(f"  25,000 - 50,000: {len(valid_msa_df[(valid_msa_df['population_2016'] >= 25000) & (valid_msa_df['population_2016'] < 50000)]):,} locations")
-    print(f"  50,000 - 100,000: {len(valid_msa_df[(valid_msa_df['population_2016'] >= 50000) & (valid_msa_df['population_2016'] < 100000)]):,} locations")
-    print(f"  > 100,000: {len(valid_msa_df[valid_msa_df['population_2016'] >= 100000]):,} locations")
+    print(f"  < 10,000: {buckets['under_10k']:,.0f} locations")
+    print(f"  10,000 - 25,000: {buckets['from_10k']:,.0f} locations")
+    print(f"  25,000 - 50,000: {buckets['from_25k']:,.0f} locations")
+    print(f"  50,000 - 100,000: {buckets['from_50k']:,.0f} locations")
+    print(f"  > 100,000: {buckets['over_100k']:,.0f} locations")
     
     print(f"\n{'='*60}")
     print("GEOGRAPHIC DISTRIBUTION BY STATE")
     print("="*60)
     
-    # Extract state from address for geographic analysis
-    def extract_state(address):
-        if pd.isna(address):
-            return 'Unknown'
-        parts = address.split(',')
-        if len(parts) >= 3:
-            state_zip = parts[2].strip()
-            state = state_zip[:2].strip()
-            return state
-        return 'Unknown'
-    
-    valid_msa_df['state_extracted'] = valid_msa_df['address'].apply(extract_state)
-    state_counts = valid_msa_df['state_extracted'].value_counts()
+    # State from the address for geographic analysis
+    state_counts = run(f"""
+        SELECT extract_state(address) AS state, COUNT(*) AS count,
+               TOTAL(population_2016) AS total_pop, AVG(population_2016) AS avg_pop
+        FROM {table} WHERE msa_source = ?
+        GROUP BY 1 ORDER BY count DESC, MIN(rowid) LIMIT 10""")
     
     print(f"{'State':<6} {'Locations':<12} {'Total Pop (2016)':<15} {'Avg Pop/Location':<15}")
     print("-" * 60)
     
-    for state, count in state_counts.head(10).items():
-        state_data = valid_msa_df[valid_msa_df['state_extracted'] == state]
-        total_pop = state_data['population_2016'].sum()
-        avg_pop = state_data['population_2016'].mean()
-        
-        print(f"{state:<6} {count:<12} {total_pop:>12,.0f} {avg_pop:>14,.0f}")
+    for row in state_counts.itertuples():
+        print(f"{row.state:<6} {row.count:<12} {row.total_pop:>12,.0f} {row.avg_pop:>14,.0f}")
     
     print(f"\n{'='*60}")
     print("FACILITY TYPE ANALYSIS")
     print("="*60)
     
     # Analyze by facility type
-    type_counts = valid_msa_df['type'].value_counts()
+    type_counts = run(f"""
+        SELECT type, COUNT(*) AS count, AVG(population_2016) AS avg_pop
+        FROM {table} WHERE msa_source = ? AND type IS NOT NULL
+        GROUP BY type ORDER BY count DESC, MIN(rowid) LIMIT 10""")
     
     print(f"{'Facility Type':<30} {'Count':<8} {'Avg Pop/Location':<15}")
     print("-" * 55)
     
-    for facility_type, count in type_counts.head(10).items():
-        type_data = valid_msa_df[valid_msa_df['type'] == facility_type]
-        avg_pop = type_data['population_2016'].mean()
-        
-        print(f"{facility_type:<30} {count:<8} {avg_pop:>14,.0f}")
+    for row in type_counts.itertuples():
+        print(f"{row.type:<30} {row.count:<8} {row.avg_pop:>14,.0f}")
     
     print(f"\n{'='*60}")
     print("KEY INSIGHTS")
@@ -115,25 +127,25 @@ def generate_msa_report(csv_path: str):
     
     # Key insights
     print("1. Geographic Concentration:")
-    top_msa = valid_msa_df['msa_name'].value_counts().index[0]
-    top_msa_count = valid_msa_df['msa_name'].value_counts().iloc[0]
+    top_msa = msa_summary['msa_name'].iloc[0]
+    top_msa_count = msa_summary['facility_count'].iloc[0]
     print(f"   - {top_msa} has the most SSM locations ({top_msa_count})")
     
     print("\n2. Population Coverage:")
-    total_pop_covered = valid_msa_df['population_2016'].sum()
+    total_pop_covered = population.sum()
     print(f"   - SSM locations serve a total population of {total_pop_covered:,.0f} (2016)")
     
     print("\n3. Market Penetration:")
-    avg_pop_per_location = valid_msa_df['population_2016'].mean()
+    avg_pop_per_location = pop_stats['mean']
     print(f"   - Average population per location: {avg_pop_per_location:,.0f}")
     
     print("\n4. Geographic Diversity:")
-    unique_msas = valid_msa_df['msa_name'].nunique()
+    unique_msas = len(msa_summary)
     print(f"   - SSM operates in {unique_msas} different Metropolitan Statistical Areas")
     
     print("\n5. Facility Distribution:")
-    most_common_type = valid_msa_df['type'].value_counts().index[0]
-    most_common_count = valid_msa_df['type'].value_counts().iloc[0]
+    most_common_type = type_counts['type'].iloc[0]
+    most_common_count = type_counts['count'].iloc[0]
     print(f"   - Most common facility type: {most_common_type} ({most_common_count} locations)")
     
     # Save detailed report to file
@@ -142,17 +154,14 @@ def generate_msa_report(csv_path: str):
         f.write("SSM Health Locations MSA Analysis Report\n")
         f.write("="*60 + "\n\n")
         f.write(f"Generated on: {pd.Timestamp.now()}\n\n")
-        f.write(f"Total SSM Health Locations: {len(df):,}\n")
-        f.write(f"Locations with MSA data: {len(valid_msa_df):,}\n")
-        f.write(f"Match rate: {len(valid_msa_df)/len(df)*100:.1f}%\n\n")
+        f.write(f"Total SSM Health Locations: {total_locations:,}\n")
+        f.write(f"Locations with MSA data: {valid_locations:,}\n")
+        f.write(f"Match rate: {valid_locations/total_locations*100:.1f}%\n\n")
         
         f.write("TOP 15 METROPOLITAN STATISTICAL AREAS\n")
         f.write("-" * 50 + "\n")
-        for rank, (msa_name, location_count) in enumerate(top_msas.items(), 1):
-            msa_data = valid_msa_df[valid_msa_df['msa_name'] == msa_name]
-            total_pop = msa_data['population_2016'].sum()
-            avg_pop = msa_data['population_2016'].mean()
-            f.write(f"{rank}. {msa_name}: {location_count} locations, {total_pop:,.0f} total pop, {avg_pop:,.0f} avg pop/location\n")
+        for rank, row in enumerate(top_msas.itertuples(), 1):
+            f.write(f"{rank}. {row.msa_name}: {row.facility_count} locations, {row.total_population:,.0f} total pop, {row.avg_population:,.0f} avg pop/location\n")
     
     print(f"\nDetailed report saved to: {report_file}")
 
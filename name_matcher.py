@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Indexed Fuzzy Facility-Name Matcher
+Matches facility names against a fixed candidate list (the hospital masterlist,
+the hospital statistics keys) without normalizing and comparing every pair:
+  - candidates are normalized to token sets once, into a token -> candidate
+    inverted index
+  - a name is normalized once and scored only against the candidates sharing
+    a token with it, by Jaccard similarity of the token sets
+match() returns the best candidate with its confidence (the Jaccard score,
+1.0 for the same tokens), or (None, 0.0) when no candidate is close enough.
+"""
+
+import re
+from collections import Counter
+
+# Words too common in SSM facility names to tell hospitals apart
+STOPWORDS = frozenset([
+    'ssm', 'health', 'hospital', 'center', 'medical', 'community', 'memorial',
+    'children', 's', 'saint', 'st', 'the', 'of', 'at'
+])
+
+
+def name_tokens(name, stopwords=STOPWORDS):
+    """Lowercased alphanumeric words of name, without stopwords"""
+    if name is None or name != name:
+        return frozenset()
+    words = re.sub(r"[^a-z0-9 ]+", " ", str(name).lower()).split()
+    return frozenset(word for word in words if word not in stopwords)
+
+
+class NameMatcher:
+    """
+    Best-match lookup of names among candidates
+
+    stopwords: words ignored on both sides (pass () for punctuation- and
+               case-insensitive exact matching)
+    min_overlap: shared words needed for a match, unless one name's words are
+                 all in the other
+    """
+
+    def __init__(self, candidates, stopwords=STOPWORDS, min_overlap=2):
+        self.candidates = list(dict.fromkeys(candidates))
+        self.stopwords = stopwords
+        self.min_overlap = min_overlap
+        self.tokens = [name_tokens(candidate, stopwords) for candidate in self.candidates]
+        self.index = {}
+        for position, tokens in enumerate(self.tokens):
+            for token in tokens:
+                self.index.setdefault(token, []).append(position)
+        self._cache = {}
+
+    def match(self, name):
+        """(best candidate, confidence) for name, or (None, 0.0)"""
+        tokens = name_tokens(name, self.stopwords)
+        if tokens not in self._cache:
+            self._cache[tokens] = self._best(tokens)
+        return self._cache[tokens]
+
+    def _best(self, tokens):
+        overlaps = Counter(position for token in tokens for position in self.index.get(token, ()))
+        best, best_score = None, 0.0
+        # Candidates in list order, so ties go to the earlier candidate
+        for position in sorted(overlaps):
+            overlap = overlaps[position]
+            candidate_tokens = self.tokens[position]
+            contained = overlap == len(tokens) or overlap == len(candidate_tokens)
+            if overlap < self.min_overlap and not contained:
+                continue
+            score = overlap / len(tokens | candidate_tokens)
+            if score > best_score:
+                best, best_score = self.candidates[position], score
+        return best, best_score
+
+    def match_all(self, names):
+        """match() for each name, as two lists: candidates and confidences"""
+        matches = [self.match(name) for name in names]
+        return [candidate for candidate, _ in matches], [confidence for _, confidence in matches]
+
+    def is_exact(self, name):
+        """True if name has exactly the words of some candidate"""
+        return self.match(name)[1] == 1.0
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Content-Hashed Pipeline Runner for the Enrichment Scripts
+The scraping/enrichment chain and the ZIP scoring branch are declared once in
+PIPELINE_STAGES as scripts with the files they read and write. Dependencies
+follow from those files, independent branches run in parallel, and a stage is
+skipped when its inputs and script hash the same as at its last successful
+run and its outputs are still the files it wrote. Every run reports each
+stage's wall time and peak memory.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from build_maps import MAP_BUILDS, SHARED_CODE, file_digest
+
+MANIFEST_FILE = 'pipeline_manifest.json'
+
+# Map builds keep their own per-map skipping in build_maps.py; the stage
+# reruns build_maps whenever any map input changed
+MAP_INPUTS = sorted({path for build in MAP_BUILDS.values() for path in build['inputs']} |
+                    {build['module'] + '.py' for build in MAP_BUILDS.values()} | set(SHARED_CODE))
+
+# name -> script, inputs, outputs. external stages (scraping) are only run when
+# asked for by name; otherwise their outputs are treated as source data.
+PIPELINE_STAGES = {
+    'scrape': {
+        'script': 'main.py',
+        'inputs': [],
+        'outputs': ['ssm_health_locations.csv'],
+        'external': True
+    },
+    'msa': {
+        'script': 'robust_msa_mapping.py',
+        'inputs': ['Geography_MSA_ZIP_2018.csv', 'ssm_health_locations.csv'],
+        'outputs': ['ssm_health_locations_with_msa_robust.csv']
+    },
+    'income': {
+        'script': 'add_income_data.py',
+        'inputs': ['ssm_health_locations_with_msa_robust.csv'],
+        'outputs': ['ssm_health_locations_with_income.csv']
+    },
+    'age': {
+        'script': 'add_age_demographics.py',
+        'inputs': ['ssm_health_locations_with_income.csv'],
+        'outputs': ['ssm_health_locations_with_income_with_age_demographics.csv']
+    },
+    'zip_demographics': {
+        'script': 'add_zip_demographics_simple.py',
+        'inputs': ['ssm_health_locations_with_income_with_age_demographics.csv'],
+        'outputs': ['ssm_health_locations_with_zip_demographics.csv']
+    },
+    'attractiveness': {
+        'script': 'create_attractiveness_scores.py',
+        'inputs': ['ssm_health_locations_with_zip_demographics.csv'],
+        'outputs': ['ssm_health_locations_with_attractiveness_scores.csv']
+    },
+    'coordinates': {
+        'script': 'add_coordinates_to_attractiveness.py',
+        'inputs': ['ssm_health_locations_with_attractiveness_scores.csv'],
+        'outputs': ['ssm_health_locations_with_attractiveness_scores_and_coords.csv']
+    },
+    'facility_model': {
+        'script': 'facility_model.py',
+        'inputs': ['ssm_health_locations_with_attractiveness_scores_and_coords.csv'],
+        'outputs': ['facility_model/sites.csv', 'facility_model/specialties.csv',
+                    'facility_model/zips.csv', 'facility_model/msas.csv', 'facility_model/site_gaps.csv']
+    },
+    'site_linkage': {
+        'script': 'site_linkage.py',
+        'inputs': ['facility_model/sites.csv'],
+        'outputs': ['facility_model/site_links.csv']
+    },
+    'analytics_db': {
+        'script': 'analytics_db.py',
+        'inputs': ['ssm_health_locations_with_msa_robust.csv',
+                   'ssm_health_locations_with_income_with_age_demographics.csv',
+                   'ssm_health_locations_with_attractiveness_scores_and_coords.csv',
+                   'all_mn_wi_il_zip_demographics_scored.csv', 'all_ok_mo_zip_demographics_scored.csv'],
+        'outputs': ['ssm_analytics.db']
+    },
+    'ok_mo_zip_demographics': {
+        'script': 'fetch_all_zip_demographics.py',
+        'inputs': ['all_ok_mo_zips.csv'],
+        'outputs': ['all_ok_mo_zip_demographics.csv']
+    },
+    'ok_mo_zip_scores': {
+        'script': 'score_all_zip_demographics.py',
+        'inputs': ['all_ok_mo_zip_demographics.csv'],
+        'outputs': ['all_ok_mo_zip_demographics_scored.csv']
+    },
+    'zip_polygon_scores': {
+        'script': 'score_zip_polygons.py',
+        'inputs': ['ssm_health_locations_with_zip_demographics.csv', 'zipcodes_mn_wi_il.geojson'],
+        'outputs': ['zipcodes_mn_wi_il_scored.geojson']
+    },
+    'maps': {
+        'script': 'build_maps.py',
+        'inputs': MAP_INPUTS,
+        'outputs': [build['output'] for build in MAP_BUILDS.values()]
+    }
+}
+
+
+def stage_dependencies(stages=PIPELINE_STAGES):
+    """name -> set of stages producing one of its inputs"""
+    producers = {output: name for name, stage in stages.items() for output in stage['outputs']}
+    return {
+        name: {producers[path] for path in stage['inputs'] if path in producers and producers[path] != name}
+        for name, stage in stages.items()
+    }
+
+
+def stage_hash(name, stages=PIPELINE_STAGES):
+    """Combined content hash of a stage's script and inputs"""
+    stage = stages[name]
+    combined = hashlib.sha256()
+    for path in [stage['script']] + sorted(stage['inputs']):
+        combined.update(f"{path}={file_digest(path)}\n".encode('utf-8'))
+    return combined.hexdigest()
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
+    with open(MANIFEST_FILE, 'r') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest):
+    temp_file = MANIFEST_FILE + '.tmp'
+    with open(temp_file, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_file, MANIFEST_FILE)
+
+
+def is_stage_current(name, input_hash, manifest, stages=PIPELINE_STAGES):
+    """True if the stage last ran on these inputs and its outputs are unchanged since"""
+    entry = manifest.get(name)
+    if not entry or entry.get('input_hash') != input_hash:
+        return False
+    return all(entry['outputs'].get(path) == file_digest(path) for path in stages[name]['outputs'])
+
+
+# Runs a stage script as __main__ and, at exit, records the process's own peak
+# RSS (VmHWM, which exec resets) to the file named by PIPELINE_PEAK_FILE.
+# ru_maxrss can't be used for this: it keeps the high-water mark of the
+# pre-exec copy of this (much larger) runner process.
+_STAGE_WRAPPER = """
+import atexit, os, runpy, sys
+def _report_peak():
+    with open('/proc/self/status') as status, open(os.environ['PIPELINE_PEAK_FILE'], 'w') as out:
+        out.write(next(line for line in status if line.startswith('VmHWM')).split()[1])
+if os.path.exists('/proc/self/status'):
+    atexit.register(_report_peak)
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+
+def run_stage(name, stages=PIPELINE_STAGES):
+    """
+    Run a stage's script in a child process
+
+    Returns (exit code, wall seconds, peak RSS in MB).
+    """
+    start = time.time()
+    peak_file = f".pipeline_peak_{name}_{os.getpid()}"
+    env = dict(os.environ, PIPELINE_PEAK_FILE=peak_file)
+    process = subprocess.Popen([sys.executable, '-c', _STAGE_WRAPPER, stages[name]['script']], env=env)
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    seconds = time.time() - start
+    peak_kb = usage.ru_maxrss  # fallback without /proc: an upper bound
+    if os.path.exists(peak_file):
+        with open(peak_file, 'r') as f:
+            peak_kb = int(f.read() or peak_kb)
+        os.remove(peak_file)
+    return process.returncode, seconds, peak_kb / 1024
+
+
+def run_pipeline(names=None, force=False, max_workers=None, stages=PIPELINE_STAGES):
+    """
+    Run the pipeline in dependency order, skipping stages whose inputs are unchanged
+
+    names: stages to consider (default every non-external stage); upstream
+           stages are not added automatically
+    force: run them even when their inputs are unchanged
+
+    Returns {stage: {'status', 'seconds', 'peak_mb'}} with status one of
+    'ran', 'skipped', 'failed' or 'blocked' (an upstream stage failed).
+    """
+    names = list(names or [name for name, stage in stages.items() if not stage.get('external')])
+    dependencies = {name: deps & set(names) for name, deps in stage_dependencies(stages).items() if name in names}
+    manifest = load_manifest()
+    results = {}
+    pending = set(names)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        while pending or running:
+            for name in sorted(pending):
+                if any(results.get(dep, {}).get('status') in ('failed', 'blocked') for dep in dependencies[name]):
+                    print(f"⛔ {name}: blocked by a failed upstream stage")
+                    results[name] = {'status': 'blocked', 'seconds': 0.0, 'peak_mb': 0.0}
+                    pending.discard(name)
+                elif all(dep in results for dep in dependencies[name]):
+                    # Hashed only now, after upstream stages have rewritten its inputs
+                    input_hash = stage_hash(name, stages)
+                    pending.discard(name)
+                    if not force and is_stage_current(name, input_hash, manifest, stages):
+                        print(f"⏭️ {name}: inputs unchanged, skipping")
+                        results[name] = {'status': 'skipped', 'seconds': 0.0, 'peak_mb': 0.0}
+                        continue
+                    print(f"▶️ {name}: running {stages[name]['script']}")
+                    running[executor.submit(run_stage, name, stages)] = (name, input_hash)
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, input_hash = running.pop(future)
+                code, seconds, peak_mb = future.result()
+                # Several scripts report errors and exit 0, so also require their outputs
+                missing = [path for path in stages[name]['outputs'] if not os.path.exists(path)]
+                if code != 0 or missing:
+                    reason = f"exited with code {code}" if code != 0 else f"did not write {', '.join(missing)}"
+                    print(f"⚠️ {name}: {stages[name]['script']} {reason}")
+                    results[name] = {'status': 'failed', 'seconds': seconds, 'peak_mb': peak_mb}
+                    continue
+                print(f"✅ {name}: done in {seconds:.1f}s (peak {peak_mb:.0f} MB)")
+                results[name] = {'status': 'ran', 'seconds': seconds, 'peak_mb': peak_mb}
+                manifest[name] = {
+                    'input_hash': input_hash,
+                    'outputs': {path: file_digest(path) for path in stages[name]['outputs']},
+                    'seconds': round(seconds, 2),
+                    'peak_mb': round(peak_mb, 1),
+                    'ran_at': time.strftime('%Y-%m-%d %H:%M:%S')
+                }
+                save_manifest(manifest)
+    return results
+
+
+def print_report(results):
+    print(f"\n{'Stage':<24} {'Status':<8} {'Wall time':>10} {'Peak memory':>12}")
+    print("-" * 57)
+    for name, result in results.items():
+        print(f"{name:<24} {result['status']:<8} {result['seconds']:>9.1f}s {result['peak_mb']:>9.0f} MB")
+
+
+def main():
+    """Run every stale pipeline stage"""
+    print("🏥 SSM Health Data Pipeline")
+    print("=" * 50)
+    start = time.time()
+    results = run_pipeline()
+    print_report(results)
+    print(f"\n🎉 Pipeline finished in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Portal Request Metrics in Prometheus Text Format
+Per-route latency histograms, response counts by status (so 304 revalidations
+vs full 200 responses give a cache-hit ratio), bytes served, active sessions,
+and the size and age of every portal map file, exposed on /metrics.
+
+Each gunicorn worker keeps its own counters and snapshots them to
+METRICS_DIR/<pid>.json at most once a second; /metrics merges every worker's
+snapshot, so a scrape sees the whole server whichever worker answers it.
+"""
+
+import json
+import os
+import secrets
+import threading
+import time
+from flask import g, request, session, Response
+from build_maps import MAP_BUILDS
+from static_delivery import ENCODINGS
+
+METRICS_DIR = os.environ.get('PORTAL_METRICS_DIR', 'portal_metrics')
+
+# /metrics requires "Authorization: Bearer <token>", and is not served without one
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Request latency histogram buckets, in seconds
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# A session counts as active if it made a request this recently
+ACTIVE_SESSION_SECONDS = 30 * 60
+
+# Minimum seconds between snapshot writes per worker
+SNAPSHOT_INTERVAL = 1.0
+
+_lock = threading.Lock()
+_state = {'routes': {}, 'sessions': {}}
+_last_snapshot = 0.0
+
+
+def _route_state(route):
+    return _state['routes'].setdefault(route, {
+        'buckets': [0] * len(LATENCY_BUCKETS), 'count': 0, 'sum': 0.0, 'bytes': 0, 'statuses': {}
+    })
+
+
+def record_request(route, status, seconds, size, session_id=None):
+    """Add one finished request to this worker's metrics"""
+    with _lock:
+        state = _route_state(route)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                state['buckets'][i] += 1
+        state['count'] += 1
+        state['sum'] += seconds
+        state['bytes'] += size
+        state['statuses'][str(status)] = state['statuses'].get(str(status), 0) + 1
+        if session_id:
+            _state['sessions'][session_id] = time.time()
+
+
+def _write_snapshot(force=False):
+    global _last_snapshot
+    now = time.time()
+    if not force and now - _last_snapshot < SNAPSHOT_INTERVAL:
+        return
+    _last_snapshot = now
+    cutoff = now - ACTIVE_SESSION_SECONDS
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    with _lock:
+        # Forget sessions this worker hasn't seen in a while, so the map stays small
+        _state['sessions'] = {sid: seen for sid, seen in _state['sessions'].items() if seen >= cutoff}
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(_state, f)
+        os.replace(path + '.tmp', path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merged_state():
+    """Every worker's snapshot plus this worker's live counters, summed per route"""
+    _write_snapshot(force=True)
+    merged = {'routes': {}, 'sessions': {}}
+    if not os.path.isdir(METRICS_DIR):
+        return merged
+    for filename in os.listdir(METRICS_DIR):
+        if not filename.endswith('.json'):
+            continue
+        # Drop snapshots of workers that have exited (restarted by max_requests or a crash)
+        pid = filename[:-len('.json')]
+        if pid.isdigit() and not _pid_alive(int(pid)):
+            try:
+                os.remove(os.path.join(METRICS_DIR, filename))
+            except OSError:
+                pass
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, filename), 'r') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for route, state in snapshot['routes'].items():
+            target = merged['routes'].setdefault(route, {
+                'buckets': [0] * len(LATENCY_BUCKETS), 'count': 0, 'sum': 0.0, 'bytes': 0, 'statuses': {}
+            })
+            target['buckets'] = [a + b for a, b in zip(target['buckets'], state['buckets'])]
+            target['count'] += state['count']
+            target['sum'] += state['sum']
+            target['bytes'] += state['bytes']
+            for status, count in state['statuses'].items():
+                target['statuses'][status] = target['statuses'].get(status, 0) + count
+        for sid, seen in snapshot['sessions'].items():
+            merged['sessions'][sid] = max(seen, merged['sessions'].get(sid, 0))
+    return merged
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_metrics():
+    """All metrics in Prometheus text exposition format"""
+    state = _merged_state()
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            label_text = ','.join(f'{key}="{_label(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{suffix}{{{label_text}}} {value}" if label_text else f"{name}{suffix} {value}")
+
+    routes = sorted(state['routes'].items())
+    histogram = []
+    for route, route_state in routes:
+        for bound, count in zip(LATENCY_BUCKETS, route_state['buckets']):
+            histogram.append(('_bucket', {'route': route, 'le': bound}, count))
+        histogram.append(('_bucket', {'route': route, 'le': '+Inf'}, route_state['count']))
+        histogram.append(('_sum', {'route': route}, round(route_state['sum'], 6)))
+        histogram.append(('_count', {'route': route}, route_state['count']))
+    metric('portal_request_duration_seconds', 'histogram', 'Request latency by route.', histogram)
+
+    metric('portal_responses_total', 'counter', 'Responses by route and status code.', [
+        ('', {'route': route, 'status': status}, count)
+        for route, route_state in routes for status, count in sorted(route_state['statuses'].items())
+    ])
+    metric('portal_response_bytes_total', 'counter', 'Response body bytes sent by route.', [
+        ('', {'route': route}, route_state['bytes']) for route, route_state in routes
+    ])
+
+    ratios = []
+    for route, route_state in routes:
+        hits = route_state['statuses'].get('304', 0)
+        served = hits + route_state['statuses'].get('200', 0)
+        if hits:
+            ratios.append(('', {'route': route}, round(hits / served, 4)))
+    metric('portal_cache_hit_ratio', 'gauge', 'Share of 200/304 responses that were 304 Not Modified.', ratios)
+
+    cutoff = time.time() - ACTIVE_SESSION_SECONDS
+    active = sum(1 for seen in state['sessions'].values() if seen >= cutoff)
+    metric('portal_active_sessions', 'gauge',
+           f'Logged-in sessions with a request in the last {ACTIVE_SESSION_SECONDS // 60} minutes.', [('', {}, active)])
+
+    sizes, ages = [], []
+    now = time.time()
+    for name, build in sorted(MAP_BUILDS.items()):
+        for encoding, suffix in [('identity', '')] + ENCODINGS:
+            path = build['output'] + suffix
+            if os.path.exists(path):
+                sizes.append(('', {'map': name, 'encoding': encoding}, os.path.getsize(path)))
+        if os.path.exists(build['output']):
+            ages.append(('', {'map': name}, round(now - os.path.getmtime(build['output']), 1)))
+    metric('portal_map_file_bytes', 'gauge', 'Size of each map file by encoding.', sizes)
+    metric('portal_map_file_age_seconds', 'gauge', 'Seconds since each map file was last written.', ages)
+
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    """Register the request hooks and the /metrics route on app"""
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        # Sessions are client-side cookies; give each login an id to count it by
+        if 'logged_in' in session and 'sid' not in session:
+            session['sid'] = secrets.token_hex(8)
+
+    @app.after_request
+    def record(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            # The rule, not the path, so /api/zip/<zip_code> is one series
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            if route != '/metrics':
+                record_request(route, response.status_code, time.perf_counter() - start,
+                               response.content_length or 0,
+                               session.get('sid') if 'logged_in' in session else None)
+                _write_snapshot()
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if not METRICS_TOKEN:
+            return Response('Not Found', status=404)
+        if not secrets.compare_digest(request.headers.get('Authorization', ''), f"Bearer {METRICS_TOKEN}"):
+            return Response('Unauthorized', status=401)
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def clear_snapshots():
+    """Remove worker snapshots, e.g. when the server restarts"""
+    if os.path.isdir(METRICS_DIR):
+        for filename in os.listdir(METRICS_DIR):
+            os.remove(os.path.join(METRICS_DIR, filename))
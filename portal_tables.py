@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+In-Memory Query Tables for the Portal JSON API
+Loads the ZIP scores, SSM Health facilities and inpatient market share once per
+process into flat numpy columns, with each table sorted for its lookups:
+  - ZIPs by code (binary search) and by west edge of their polygon bounds
+  - facilities by longitude
+  - market share rows by ZIP, then share
+so a bounding-box or single-ZIP query is a searchsorted plus a vectorized mask
+instead of a pandas filter or a reparse of the map data.
+
+For gunicorn, the tables are written once per deploy to a store of .npy
+columns (build_table_store, run from gunicorn.conf.py) that every worker
+memory-maps read-only, so the data lives once in the OS page cache however
+many workers there are. Without a current store each process loads its own.
+"""
+
+import json
+import os
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+from input_cache import read_csv
+from geometry_store import GeometryStore, is_store_current, store_path_for
+from market_share import MARKET_SHARE_FILES, MarketShares
+from facility_layer import facility_coordinates, facility_types
+from build_maps import ZIP_GEOJSON_FILES, SCORED_ZIP_FILES, FACILITY_FILES
+
+# Scored ZIP columns served by the API, in response order
+ZIP_FIELDS = [
+    'state', 'attractiveness_score', 'attractiveness_category',
+    'total_population', 'median_household_income', 'senior_population_pct'
+]
+
+FACILITY_FIELDS = ['name', 'street', 'city', 'state', 'zip', 'msa_name']
+
+# Upper bound on rows returned by a bounding-box query
+MAX_LIMIT = 5000
+
+# Memory-mapped table store shared by the gunicorn workers
+TABLE_STORE_DIR = 'portal_tables.store'
+
+# Bump when the table layout changes, so old stores are rebuilt
+TABLE_STORE_VERSION = 1
+
+TABLE_NAMES = ['zips', 'facilities', 'shares', 'index']
+
+
+def parse_bbox(text):
+    """'west,south,east,north' in degrees -> tuple of floats; raises ValueError"""
+    try:
+        west, south, east, north = (float(value) for value in text.split(','))
+    except (AttributeError, ValueError):
+        raise ValueError("bbox must be 'west,south,east,north'")
+    if not (west <= east and south <= north):
+        raise ValueError("bbox must have west <= east and south <= north")
+    return west, south, east, north
+
+
+def _string_column(values):
+    """Fixed-width unicode column with '' for missing values"""
+    return pd.Series(values, dtype=object).fillna('').astype(str).to_numpy().astype(str)
+
+
+def _float_column(values):
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _json_value(value):
+    """numpy scalar -> JSON-safe Python value (NaN and '' become null)"""
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else round(float(value), 6)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.str_):
+        return str(value) or None
+    return value
+
+
+def load_zip_bounds(geojson_files=ZIP_GEOJSON_FILES):
+    """DataFrame of zip, west, south, east, north from the current geometry stores"""
+    frames = []
+    for geojson_file in geojson_files:
+        if not is_store_current(geojson_file):
+            continue
+        store = GeometryStore(store_path_for(geojson_file))
+        bounds = store.feature_bounds()
+        frames.append(pd.DataFrame({
+            'zip': store.feature_codes().astype(str),
+            'west': bounds[:, 0], 'south': bounds[:, 1], 'east': bounds[:, 2], 'north': bounds[:, 3]
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['zip', 'west', 'south', 'east', 'north'])
+    bounds = pd.concat(frames, ignore_index=True).dropna()
+    bounds = bounds[bounds['zip'] != '']
+    # A ZCTA split across files: union of its extents
+    return bounds.groupby('zip').agg({'west': 'min', 'south': 'min', 'east': 'max', 'north': 'max'}).reset_index()
+
+
+def load_zip_centroids(path='uszips.csv'):
+    """DataFrame of zip, lat, lng from uszips.csv (empty if missing)"""
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['zip', 'lat', 'lng'])
+    uszips = read_csv(path)
+    centroids = uszips[['zip', 'lat', 'lng']].dropna()
+    return centroids.drop_duplicates('zip', keep='last')
+
+
+def load_zip_scores():
+    """
+    The comprehensive map's merged ZIP scores, or an empty table (zip column
+    only) when the scored ZIP CSVs are missing, so the facility and market
+    share queries still work
+    """
+    from create_comprehensive_final_map import load_and_merge_zip_data
+    try:
+        return load_and_merge_zip_data()
+    except FileNotFoundError as e:
+        print(f"  ⚠️ ZIP scores unavailable ({e}); ZIP queries will return no results")
+        return pd.DataFrame(columns=['zip'])
+
+
+def load_zip_system_shares(files=MARKET_SHARE_FILES):
+    """
+    One row per (zip, hospital system) with its discharge count and share of the
+    ZIP, from the 2024 inpatient market share extracts; missing files are skipped
+    """
+    return MarketShares.load(files).entries()
+
+
+class PortalTables:
+    """
+    Columnar ZIP, facility and market share tables with the query methods
+    behind /api/*. Each table is a dict of equal-length numpy arrays, either
+    in memory or memory-mapped from a table store (see open()).
+    """
+
+    def __init__(self, zips, facilities, type_names, shares, index=None):
+        self.zips = zips
+        self.facilities = facilities
+        self.type_names = type_names
+        self.shares = shares
+        self.index = index if index is not None else self.build_zip_index(zips)
+
+    @staticmethod
+    def build_zip_index(zips):
+        """
+        ZIP bounding-box index: rows with bounds sorted by west edge. A ZIP can
+        only intersect [west, east] if its own west edge lies within max_width
+        (the widest ZIP) of west.
+        """
+        located = ~np.isnan(zips['west'])
+        by_west = np.flatnonzero(located)[np.argsort(zips['west'][located], kind='stable')]
+        widths = zips['east'][located] - zips['west'][located]
+        return {
+            'by_west': by_west,
+            'west_sorted': zips['west'][by_west],
+            'max_width': np.array([widths.max() if len(widths) else 0.0])
+        }
+
+    @classmethod
+    def from_frames(cls, zip_data, facilities, lat, lng, shares, bounds, centroids):
+        """Build the tables from the map builders' DataFrames"""
+        # Later rows win on duplicate ZIPs, as in the comprehensive map's lookup
+        zip_data = zip_data.drop_duplicates('zip', keep='last')
+        zip_data = zip_data.merge(bounds, on='zip', how='left').merge(centroids, on='zip', how='left')
+        # ZIPs without polygons still get a point extent from their centroid
+        for edge, coordinate in [('west', 'lng'), ('east', 'lng'), ('south', 'lat'), ('north', 'lat')]:
+            zip_data[edge] = zip_data[edge].fillna(zip_data[coordinate])
+        # and ZIPs without a centroid the center of their polygon bounds
+        zip_data['lat'] = zip_data['lat'].fillna((zip_data['south'] + zip_data['north']) / 2)
+        zip_data['lng'] = zip_data['lng'].fillna((zip_data['west'] + zip_data['east']) / 2)
+        zip_data = zip_data.sort_values('zip', kind='stable')
+
+        zips = {'zip': _string_column(zip_data['zip'])}
+        for field in ZIP_FIELDS + ['lat', 'lng', 'west', 'south', 'east', 'north']:
+            values = zip_data[field] if field in zip_data.columns else pd.Series(np.nan, index=zip_data.index)
+            is_text = field in ('state', 'attractiveness_category')
+            zips[field] = _string_column(values) if is_text else _float_column(values)
+
+        located = lat.notna() & lng.notna()
+        facilities = facilities[located]
+        types = facility_types(facilities)
+        type_names = sorted(types.unique())
+        order = np.argsort(lng[located].to_numpy(), kind='stable')
+        facility_table = {
+            'lat': lat[located].to_numpy(dtype=np.float64)[order],
+            'lng': lng[located].to_numpy(dtype=np.float64)[order],
+            'type': types.map({name: i for i, name in enumerate(type_names)}).to_numpy(dtype=np.int32)[order]
+        }
+        for field in FACILITY_FIELDS:
+            values = facilities[field] if field in facilities.columns else pd.Series(None, index=facilities.index)
+            facility_table[field] = _string_column(values)[order]
+
+        shares = shares.sort_values(['zip', 'share', 'system'], ascending=[True, False, True], kind='stable')
+        share_table = {
+            'zip': _string_column(shares['zip']),
+            'system': _string_column(shares['system']),
+            'count': shares['count'].to_numpy(dtype=np.int64),
+            'share': shares['share'].to_numpy(dtype=np.float64)
+        }
+        return cls(zips, facility_table, type_names, share_table)
+
+    @classmethod
+    def load(cls):
+        """Load every table from the same inputs (and rules) as the comprehensive map"""
+        from create_comprehensive_final_map import load_ssm_facilities, get_zip_coordinates
+        zip_data = load_zip_scores()
+        facilities = load_ssm_facilities()
+        lat, lng = facility_coordinates(facilities, get_zip_coordinates)
+        return cls.from_frames(zip_data, facilities, lat, lng, load_zip_system_shares(),
+                               load_zip_bounds(), load_zip_centroids())
+
+    @classmethod
+    def open(cls, store_dir=TABLE_STORE_DIR):
+        """Attach to a table store; every column is memory-mapped read-only"""
+        with open(os.path.join(store_dir, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        tables = {}
+        for table, columns in meta['columns'].items():
+            tables[table] = {}
+            for column in columns:
+                path = os.path.join(store_dir, f"{table}.{column}.npy")
+                # np.load can't memory-map an empty array
+                tables[table][column] = np.load(path, mmap_mode='r' if meta['rows'][table] else None)
+        return cls(tables['zips'], tables['facilities'], meta['type_names'], tables['shares'], tables['index'])
+
+    def save(self, store_dir=TABLE_STORE_DIR, inputs=None):
+        """
+        Write the tables as a store of .npy columns. The store is written beside
+        store_dir and swapped in, so workers still mapping the old files keep
+        reading them until they reattach.
+        """
+        temp_dir = store_dir + '.tmp'
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        os.makedirs(temp_dir)
+        meta = {'version': TABLE_STORE_VERSION, 'inputs': inputs or {}, 'type_names': list(self.type_names),
+                'columns': {}, 'rows': {}}
+        for table in TABLE_NAMES:
+            columns = getattr(self, table)
+            meta['columns'][table] = list(columns)
+            meta['rows'][table] = len(next(iter(columns.values())))
+            for column, values in columns.items():
+                np.save(os.path.join(temp_dir, f"{table}.{column}.npy"), np.ascontiguousarray(values))
+        with open(os.path.join(temp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        old_dir = store_dir + '.old'
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(store_dir):
+            os.rename(store_dir, old_dir)
+        os.rename(temp_dir, store_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        return store_dir
+
+    def _zip_row(self, i):
+        row = {'zip': str(self.zips['zip'][i])}
+        for field in ZIP_FIELDS + ['lat', 'lng']:
+            row[field] = _json_value(self.zips[field][i])
+        row['bbox'] = [_json_value(self.zips[edge][i]) for edge in ('west', 'south', 'east', 'north')]
+        return row
+
+    def _find(self, table, zip_code):
+        """[start, end) rows of a zip in a table sorted by zip"""
+        key = str(zip_code).zfill(5)
+        return (int(np.searchsorted(table['zip'], key, side='left')),
+                int(np.searchsorted(table['zip'], key, side='right')))
+
+    def zip_record(self, zip_code):
+        """Scores and extent of one ZIP, or None"""
+        start, end = self._find(self.zips, zip_code)
+        return self._zip_row(start) if end > start else None
+
+    def zips_in_bbox(self, bbox, min_score=None, limit=MAX_LIMIT):
+        """ZIPs whose polygon bounds intersect bbox, highest attractiveness score first"""
+        west, south, east, north = bbox
+        lo = np.searchsorted(self.index['west_sorted'], west - self.index['max_width'][0], side='left')
+        hi = np.searchsorted(self.index['west_sorted'], east, side='right')
+        rows = self.index['by_west'][lo:hi]
+        mask = ((self.zips['east'][rows] >= west) &
+                (self.zips['south'][rows] <= north) & (self.zips['north'][rows] >= south))
+        if min_score is not None:
+            mask &= self.zips['attractiveness_score'][rows] >= min_score
+        rows = rows[mask]
+        # NaN scores sort last
+        scores = np.nan_to_num(self.zips['attractiveness_score'][rows], nan=-np.inf)
+        rows = rows[np.argsort(-scores, kind='stable')]
+        return {'count': int(len(rows)), 'zips': [self._zip_row(i) for i in rows[:limit]]}
+
+    def facilities_in_bbox(self, bbox=None, facility_type=None, limit=MAX_LIMIT):
+        """Facilities inside bbox (all if None), optionally of types containing facility_type"""
+        lng = self.facilities['lng']
+        if bbox is None:
+            rows = np.arange(len(lng))
+        else:
+            west, south, east, north = bbox
+            rows = np.arange(np.searchsorted(lng, west, side='left'), np.searchsorted(lng, east, side='right'))
+            lat = self.facilities['lat'][rows]
+            rows = rows[(lat >= south) & (lat <= north)]
+        if facility_type:
+            wanted = [i for i, name in enumerate(self.type_names) if facility_type.lower() in name.lower()]
+            rows = rows[np.isin(self.facilities['type'][rows], wanted)]
+        facilities = []
+        for i in rows[:limit]:
+            row = {field: _json_value(self.facilities[field][i]) for field in FACILITY_FIELDS}
+            row['type'] = self.type_names[self.facilities['type'][i]]
+            row['lat'] = _json_value(self.facilities['lat'][i])
+            row['lng'] = _json_value(self.facilities['lng'][i])
+            facilities.append(row)
+        return {'count': int(len(rows)), 'facilities': facilities}
+
+    def market_share(self, zip_code):
+        """Inpatient share of every hospital system in a ZIP, with HHI, or None"""
+        start, end = self._find(self.shares, zip_code)
+        if end == start:
+            return None
+        shares = self.shares['share'][start:end]
+        systems = self.shares['system'][start:end]
+        is_ssm = np.char.find(np.char.upper(systems), 'SSM') >= 0
+        return {
+            'zip': str(zip_code).zfill(5),
+            'total_discharges': int(self.shares['count'][start:end].sum()),
+            'dominant_system': str(systems[0]),
+            'hhi': round(float((shares ** 2).sum() * 10000), 1),
+            'ssm_market_share': round(float(shares[is_ssm].sum()), 6),
+            'systems': [
+                {'system': str(system), 'discharges': int(count), 'share': round(float(share), 6)}
+                for system, count, share in zip(systems, self.shares['count'][start:end], shares)
+            ]
+        }
+
+
+def table_inputs_signature():
+    """(size, mtime) of every file the tables are loaded from, None if missing"""
+    paths = (SCORED_ZIP_FILES + FACILITY_FILES + list(MARKET_SHARE_FILES.values()) +
+             [os.path.join(store_path_for(geojson_file), 'meta.json') for geojson_file in ZIP_GEOJSON_FILES])
+    signature = {}
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            signature[path] = [stat.st_size, stat.st_mtime]
+        else:
+            signature[path] = None
+    return signature
+
+
+def is_table_store_current(store_dir=TABLE_STORE_DIR):
+    """True if the store exists and was built from the current inputs with this layout"""
+    meta_path = os.path.join(store_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    return meta.get('version') == TABLE_STORE_VERSION and meta.get('inputs') == table_inputs_signature()
+
+
+def build_table_store(store_dir=TABLE_STORE_DIR, force=False):
+    """Load the tables and write them to store_dir, unless it is already current"""
+    if not force and is_table_store_current(store_dir):
+        print(f"✅ {store_dir} is up to date")
+        return store_dir
+    # Taken before loading, so inputs changing mid-build leave the store stale
+    inputs = table_inputs_signature()
+    tables = PortalTables.load()
+    tables.save(store_dir, inputs=inputs)
+    print(f"✅ Wrote table store {store_dir}")
+    return store_dir
+
+
+_tables = None
+_tables_store_version = None
+_tables_lock = threading.Lock()
+
+
+def _store_version(store_dir=TABLE_STORE_DIR):
+    """Identity of the store currently at store_dir (its meta.json is rewritten per build), or None"""
+    try:
+        stat = os.stat(os.path.join(store_dir, 'meta.json'))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def get_portal_tables():
+    """
+    The process-wide PortalTables, attached to the table store when it is
+    current and loaded into this process otherwise. A store rebuilt after
+    attaching (see map_rebuilder.py) is picked up on the next call.
+    """
+    global _tables, _tables_store_version
+    version = _store_version()
+    if _tables is None or (version is not None and version != _tables_store_version):
+        with _tables_lock:
+            if _tables is None or (version is not None and version != _tables_store_version):
+                if is_table_store_current():
+                    _tables = PortalTables.open(TABLE_STORE_DIR)
+                elif _tables is None:
+                    _tables = PortalTables.load()
+                # A stale store is not rechecked until it is rewritten
+                _tables_store_version = version
+    return _tables
+
+
+def main():
+    """Build the table store, then attach to it and time a few representative queries"""
+    import time
+    print("🏥 SSM Health Portal Query Tables")
+    print("=" * 50)
+    build_table_store()
+    start = time.time()
+    tables = get_portal_tables()
+    print(f"✅ Attached {len(tables.zips['zip'])} ZIPs, {len(tables.facilities['lat'])} facilities, "
+          f"{len(tables.shares['zip'])} market share rows in {(time.time() - start) * 1000:.1f} ms")
+
+    bbox = (-91.0, 38.0, -89.5, 39.2)  # St. Louis area
+    for label, query in [
+        ('zips_in_bbox', lambda: tables.zips_in_bbox(bbox, min_score=60)),
+        ('facilities_in_bbox', lambda: tables.facilities_in_bbox(bbox, 'hospital')),
+        ('zip_record', lambda: tables.zip_record('63110')),
+        ('market_share', lambda: tables.market_share('63110'))
+    ]:
+        timings = []
+        for _ in range(200):
+            t0 = time.perf_counter()
+            query()
+            timings.append(time.perf_counter() - t0)
+        print(f"  {label}: p50 {np.percentile(timings, 50) * 1000:.2f} ms, p99 {np.percentile(timings, 99) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,12 +9,14 @@ This script handles CSV formatting issues and focuses on the essential columns.
 import pandas as pd
 import numpy as np
 from typing import Dict, Optional
+from columnar_store import read_table, write_table
 
 def load_geography_data(csv_path: str) -> pd.DataFrame:
     """Load the Geography_MSA_ZIP_2018.csv file"""
     print(f"Loading geography data from {csv_path}...")
     
-    geo_df = pd.read_csv(csv_path)
+    # ZIP and CBSA codes come back as 5-character strings
+    geo_df = read_table(csv_path)
     print(f"Loaded {len(geo_df)} ZIP code records")
     
     return geo_df
@@ -82,8 +84,8 @@ def create_zip_msa_mapping(geo_df: pd.DataFrame) -> Dict[str, Dict]:
     zip_msa_mapping = {}
     
     for _, row in geo_df.iterrows():
-        zip_code = str(row['zip']).zfill(5)  # Ensure 5 digits
-        cbsa_code = str(row['cbsa10'])
+        zip_code = row['zip']
+        cbsa_code = row['cbsa10']
         cbsa_name = row['cbsa_name']
         population = row['population_2016']
         
@@ -113,7 +115,8 @@ def add_msa_data_to_ssm(ssm_df: pd.DataFrame, zip_msa_mapping: Dict[str, Dict])
     
     # Process each row
     for idx, row in enhanced_df.iterrows():
-        zip_code = str(row['zip']).zfill(5) if pd.notna(row['zip']) else None
+        # clean_zip_codes left only 5-digit ZIP strings
+        zip_code = row['zip']
         
         if zip_code and zip_code in zip_msa_mapping:
             mapping = zip_msa_mapping[zip_code]
@@ -190,7 +193,7 @@ def main():
         
         # Save enhanced data
         print(f"\nSaving enhanced data to {output_csv}...")
-        enhanced_df.to_csv(output_csv, index=False)
+        write_table(enhanced_df, output_csv)
         print(f"Enhanced data saved successfully!")
         
         # Show sample of enhanced data
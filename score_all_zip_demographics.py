@@ -7,6 +7,8 @@ Applies the same scoring method to the complete ZIP demographics dataset
 import pandas as pd
 import numpy as np
 import warnings
+from attractiveness_bins import categorize_scores
+from columnar_store import read_table, write_table
 warnings.filterwarnings('ignore')
 
 class AllZIPAttractivenessScorer:
@@ -36,10 +38,20 @@ class AllZIPAttractivenessScorer:
                 return pd.Series([50] * len(values), index=values.index)
             return ((values - min_val) / (max_val - min_val)) * 100
     
-    def calculate_population_density_score(self, df):
+    def component_raw_values(self, df):
+        """Raw demographic values that each component score is ranked on"""
+        return pd.DataFrame({
+            'population_density': df['population_density'],
+            'population_growth': df['population_growth_rate'],
+            'senior_population': df['pct_age_65_74'] + df['pct_age_75_84'] + df['pct_age_85_plus'],
+            'income_level': df['median_household_income'],
+            'young_family': df['pct_under_5'] + df['pct_age_5_17']
+        }, index=df.index)
+    
+    def calculate_population_density_score(self, df, percentiles=None):
         """Calculate attractiveness score based on population density"""
         # Higher density = higher score
-        density_scores = self.normalize_score(df['population_density'])
+        density_scores = self.normalize_score(df['population_density']) if percentiles is None else percentiles
         
         # Bonus for very high density areas (urban centers)
         density_scores = np.where(
@@ -50,10 +62,10 @@ class AllZIPAttractivenessScorer:
         
         return density_scores
     
-    def calculate_growth_score(self, df):
+    def calculate_growth_score(self, df, percentiles=None):
         """Calculate attractiveness score based on population growth"""
         # Higher growth = higher score
-        growth_scores = self.normalize_score(df['population_growth_rate'])
+        growth_scores = self.normalize_score(df['population_growth_rate']) if percentiles is None else percentiles
         
         # Bonus for very high growth areas
         growth_scores = np.where(
@@ -64,11 +76,11 @@ class AllZIPAttractivenessScorer:
         
         return growth_scores
     
-    def calculate_senior_population_score(self, df):
+    def calculate_senior_population_score(self, df, percentiles=None):
         """Calculate attractiveness score based on senior population (65+)"""
         # Higher senior population = higher score (more healthcare needs)
         senior_pct = df['pct_age_65_74'] + df['pct_age_75_84'] + df['pct_age_85_plus']
-        senior_scores = self.normalize_score(senior_pct)
+        senior_scores = self.normalize_score(senior_pct) if percentiles is None else percentiles
         
         # Bonus for very high senior populations
         senior_scores = np.where(
@@ -79,10 +91,10 @@ class AllZIPAttractivenessScorer:
         
         return senior_scores
     
-    def calculate_income_score(self, df):
+    def calculate_income_score(self, df, percentiles=None):
         """Calculate attractiveness score based on income levels"""
         # Moderate to high income = higher score (better payer mix)
-        income_scores = self.normalize_score(df['median_household_income'])
+        income_scores = self.normalize_score(df['median_household_income']) if percentiles is None else percentiles
         
         # Bonus for high-income areas (better commercial insurance)
         income_scores = np.where(
@@ -101,11 +113,11 @@ class AllZIPAttractivenessScorer:
         
         return income_scores
     
-    def calculate_young_family_score(self, df):
+    def calculate_young_family_score(self, df, percentiles=None):
         """Calculate attractiveness score based on young family population (0-17)"""
         # Moderate young family population = higher score (pediatrics, OB-GYN)
         young_pct = df['pct_under_5'] + df['pct_age_5_17']
-        young_scores = self.normalize_score(young_pct)
+        young_scores = self.normalize_score(young_pct) if percentiles is None else percentiles
         
         # Bonus for moderate young family populations (not too high, not too low)
         young_scores = np.where(
@@ -138,37 +150,98 @@ class AllZIPAttractivenessScorer:
         
         # Ensure scores are between 0-100
         composite_score = np.clip(composite_score, 0, 100)
-        
+
         return composite_score
-    
+
+    def component_score_matrix(self, df, percentiles=None):
+        """
+        Stack the five component scores into an N x 5 matrix
+        Column order follows self.weights
+        percentiles: optional dict of precomputed 0-100 percentile ranks per component,
+                     used instead of ranking df itself
+        """
+        percentiles = percentiles or {}
+        components = {
+            'population_density': self.calculate_population_density_score(df, percentiles.get('population_density')),
+            'population_growth': self.calculate_growth_score(df, percentiles.get('population_growth')),
+            'senior_population': self.calculate_senior_population_score(df, percentiles.get('senior_population')),
+            'income_level': self.calculate_income_score(df, percentiles.get('income_level')),
+            'young_family': self.calculate_young_family_score(df, percentiles.get('young_family'))
+        }
+        return np.column_stack([np.asarray(components[key], dtype=float) for key in self.weights])
+
+    def sweep_weights(self, df, weight_matrix, top_n=100, component_matrix=None):
+        """
+        Score every ZIP under K alternative weightings at once
+
+        weight_matrix: K x 5 array, columns in the same order as self.weights
+        component_matrix: optional precomputed result of component_score_matrix(df),
+                          so repeated sweeps skip the percentile ranking
+
+        Returns a dict with:
+          - 'scores': K x N composite scores (one matrix multiply, clipped to 0-100)
+          - 'weightings': per-weighting top-N overlap and Spearman rho vs. the baseline weights
+          - 'zip_stability': per-ZIP rank spread and share of weightings placing it in the top N
+        """
+        weight_matrix = np.atleast_2d(np.asarray(weight_matrix, dtype=float))
+        if weight_matrix.shape[1] != len(self.weights):
+            raise ValueError(f"weight_matrix must be K x {len(self.weights)}, got {weight_matrix.shape}")
+
+        if component_matrix is None:
+            component_matrix = self.component_score_matrix(df)
+        # Missing demographics leave NaN component scores; count them as 0 so every ZIP gets a rank
+        component_matrix = np.nan_to_num(component_matrix, nan=0.0)
+
+        baseline_weights = np.array(list(self.weights.values()))
+        all_weights = np.vstack([baseline_weights, weight_matrix])
+        all_scores = np.clip(all_weights @ component_matrix.T, 0, 100)  # (K+1) x N
+
+        # Rank 1 = most attractive; average ranks for ties
+        ranks = pd.DataFrame(all_scores).rank(axis=1, ascending=False, method='average').to_numpy()
+        baseline_ranks, sweep_ranks = ranks[0], ranks[1:]
+
+        # Spearman rho is the Pearson correlation of the rank vectors
+        centered = sweep_ranks - sweep_ranks.mean(axis=1, keepdims=True)
+        baseline_centered = baseline_ranks - baseline_ranks.mean()
+        denom = np.sqrt((centered ** 2).sum(axis=1) * (baseline_centered ** 2).sum())
+        with np.errstate(invalid='ignore', divide='ignore'):
+            spearman = (centered @ baseline_centered) / denom
+
+        top_n = min(top_n, all_scores.shape[1])
+        in_top = ranks <= top_n
+        baseline_top = in_top[0]
+        sweep_top = in_top[1:]
+        top_overlap = (sweep_top & baseline_top).sum(axis=1) / max(top_n, 1)
+
+        weightings = pd.DataFrame(weight_matrix, columns=list(self.weights))
+        weightings['top_n_overlap'] = top_overlap
+        weightings['spearman_vs_baseline'] = spearman
+
+        zip_stability = pd.DataFrame({
+            'zip': df['zip'].values if 'zip' in df.columns else np.arange(all_scores.shape[1]),
+            'baseline_score': all_scores[0],
+            'baseline_rank': baseline_ranks,
+            'mean_rank': sweep_ranks.mean(axis=0),
+            'rank_std': sweep_ranks.std(axis=0),
+            'best_rank': sweep_ranks.min(axis=0),
+            'worst_rank': sweep_ranks.max(axis=0),
+            'top_n_frequency': sweep_top.mean(axis=0)
+        })
+
+        return {
+            'scores': all_scores[1:],
+            'weightings': weightings,
+            'zip_stability': zip_stability
+        }
+
     def categorize_attractiveness(self, scores):
-        """Categorize attractiveness scores into levels"""
-        categories = []
-        colors = []
-        
-        for score in scores:
-            if score >= 80:
-                categories.append('Very High')
-                colors.append('#1f77b4')  # Dark blue
-            elif score >= 60:
-                categories.append('High')
-                colors.append('#ff7f0e')  # Orange
-            elif score >= 40:
-                categories.append('Medium')
-                colors.append('#2ca02c')  # Green
-            elif score >= 20:
-                categories.append('Low')
-                colors.append('#d62728')  # Red
-            else:
-                categories.append('Very Low')
-                colors.append('#9467bd')  # Purple
-        
-        return categories, colors
+        """Categorize attractiveness scores into levels (vectorized via np.digitize)"""
+        return categorize_scores(scores)
     
     def score_all_zip_demographics(self, input_file='all_ok_mo_zip_demographics.csv'):
         """Score all ZIP code demographics with attractiveness algorithm"""
         print("📊 Loading complete ZIP demographics data...")
-        df = pd.read_csv(input_file)
+        df = read_table(input_file, float32=False)
         
         print(f"🏠 Processing {len(df)} ZIP codes...")
         
@@ -197,7 +270,7 @@ class AllZIPAttractivenessScorer:
         
         # Save the scored data
         output_file = 'all_ok_mo_zip_demographics_scored.csv'
-        df.to_csv(output_file, index=False)
+        write_table(df, output_file)
         
         print(f"✅ Scored data saved to {output_file}")
         
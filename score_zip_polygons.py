@@ -3,11 +3,12 @@
 Join demographics and score all ZIP polygons in MN, WI, IL using existing weights.
 """
 import pandas as pd
-import json
 import numpy as np
+from geojson_stream import stream_features, feature_zip
+from columnar_store import read_table
 
 # Load demographic data
-zip_demo = pd.read_csv('ssm_health_locations_with_zip_demographics.csv', dtype={'zip': str})
+zip_demo = read_table('ssm_health_locations_with_zip_demographics.csv')
 
 # Deduplicate ZIPs by taking the mean for each ZIP
 zip_demo = zip_demo.groupby('zip').mean(numeric_only=True).reset_index()
@@ -54,25 +55,21 @@ def calculate_scores(df):
 
 zip_demo = calculate_scores(zip_demo)
 
-# Load merged ZIP polygons
-with open('zipcodes_mn_wi_il.geojson', 'r') as f:
-    geo = json.load(f)
-
 # Attach demographic and score data to each polygon
 zip_demo_dict = zip_demo.set_index('zip').to_dict(orient='index')
 
-for feature in geo['features']:
-    zip_code = feature['properties'].get('ZCTA5CE10') or feature['properties'].get('ZCTA5CE') or feature['properties'].get('ZIPCODE') or feature['properties'].get('zip')
+def attach_scores(feature):
+    zip_code = feature_zip(feature, keys=['ZCTA5CE10', 'ZCTA5CE', 'ZIPCODE', 'zip'])
     if not zip_code:
-        continue
-    zip_code = str(zip_code).zfill(5)
+        return feature
     if zip_code in zip_demo_dict:
         for k, v in zip_demo_dict[zip_code].items():
             feature['properties'][k] = v
     else:
         feature['properties']['attractiveness_score'] = None
+    return feature
 
-with open('zipcodes_mn_wi_il_scored.geojson', 'w') as f:
-    json.dump(geo, f)
+# Stream merged ZIP polygons through the join one feature at a time
+stream_features('zipcodes_mn_wi_il.geojson', 'zipcodes_mn_wi_il_scored.geojson', transform=attach_scores)
 
 print('✅ Scored ZIP polygons saved to zipcodes_mn_wi_il_scored.geojson') 
\ No newline at end of file
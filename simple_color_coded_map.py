@@ -7,6 +7,7 @@ import pandas as pd
 import folium
 from folium import plugins
 import random
+from facility_categorizer import ED_URGENT_CARE_SPLIT
 
 def clean_msa_names(df, msa_column='msa_name'):
     """
@@ -49,25 +50,10 @@ def create_simple_color_coded_map():
     df = df.dropna(subset=['name', 'city', 'state'])
     df['facility_type'] = df['facility_type'].fillna('Unknown')
     
-    # Create improved facility categorization
-    def categorize_facility(row):
-        name = str(row['name']).lower()
-        current_type = str(row['facility_type']).lower()
-        
-        # Emergency Department (ED/ER) - if "Emergency Room" in name
-        if 'emergency room' in name:
-            return 'Emergency Department (ED/ER)'
-        # Urgent Care - if "Urgent Care" in name (and not Emergency Room)
-        if 'urgent care' in name:
-            return 'Urgent Care'
-        # Emergency Department (ED/ER) - if previous type is ED/Urgent Care
-        if current_type == 'emergency department (ed) / urgent care':
-            return 'Emergency Department (ED/ER)'
-        # Keep existing categorization for other types
-        return row['facility_type']
-    
-    # Apply the new categorization
-    df['facility_type'] = df.apply(categorize_facility, axis=1)
+    # Split emergency rooms and urgent cares out by name; other types are kept
+    # (facility_categorizer.ED_URGENT_CARE_SPLIT)
+    split_types = ED_URGENT_CARE_SPLIT.categorize(name=df['name'], type=df['facility_type'])
+    df['facility_type'] = split_types.fillna(df['facility_type'])
     
     # Print facility type distribution
     print("Facility type distribution:")
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Topology-Preserving ZIP Polygon Simplification
+Splits ZCTA rings into arcs at the points where the set of neighbouring ZIPs changes,
+simplifies each arc with Douglas-Peucker in a canonical direction (so both polygons
+that share an edge get the identical simplified edge, with no slivers or gaps), and
+writes several precision levels that the map builders pick between by zoom.
+"""
+
+import json
+import os
+import numpy as np
+from branca.element import MacroElement, Template
+from geometry_store import load_feature_collection
+
+# tolerance: Douglas-Peucker distance in degrees (~111 km per degree of latitude)
+# decimals: coordinate rounding applied after simplification
+# min_zoom/max_zoom: Leaflet zoom range the level is shown at when switching by zoom
+SIMPLIFICATION_LEVELS = {
+    'low': {'tolerance': 0.01, 'decimals': 3, 'min_zoom': 0, 'max_zoom': 7},
+    'medium': {'tolerance': 0.002, 'decimals': 4, 'min_zoom': 8, 'max_zoom': 10},
+    'high': {'tolerance': 0.0003, 'decimals': 5, 'min_zoom': 11, 'max_zoom': 22}
+}
+
+MAX_ZOOM = 22
+
+# Coordinates are quantized to 1e-7 degrees when matching vertices across
+# polygons; TIGER neighbours share exact coordinates along common edges
+_KEY_SCALE = 1e7
+_FID_HASH = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _iter_rings(feature_collection):
+    """Yield (feature_index, part_index, ring_index, ring) for every polygon ring"""
+    for feature_index, feature in enumerate(feature_collection['features']):
+        geometry = feature.get('geometry') or {}
+        if geometry.get('type') == 'Polygon':
+            parts = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiPolygon':
+            parts = geometry['coordinates']
+        else:
+            continue
+        for part_index, part in enumerate(parts):
+            for ring_index, ring in enumerate(part):
+                yield feature_index, part_index, ring_index, ring
+
+
+def _vertex_keys(points):
+    """Pack quantized (x, y) into one uint64 key per vertex"""
+    quantized = np.round(points * _KEY_SCALE).astype(np.int64) + (1 << 31)
+    return (quantized[:, 0].astype(np.uint64) << np.uint64(32)) | quantized[:, 1].astype(np.uint64)
+
+
+def _douglas_peucker(points, tolerance):
+    """Boolean keep-mask for an open polyline; endpoints are always kept"""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end <= start + 1:
+            continue
+        a, b = points[start], points[end]
+        inner = points[start + 1:end]
+        dx, dy = b - a
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(inner[:, 0] - a[0], inner[:, 1] - a[1])
+        else:
+            distances = np.abs(dx * (inner[:, 1] - a[1]) - dy * (inner[:, 0] - a[0])) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+
+class ZIPPolygonTopology:
+    def __init__(self, feature_collection):
+        """
+        Analyse shared edges once; simplify() can then be called per level.
+        A vertex is a junction when the set of features that contain it differs
+        from the set at its previous or next vertex along the ring.
+        """
+        self.feature_collection = feature_collection
+        self.rings = []
+        ring_points, ring_fids = [], []
+        for feature_index, part_index, ring_index, ring in _iter_rings(feature_collection):
+            points = np.asarray(ring, dtype=np.float64)[:, :2]
+            if len(points) > 1 and np.array_equal(points[0], points[-1]):
+                points = points[:-1]  # handled as cyclic; re-closed on output
+            self.rings.append((feature_index, part_index, ring_index, points))
+            ring_points.append(points)
+            ring_fids.append(np.full(len(points), feature_index, dtype=np.uint64))
+
+        if not ring_points:
+            self.ring_keys, self.ring_junctions = [], []
+            return
+
+        all_points = np.concatenate(ring_points)
+        all_keys = _vertex_keys(all_points)
+        all_fids = np.concatenate(ring_fids)
+
+        # Distinct (vertex, feature) pairs -> per-vertex neighbour-set signature
+        pairs = np.unique(np.column_stack([all_keys, all_fids]), axis=0)
+        unique_keys, pair_vertex = np.unique(pairs[:, 0], return_inverse=True)
+        signatures = np.zeros(len(unique_keys), dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            np.add.at(signatures, pair_vertex, (pairs[:, 1] + np.uint64(1)) * _FID_HASH)
+        counts = np.bincount(pair_vertex, minlength=len(unique_keys))
+
+        vertex_index = np.searchsorted(unique_keys, all_keys)
+        vertex_signature = signatures[vertex_index]
+        vertex_shared = counts[vertex_index] >= 2
+
+        self.ring_keys, self.ring_junctions = [], []
+        offset = 0
+        for _, _, _, points in self.rings:
+            n = len(points)
+            signature = vertex_signature[offset:offset + n]
+            shared = vertex_shared[offset:offset + n]
+            junction = shared & ((signature != np.roll(signature, 1)) | (signature != np.roll(signature, -1)))
+            self.ring_keys.append(all_keys[offset:offset + n])
+            self.ring_junctions.append(np.flatnonzero(junction))
+            offset += n
+
+    @staticmethod
+    def _simplify_arc(points, keys, tolerance):
+        """Simplify one arc in canonical direction so shared arcs match exactly"""
+        reverse = (keys[0], keys[1] if len(keys) > 1 else 0) > (keys[-1], keys[-2] if len(keys) > 1 else 0)
+        if reverse:
+            keep = _douglas_peucker(points[::-1], tolerance)[::-1]
+        else:
+            keep = _douglas_peucker(points, tolerance)
+        return points[keep]
+
+    def _simplify_ring(self, points, keys, junctions, tolerance):
+        n = len(points)
+        if n < 3:
+            return points
+        if len(junctions) == 0:
+            # Closed arc: start at the smallest vertex key so both sides agree
+            start = int(np.argmin(keys))
+            points = np.roll(points, -start, axis=0)
+            keys = np.roll(keys, -start)
+            if keys[1] > keys[-1]:
+                points = np.concatenate([points[:1], points[1:][::-1]])
+                keys = np.concatenate([keys[:1], keys[1:][::-1]])
+            closed = np.vstack([points, points[:1]])
+            closed_keys = np.append(keys, keys[0])
+            # Pin the vertex farthest from the start so DP has a chord to work from
+            far = int(np.argmax(np.hypot(*(closed - closed[0]).T)))
+            far = far if 0 < far < n else n // 2
+            first = self._simplify_arc(closed[:far + 1], closed_keys[:far + 1], tolerance)
+            second = self._simplify_arc(closed[far:], closed_keys[far:], tolerance)
+            return np.vstack([first[:-1], second[:-1]])
+
+        pieces = []
+        for i, start in enumerate(junctions):
+            end = junctions[(i + 1) % len(junctions)]
+            if end > start:
+                index = np.arange(start, end + 1)
+            else:
+                index = np.concatenate([np.arange(start, n), np.arange(0, end + 1)])
+            pieces.append(self._simplify_arc(points[index], keys[index], tolerance)[:-1])
+        return np.vstack(pieces)
+
+    def simplify(self, tolerance, decimals=None):
+        """Return a simplified copy of the FeatureCollection"""
+        simplified = {}
+        for (feature_index, part_index, ring_index, points), keys, junctions in zip(
+                self.rings, self.ring_keys, self.ring_junctions):
+            ring = self._simplify_ring(points, keys, junctions, tolerance)
+            if decimals is not None:
+                ring = np.round(ring, decimals)
+                # Rounding can collapse neighbours; both sides of an edge collapse identically
+                distinct = np.ones(len(ring), dtype=bool)
+                distinct[1:] = np.any(ring[1:] != ring[:-1], axis=1)
+                ring = ring[distinct]
+                if len(ring) > 1 and np.array_equal(ring[0], ring[-1]):
+                    ring = ring[:-1]
+            if len(ring) < 3:
+                # Degenerate at this tolerance; keep the original ring rather than drop a ZIP
+                ring = np.round(points, decimals) if decimals is not None else points
+            ring = np.vstack([ring, ring[:1]])
+            simplified[(feature_index, part_index, ring_index)] = ring.tolist()
+
+        features = []
+        for feature_index, feature in enumerate(self.feature_collection['features']):
+            geometry = feature.get('geometry') or {}
+            geom_type = geometry.get('type')
+            if geom_type not in ('Polygon', 'MultiPolygon'):
+                features.append(dict(feature))
+                continue
+            parts = [geometry['coordinates']] if geom_type == 'Polygon' else geometry['coordinates']
+            new_parts = [
+                [simplified[(feature_index, part_index, ring_index)] for ring_index in range(len(part))]
+                for part_index, part in enumerate(parts)
+            ]
+            new_feature = dict(feature)
+            new_feature['geometry'] = {
+                'type': geom_type,
+                'coordinates': new_parts[0] if geom_type == 'Polygon' else new_parts
+            }
+            features.append(new_feature)
+        return {'type': 'FeatureCollection', 'features': features}
+
+
+def simplified_path_for(geojson_path, level):
+    """zipcodes_mo_ok.geojson -> zipcodes_mo_ok.simplified_low.geojson"""
+    return f"{os.path.splitext(geojson_path)[0]}.simplified_{level}.geojson"
+
+
+def build_simplified_levels(geojson_path, levels=None):
+    """Write every precision level of a ZIP GeoJSON next to the source file"""
+    levels = levels or list(SIMPLIFICATION_LEVELS)
+    print(f"✂️ Simplifying {geojson_path}...")
+    source = load_feature_collection(geojson_path)
+    topology = ZIPPolygonTopology(source)
+    source_size = os.path.getsize(geojson_path)
+    outputs = {}
+    for level in levels:
+        settings = SIMPLIFICATION_LEVELS[level]
+        simplified = topology.simplify(settings['tolerance'], settings['decimals'])
+        output_path = simplified_path_for(geojson_path, level)
+        with open(output_path, 'w') as f:
+            json.dump(simplified, f, separators=(',', ':'))
+        size = os.path.getsize(output_path)
+        print(f"  ✅ {level}: {size / 1e6:.2f} MB ({source_size / max(size, 1):.1f}x smaller) -> {output_path}")
+        outputs[level] = simplified
+    return outputs
+
+
+def load_simplified_feature_collection(geojson_path, level):
+    """
+    Load one precision level of a ZIP GeoJSON, (re)building the simplified
+    files when they are missing or older than the source
+    """
+    output_path = simplified_path_for(geojson_path, level)
+    if os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(geojson_path):
+        with open(output_path, 'r') as f:
+            return json.load(f)
+    return build_simplified_levels(geojson_path)[level]
+
+
+class ZoomLevelSwitcher(MacroElement):
+    """
+    Show exactly one precision level of a layer at a time, chosen by map zoom.
+    The level layers live inside a FeatureGroup so LayerControl still toggles
+    the dataset as a single overlay.
+    """
+
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var group = {{ this.group.get_name() }};
+            var levels = [
+                {% for layer, min_zoom, max_zoom in this.levels %}
+                {layer: {{ layer.get_name() }}, min: {{ min_zoom }}, max: {{ max_zoom }}},
+                {% endfor %}
+            ];
+            function showLevelForZoom() {
+                var zoom = {{ this._parent.get_name() }}.getZoom();
+                levels.forEach(function(level) {
+                    var visible = zoom >= level.min && zoom <= level.max;
+                    if (visible && !group.hasLayer(level.layer)) { group.addLayer(level.layer); }
+                    if (!visible && group.hasLayer(level.layer)) { group.removeLayer(level.layer); }
+                });
+            }
+            {{ this._parent.get_name() }}.on('zoomend', showLevelForZoom);
+            showLevelForZoom();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, group, levels):
+        super().__init__()
+        self._name = 'ZoomLevelSwitcher'
+        self.group = group
+        self.levels = levels
+
+
+def add_zoom_switched_layer(m, group, layers_by_level):
+    """
+    Add per-level layers to group and switch between them on zoom
+
+    layers_by_level: {level_name: folium layer} using SIMPLIFICATION_LEVELS zoom ranges.
+    The coarsest level given is stretched down to zoom 0 and the finest up to the
+    maximum zoom, so a subset such as ['low', 'medium'] still covers every zoom.
+    """
+    ordered = sorted(layers_by_level, key=lambda level: SIMPLIFICATION_LEVELS[level]['min_zoom'])
+    levels = []
+    for i, level in enumerate(ordered):
+        layer = layers_by_level[level]
+        layer.add_to(group)
+        settings = SIMPLIFICATION_LEVELS[level]
+        min_zoom = 0 if i == 0 else settings['min_zoom']
+        max_zoom = MAX_ZOOM if i == len(ordered) - 1 else settings['max_zoom']
+        levels.append((layer, min_zoom, max_zoom))
+    group.add_to(m)
+    ZoomLevelSwitcher(group, levels).add_to(m)
+    return group
+
+
+def main():
+    """Build all precision levels for the portal's ZIP GeoJSONs"""
+    print("🏥 SSM Health ZIP Polygon Simplification")
+    print("=" * 50)
+    for geojson_file in ['zipcodes_mn_wi_il_scored.geojson', 'zipcodes_mo_ok.geojson']:
+        if not os.path.exists(geojson_file):
+            print(f"  ⚠️ {geojson_file} not found, skipping")
+            continue
+        build_simplified_levels(geojson_file)
+
+
+if __name__ == "__main__":
+    main()
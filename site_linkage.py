@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Blocking-Based Near-Duplicate Site Detection
+The scraper lists one location several times: under each specialty, and
+under slightly different names ("SSM Health Pharmacy - Fenton" / "SSM Health
+Pharmacy Fenton") or address spellings ("1305 W. Main St." / "1305 West Main
+Street").
+The facility model already folds the specialty listings into sites; this
+stage links the sites that are the same location:
+  - each site gets blocking keys: its normalized address + ZIP, its ZIP, and
+    the geohash cell of its coordinates
+  - only sites sharing a block are compared (name similarity and address or
+    distance agreement), so the work grows with block sizes, not sites squared;
+    every link needs similar names, since one building houses distinct
+    facilities ("SSM Health Cardinal Glennon Children's Hospital" and its
+    Children's Pharmacy and Medical Genetics clinic)
+  - linked sites are grouped (transitively) under a canonical site ID, the
+    lowest site_id of the group
+"""
+
+import os
+import re
+from itertools import combinations
+import numpy as np
+import pandas as pd
+from columnar_store import write_table
+from facility_model import MODEL_DIR, load_facility_model
+from name_matcher import name_tokens
+
+LINKS_FILE = os.path.join(MODEL_DIR, 'site_links.csv')
+
+# Geohash cells of about 150 m x 150 m
+GEOHASH_PRECISION = 7
+
+# Linking thresholds
+NAME_THRESHOLD = 0.8       # Jaccard similarity of the name words
+ADDRESS_THRESHOLD = 0.75   # Jaccard similarity of the normalized address words
+MAX_DISTANCE_M = 150       # for sites without a street address
+
+# Blocks larger than this (a ZIP with hundreds of sites) are not compared pairwise
+MAX_BLOCK_SIZE = 200
+
+STREET_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'av': 'ave', 'road': 'rd', 'drive': 'dr',
+    'boulevard': 'blvd', 'lane': 'ln', 'parkway': 'pkwy', 'highway': 'hwy',
+    'court': 'ct', 'place': 'pl', 'circle': 'cir', 'terrace': 'ter', 'trail': 'trl',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw'
+}
+
+# Unit designators; the designator and the word after it are dropped
+UNIT_WORDS = {'suite', 'ste', 'unit', 'floor', 'fl', 'room', 'rm', 'building', 'bldg', 'apt', '#'}
+
+_GEOHASH_ALPHABET = np.array(list('0123456789bcdefghjkmnpqrstuvwxyz'))
+
+
+def normalize_address(street):
+    """'1305 West Main Street, Suite 200' -> '1305 w main st'"""
+    if street is None or street != street:
+        return ''
+    words = re.sub(r"[^a-z0-9# ]+", " ", str(street).lower().replace('#', ' # ')).split()
+    kept = []
+    skip = False
+    for word in words:
+        if skip:
+            skip = False
+        elif word in UNIT_WORDS:
+            skip = True
+        else:
+            kept.append(STREET_ABBREVIATIONS.get(word, word))
+    return ' '.join(kept)
+
+
+def geohash(lat, lon, precision=GEOHASH_PRECISION):
+    """Geohash strings for arrays of coordinates (None where either is missing)"""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    bits = 5 * precision
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    lon_cells = np.clip(np.floor((np.where(valid, lon, 0) + 180) / 360 * 2 ** lon_bits), 0, 2 ** lon_bits - 1).astype(np.int64)
+    lat_cells = np.clip(np.floor((np.where(valid, lat, 0) + 90) / 180 * 2 ** lat_bits), 0, 2 ** lat_bits - 1).astype(np.int64)
+
+    # Interleave the bits, longitude first
+    code = np.zeros(len(lat), dtype=np.int64)
+    for bit in range(bits):
+        if bit % 2 == 0:
+            value = (lon_cells >> (lon_bits - 1 - bit // 2)) & 1
+        else:
+            value = (lat_cells >> (lat_bits - 1 - bit // 2)) & 1
+        code = (code << 1) | value
+
+    chars = np.stack([_GEOHASH_ALPHABET[(code >> (5 * (precision - 1 - k))) & 31] for k in range(precision)], axis=1)
+    hashes = [''.join(row) for row in chars]
+    return [cell if ok else None for cell, ok in zip(hashes, valid)]
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters (arrays)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371000 * np.arcsin(np.sqrt(a))
+
+
+def _jaccard(a, b):
+    union = len(a | b)
+    return len(a & b) / union if union else 1.0
+
+
+def blocking_keys(sites, precision=GEOHASH_PRECISION):
+    """One row per (site position, block key): address+ZIP, ZIP and geohash blocks"""
+    positions = pd.Series(np.arange(len(sites)))
+    zips = pd.Series(sites['zip'].astype(object).where(sites['zip'].notna(), '').astype(str).str.strip().to_numpy())
+    addresses = pd.Series(sites['street'].map(normalize_address).to_numpy())
+    blocks = [('addr:' + addresses + '|' + zips)[(addresses != '') & (zips != '')],
+              ('zip:' + zips)[zips != '']]
+    if 'lat' in sites.columns and 'lon' in sites.columns:
+        cells = pd.Series(geohash(sites['lat'], sites['lon'], precision), dtype=object)
+        blocks.append(('geo:' + cells).dropna())
+    return pd.concat([pd.DataFrame({'position': positions[block.index], 'block': block}) for block in blocks],
+                     ignore_index=True)
+
+
+def candidate_pairs(keys, max_block_size=MAX_BLOCK_SIZE):
+    """Distinct (i, j) position pairs, i < j, that share a block"""
+    sizes = keys.groupby('block')['position'].transform('size')
+    keys = keys[(sizes > 1) & (sizes <= max_block_size)]
+    pairs = set()
+    for positions in keys.groupby('block')['position']:
+        pairs.update(combinations(sorted(set(positions[1])), 2))
+    return sorted(pairs)
+
+
+def link_sites(sites, name_threshold=NAME_THRESHOLD, address_threshold=ADDRESS_THRESHOLD,
+               max_distance_m=MAX_DISTANCE_M, max_block_size=MAX_BLOCK_SIZE):
+    """
+    Linked site pairs as a DataFrame (site_id, duplicate_site_id, name_similarity,
+    address_similarity, distance_m). Two sites in one block are linked when
+
+    - their names are similar (by their distinctive words, or all their words
+      when either name has none), and neither adds words to all of the other's
+      ("Neuropsychology at SSM Health St. Agnes Hospital" is a department of
+      the hospital, not a duplicate of it), and
+    - their addresses agree (same house number, similar words); a site without
+      a street address agrees when it is within max_distance_m
+    """
+    columns = ['site_id', 'duplicate_site_id', 'name_similarity', 'address_similarity', 'distance_m']
+    pairs = candidate_pairs(blocking_keys(sites), max_block_size)
+    if not pairs:
+        return pd.DataFrame(columns=columns)
+
+    names = [name_tokens(name) for name in sites['name']]
+    # Names made only of stopwords ("SSM Health Hospital") are compared word for word
+    full_names = [name_tokens(name, ()) for name in sites['name']]
+    normalized = [address.split() for address in sites['street'].map(normalize_address)]
+    addresses = [frozenset(words) for words in normalized]
+    numbers = [words[0] if words and words[0].isdigit() else None for words in normalized]
+    zips = sites['zip'].astype(object).tolist()
+
+    first, second = (np.array(side) for side in zip(*pairs))
+    if 'lat' in sites.columns and 'lon' in sites.columns:
+        lat, lon = sites['lat'].to_numpy(dtype=float), sites['lon'].to_numpy(dtype=float)
+        distances = haversine_m(lat[first], lon[first], lat[second], lon[second])
+    else:
+        distances = np.full(len(first), np.nan)
+
+    links = []
+    for i, j, distance in zip(first, second, distances):
+        words_i, words_j = (names[i], names[j]) if names[i] and names[j] else (full_names[i], full_names[j])
+        if not words_i or not words_j:
+            # No name to compare, no evidence they are the same site
+            continue
+        name_similarity = _jaccard(words_i, words_j)
+        if addresses[i] and addresses[j]:
+            address_similarity = _jaccard(addresses[i], addresses[j])
+            same_place = (zips[i] == zips[j] and numbers[i] == numbers[j]
+                          and address_similarity >= address_threshold)
+        else:
+            address_similarity = np.nan
+            same_place = distance <= max_distance_m
+        # One name's words plus more: a department or service of the other site
+        nested = words_i != words_j and (words_i <= words_j or words_j <= words_i)
+        if same_place and name_similarity >= name_threshold and not nested:
+            links.append((i, j, name_similarity, address_similarity, distance))
+
+    site_ids = sites['site_id'].to_numpy()
+    return pd.DataFrame([(site_ids[i], site_ids[j], name, address, distance)
+                         for i, j, name, address, distance in links], columns=columns)
+
+
+def canonical_site_ids(site_ids, links):
+    """site_id -> canonical site_id (lowest site_id among those transitively linked)"""
+    parent = {site_id: site_id for site_id in site_ids}
+
+    def root(site_id):
+        while parent[site_id] != site_id:
+            parent[site_id] = parent[parent[site_id]]
+            site_id = parent[site_id]
+        return site_id
+
+    for a, b in zip(links['site_id'], links['duplicate_site_id']):
+        ra, rb = root(a), root(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    return pd.Series({site_id: root(site_id) for site_id in site_ids}, name='canonical_site_id')
+
+
+def deduplicate_sites(sites, **thresholds):
+    """sites with a canonical_site_id column, and the links it came from"""
+    links = link_sites(sites, **thresholds)
+    sites = sites.copy()
+    sites['canonical_site_id'] = sites['site_id'].map(canonical_site_ids(sites['site_id'], links))
+    return sites, links
+
+
+def main():
+    """Link the facility model's duplicate sites and save their canonical site IDs"""
+    print("🏥 SSM Health Near-Duplicate Site Detection")
+    print("=" * 50)
+    model = load_facility_model()
+    sites = model.sites
+    keys = blocking_keys(sites)
+    pairs = candidate_pairs(keys)
+    print(f"  Sites: {len(sites)}")
+    print(f"  Candidate pairs from {keys['block'].nunique()} blocks: {len(pairs)} "
+          f"(of {len(sites) * (len(sites) - 1) // 2} possible)")
+
+    linked, links = deduplicate_sites(sites)
+    groups = linked.groupby('canonical_site_id')['site_id'].size()
+    print(f"  Linked pairs: {len(links)}")
+    print(f"  Canonical sites: {len(groups)} ({(groups > 1).sum()} with duplicates)")
+
+    print(f"\n  Examples of linked sites:")
+    names = linked.set_index('site_id')['name']
+    for canonical in groups[groups > 1].index[:10]:
+        members = linked.loc[linked['canonical_site_id'] == canonical, 'site_id']
+        print(f"    - {names[canonical]}: {', '.join(str(names[m]) for m in members if m != canonical)}")
+
+    columns = ['site_id', 'canonical_site_id', 'name', 'street', 'city', 'state', 'zip']
+    write_table(linked[[column for column in columns if column in linked.columns]], LINKS_FILE)
+    print(f"✅ Canonical site IDs saved to: {LINKS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Precompressed Static Map Delivery
+Generated map HTML is compressed to gzip and brotli once at build time.
+send_precompressed() serves the best encoding the client accepts, with a
+strong ETag per representation, and answers conditional requests with 304 so
+repeat visits to a multi-MB map cost one small round trip.
+"""
+
+import gzip
+import hashlib
+import os
+from flask import current_app, request, send_file, Response
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    # Brotli is optional; without it maps are served gzip-compressed
+    brotli = None
+
+# Preferred first when the client accepts several
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+# Maps are rebuilt in place, so browsers must revalidate (cheaply, via ETag)
+MAP_CACHE_CONTROL = 'private, no-cache'
+
+# path -> (size, mtime, sha256 hex) of the uncompressed file
+_digests = {}
+
+
+def precompress_file(path):
+    """Write path.gz (and path.br when brotli is installed) next to path"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    written = []
+    with open(path + '.gz.tmp', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    os.replace(path + '.gz.tmp', path + '.gz')
+    written.append(path + '.gz')
+    if brotli is not None:
+        with open(path + '.br.tmp', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+        os.replace(path + '.br.tmp', path + '.br')
+        written.append(path + '.br')
+    return written
+
+
+def install_precompressed(temp_path, path):
+    """
+    Move a file built at temp_path, and its precompressed copies, into place
+
+    Each rename is atomic. The file itself goes first: until its copies
+    follow they are older than it, so send_precompressed serves it uncompressed
+    rather than pairing new content with old.
+    """
+    os.replace(temp_path, path)
+    for _, suffix in ENCODINGS:
+        if os.path.exists(temp_path + suffix):
+            os.replace(temp_path + suffix, path + suffix)
+
+
+def _content_digest(path):
+    stat = os.stat(path)
+    cached = _digests.get(path)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime):
+        return cached[2]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    _digests[path] = (stat.st_size, stat.st_mtime, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def _accepted_encodings(header):
+    """Encodings from an Accept-Encoding header with q > 0"""
+    accepted = set()
+    for part in header.split(','):
+        pieces = part.strip().split(';')
+        name = pieces[0].strip().lower()
+        q = 1.0
+        for param in pieces[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            accepted.add(name)
+    return accepted
+
+
+def send_precompressed(directory, filename, mimetype='text/html', cache_control=MAP_CACHE_CONTROL):
+    """
+    Serve directory/filename, or a current .br/.gz copy the client accepts
+
+    A compressed copy is used only when it is at least as new as the source,
+    so a map rebuilt without precompression is never served stale.
+    """
+    # Relative directories resolve against the app root, as with send_from_directory
+    path = safe_join(os.path.join(current_app.root_path, directory), filename)
+    if path is None or not os.path.isfile(path):
+        return Response('Not Found', status=404)
+
+    source_mtime = os.path.getmtime(path)
+    accepted = _accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    encoding, served_path = None, path
+    for name, suffix in ENCODINGS:
+        candidate = path + suffix
+        if name in accepted and os.path.exists(candidate) and os.path.getmtime(candidate) >= source_mtime:
+            encoding, served_path = name, candidate
+            break
+
+    # Strong validator per representation: same content, different bytes per encoding
+    digest = _content_digest(path)
+    etag = f"{digest[:32]}-{encoding}" if encoding else digest[:32]
+
+    response = send_file(served_path, mimetype=mimetype, etag=etag, conditional=True, max_age=None)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def main():
+    """Precompress the portal maps in the current directory"""
+    print("🏥 SSM Health Map Precompression")
+    print("=" * 50)
+    if brotli is None:
+        print("  ⚠️ brotli not installed, writing gzip only")
+    for map_file in ['ssm_health_comprehensive_final_map.html',
+                     'ssm_health_comprehensive_competitor_market_share_map.html',
+                     'ssm_health_proper_overlay_market_share_attractiveness_facilities_map.html']:
+        if not os.path.exists(map_file):
+            print(f"  ⚠️ {map_file} not found, skipping")
+            continue
+        size = os.path.getsize(map_file)
+        for written in precompress_file(map_file):
+            print(f"  ✅ {written}: {os.path.getsize(written) / 1e6:.2f} MB (from {size / 1e6:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Column Schema for the Facility and ZIP Tables
+One registry of column dtypes shared by every table loader (columnar_store's
+read_table and input_cache's read_csv / read_excel), instead of letting each
+pd.read_csv infer them afresh:
+  - ZIP and CBSA codes: zero-padded 5-character strings, normalized once per
+    column at load, so callers never str().zfill(5) ZIPs row by row
+  - low-cardinality text (states, MSA names, facility types, specialties,
+    score categories): pandas categoricals
+  - scores and percentages: float32, except for the pipeline stages that
+    write the table back, which read them at full precision
+"""
+
+import re
+import pandas as pd
+
+# Code columns -> width; ZIPs (ZCTAs) and CBSA (MSA) codes
+CODE_COLUMNS = {
+    'zip': 5, 'zip_code': 5, 'Zip Code': 5, 'ZCTA5CE10': 5,
+    'msa_code': 5, 'cbsa10': 5, 'cbsa_code': 5
+}
+
+CATEGORY_COLUMNS = {
+    'state', 'state_id', 'msa_name', 'cbsa_name', 'msa_source', 'type', 'facility_type', 'specialty',
+    'attractiveness_category', 'attractiveness_color', 'age_mix_category', 'age_mix_summary',
+    'income_category'
+}
+
+# Scores and percentages (0-100 scales, growth rates), where float32 is plenty
+_FLOAT32_PATTERN = re.compile(r'(^|_)(score|pct)(_|$)|^zip_growth_|growth_rate$')
+
+
+def is_float32_column(column):
+    return bool(_FLOAT32_PATTERN.search(str(column)))
+
+
+def code_column(values, width=5):
+    """ZIP or CBSA codes (int, float or text) -> zero-padded strings, NaN where missing"""
+    values = pd.Series(values)
+    missing = values.isna()
+    if pd.api.types.is_numeric_dtype(values):
+        text = values.round().astype('Int64').astype(str)
+    else:
+        text = values.astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    return text.str.zfill(width).astype(object).where(~missing)
+
+
+def csv_dtypes():
+    """dtype mapping for pd.read_csv: codes as text (keeps leading zeros), categoricals"""
+    dtypes = {column: str for column in CODE_COLUMNS}
+    dtypes.update({column: 'category' for column in CATEGORY_COLUMNS})
+    return dtypes
+
+
+def apply_schema(df, dtypes=None, float32=True):
+    """
+    Cast the registry's columns of df in place and return it
+
+    dtypes: column -> dtype overrides, applied last
+    float32: False leaves scores and percentages at full precision
+    """
+    dtypes = dtypes or {}
+    for column in df.columns:
+        if column in dtypes:
+            continue
+        if column in CODE_COLUMNS:
+            df[column] = code_column(df[column], CODE_COLUMNS[column])
+        elif column in CATEGORY_COLUMNS:
+            if not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype('category')
+        elif float32 and is_float32_column(column) and pd.api.types.is_numeric_dtype(df[column]) \
+                and not pd.api.types.is_bool_dtype(df[column]):
+            df[column] = df[column].astype('float32')
+    for column, dtype in dtypes.items():
+        if column in df.columns:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def read_csv(path, float32=True, **kwargs):
+    """pd.read_csv with the schema applied; a dtype mapping in kwargs overrides it"""
+    dtypes = kwargs.pop('dtype', None) or {}
+    return apply_schema(pd.read_csv(path, dtype=dict(csv_dtypes(), **dtypes), **kwargs), dtypes, float32)
+
+
+def read_excel(path, **kwargs):
+    """pd.read_excel with the schema applied; a dtype mapping in kwargs overrides it"""
+    dtypes = kwargs.pop('dtype', None) or {}
+    return apply_schema(pd.read_excel(path, **kwargs), dtypes)
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+ZCTA Vector Tile Builder
+Cuts the scored ZIP polygons, with their attractiveness, market share and HHI
+properties, into Mapbox Vector Tiles (MVT) for every zoom level and stores them
+in an MBTiles (SQLite) file. deploy_secure_map.py serves the tiles from
+/tiles/<layer>/<z>/<x>/<y>.pbf, so the browser only downloads what is on screen
+instead of every polygon being inlined into the map HTML.
+"""
+
+import gzip
+import json
+import math
+import os
+import sqlite3
+import threading
+import numpy as np
+from folium.elements import JSCSSMixin
+from folium.map import Layer
+from jinja2 import Template
+from geojson_stream import feature_zip
+from simplify_zip_polygons import ZIPPolygonTopology
+from market_share import MARKET_SHARE_FILES, MarketShares
+
+# layer name -> MBTiles file, as served under /tiles/<layer>/...
+TILESETS = {
+    'zcta': 'ssm_health_zcta_tiles.mbtiles'
+}
+
+TILE_MIN_ZOOM = 4
+TILE_MAX_ZOOM = 12
+
+# MVT grid resolution per tile and the margin (in grid units) kept around each
+# tile so polygon outlines don't show seams at tile edges
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+# Douglas-Peucker tolerance per zoom, in tile grid units
+SIMPLIFY_GRID_UNITS = 2
+
+# Properties written into each ZCTA feature (zcta is always included)
+TILE_PROPERTIES = [
+    'attractiveness_score', 'attractiveness_category', 'fill_color',
+    'total_population', 'median_household_income', 'senior_population_pct',
+    'dominant_system', 'hhi', 'ssm_market_share'
+]
+
+# MVT geometry commands
+_MOVE_TO = 1
+_LINE_TO = 2
+_CLOSE_PATH = 7
+_POLYGON = 3
+
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+
+def _length_delimited(field, payload):
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _packed(field, values):
+    return _length_delimited(field, b''.join(_varint(v) for v in values))
+
+
+def _encode_value(value):
+    """Encode a property value as an MVT Value message"""
+    if isinstance(value, (bool, np.bool_)):
+        return _key(7, 0) + _varint(int(value))
+    if isinstance(value, (int, np.integer)):
+        return _key(6, 0) + _varint(_zigzag(int(value)))
+    if isinstance(value, (float, np.floating)):
+        return _key(3, 1) + np.float64(value).tobytes()
+    return _length_delimited(1, str(value).encode('utf-8'))
+
+
+def lonlat_to_world(points):
+    """Project lon/lat degrees to Web Mercator world coordinates in [0, 1]"""
+    lon = points[:, 0]
+    lat = np.clip(points[:, 1], -85.05112878, 85.05112878)
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(np.radians(lat)) + 1.0 / np.cos(np.radians(lat))) / math.pi) / 2.0
+    return np.column_stack([x, y])
+
+
+def _clip_axis(points, axis, bound, keep_above):
+    """One Sutherland-Hodgman pass of a closed ring against an axis-aligned line"""
+    if len(points) == 0:
+        return points
+    following = np.roll(points, -1, axis=0)
+    start, end = points[:, axis], following[:, axis]
+    start_inside = start >= bound if keep_above else start <= bound
+    end_inside = end >= bound if keep_above else end <= bound
+    crossing = start_inside != end_inside
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(crossing, (bound - start) / (end - start), 0.0)
+    intersection = points + t[:, None] * (following - points)
+    intersection[:, axis] = bound
+    # Each edge emits its crossing point (if any) followed by its end vertex (if inside)
+    out = np.empty((2 * len(points), 2))
+    keep = np.empty(2 * len(points), dtype=bool)
+    out[0::2], keep[0::2] = intersection, crossing
+    out[1::2], keep[1::2] = following, end_inside
+    return out[keep]
+
+
+def clip_ring(points, low, high):
+    """Clip an open ring (no repeated closing point) to the square [low, high]"""
+    for axis in (0, 1):
+        points = _clip_axis(points, axis, low, True)
+        points = _clip_axis(points, axis, high, False)
+    return points
+
+
+def _ring_area(points):
+    x, y = points[:, 0], points[:, 1]
+    return (np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)) / 2.0
+
+
+def _encode_polygon(rings):
+    """
+    Encode tile-grid rings (exterior first, then its holes) as MVT commands.
+    Exterior rings get positive surveyor's area in tile coordinates and holes
+    negative, as the MVT spec requires. Returns [] if the exterior collapses.
+    """
+    commands = []
+    cursor = (0, 0)
+    for ring_index, ring in enumerate(rings):
+        ring = np.round(ring).astype(np.int64)
+        distinct = np.ones(len(ring), dtype=bool)
+        distinct[1:] = np.any(ring[1:] != ring[:-1], axis=1)
+        ring = ring[distinct]
+        if len(ring) > 1 and np.array_equal(ring[0], ring[-1]):
+            ring = ring[:-1]
+        area = _ring_area(ring.astype(float)) if len(ring) >= 3 else 0.0
+        if area == 0:
+            if ring_index == 0:
+                return []
+            continue
+        if (ring_index == 0) != (area > 0):
+            ring = ring[::-1]
+        deltas = np.diff(np.vstack([cursor, ring]), axis=0)
+        commands.append((1 << 3) | _MOVE_TO)
+        commands.extend(_zigzag(int(v)) for v in deltas[0])
+        commands.append(((len(ring) - 1) << 3) | _LINE_TO)
+        commands.extend(_zigzag(int(v)) for v in deltas[1:].ravel())
+        commands.append((1 << 3) | _CLOSE_PATH)
+        cursor = tuple(ring[-1])
+    return commands
+
+
+def encode_tile_layer(name, features, extent=TILE_EXTENT):
+    """
+    Encode one MVT layer as a Tile message
+
+    features: list of (feature_id, properties dict, geometry command list)
+    """
+    keys, key_index = [], {}
+    values, value_index = [], {}
+    encoded_features = []
+    for feature_id, properties, geometry in features:
+        tags = []
+        for key, value in properties.items():
+            if key not in key_index:
+                key_index[key] = len(keys)
+                keys.append(key)
+            value_key = (type(value).__name__, value)
+            if value_key not in value_index:
+                value_index[value_key] = len(values)
+                values.append(value)
+            tags.extend([key_index[key], value_index[value_key]])
+        encoded_features.append(
+            _key(1, 0) + _varint(feature_id) +
+            _packed(2, tags) +
+            _key(3, 0) + _varint(_POLYGON) +
+            _packed(4, geometry)
+        )
+
+    layer = _key(15, 0) + _varint(2) + _length_delimited(1, name.encode('utf-8'))
+    layer += b''.join(_length_delimited(2, f) for f in encoded_features)
+    layer += b''.join(_length_delimited(3, k.encode('utf-8')) for k in keys)
+    layer += b''.join(_length_delimited(4, _encode_value(v)) for v in values)
+    layer += _key(5, 0) + _varint(extent)
+    return _length_delimited(3, layer)
+
+
+def _feature_parts(feature):
+    geometry = feature.get('geometry') or {}
+    if geometry.get('type') == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry.get('type') == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+def _tile_properties(feature):
+    """Pick the tile properties of a feature, dropping missing values"""
+    properties = feature.get('properties') or {}
+    out = {'zcta': feature_zip(feature)}
+    for key in TILE_PROPERTIES:
+        value = properties.get(key)
+        if value is None or value == 'N/A' or (isinstance(value, float) and np.isnan(value)):
+            continue
+        out[key] = round(value, 2) if isinstance(value, float) else value
+    return out
+
+
+def cut_zoom_level(feature_collection, zoom, extent=TILE_EXTENT, buffer=TILE_BUFFER):
+    """
+    Cut every feature into the tiles it touches at one zoom level
+
+    Returns {(x, y): [(feature_id, properties, geometry commands), ...]}
+    """
+    scale = 2 ** zoom
+    low, high = -buffer, extent + buffer
+    tiles = {}
+    for feature_index, feature in enumerate(feature_collection['features']):
+        parts = [
+            [lonlat_to_world(np.asarray(ring, dtype=np.float64)[:-1, :2]) * scale for ring in part]
+            for part in _feature_parts(feature)
+        ]
+        parts = [part for part in parts if len(part) and len(part[0]) >= 3]
+        if not parts:
+            continue
+        exterior = np.vstack([part[0] for part in parts])
+        margin = buffer / extent
+        x_min, y_min = np.floor(exterior.min(axis=0) - margin).astype(int)
+        x_max, y_max = np.floor(exterior.max(axis=0) + margin).astype(int)
+        properties = _tile_properties(feature)
+
+        for tile_x in range(max(x_min, 0), min(x_max, scale - 1) + 1):
+            for tile_y in range(max(y_min, 0), min(y_max, scale - 1) + 1):
+                origin = np.array([tile_x, tile_y], dtype=np.float64)
+                geometry = []
+                for part in parts:
+                    rings = [clip_ring((ring - origin) * extent, low, high) for ring in part]
+                    if len(rings[0]) < 3:
+                        continue
+                    geometry.extend(_encode_polygon([r for r in rings if len(r) >= 3]))
+                if geometry:
+                    tiles.setdefault((tile_x, tile_y), []).append((feature_index + 1, properties, geometry))
+    return tiles
+
+
+class MBTilesWriter:
+    def __init__(self, path):
+        """
+        Create (or replace) an MBTiles file. Tiles are written to a temporary
+        file that close() renames over path, so readers never see a partial set.
+        """
+        self.path = path
+        self.temp_path = path + '.tmp'
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+        self.connection = sqlite3.connect(self.temp_path)
+        self.connection.executescript("""
+            CREATE TABLE metadata (name TEXT, value TEXT);
+            CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+            CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+        """)
+
+    def write_metadata(self, metadata):
+        self.connection.executemany(
+            "INSERT INTO metadata (name, value) VALUES (?, ?)",
+            [(name, str(value)) for name, value in metadata.items()]
+        )
+
+    def write_tiles(self, zoom, tiles):
+        """tiles: {(x, y): encoded tile bytes}; rows are stored gzip-compressed in TMS order"""
+        self.connection.executemany(
+            "INSERT INTO tiles (zoom_level, tile_column, tile_row, tile_data) VALUES (?, ?, ?, ?)",
+            [(zoom, x, (2 ** zoom - 1) - y, gzip.compress(data, mtime=0)) for (x, y), data in tiles.items()]
+        )
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+        os.replace(self.temp_path, self.path)
+
+
+class MBTilesReader:
+    def __init__(self, path):
+        """
+        Read-only access to an MBTiles file, safe to share across request threads.
+        A file replaced since it was opened (a rebuilt tile set) is reopened.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = None
+        self.version = None
+        self._reopen_if_replaced()
+
+    def _reopen_if_replaced(self):
+        stat = os.stat(self.path)
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if version != self.version:
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, check_same_thread=False)
+            self.version = version
+
+    def tile(self, z, x, y):
+        """gzip-compressed tile bytes for XYZ tile coordinates, or None"""
+        with self.lock:
+            self._reopen_if_replaced()
+            row = self.connection.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (z, x, (2 ** z - 1) - y)
+            ).fetchone()
+        return row[0] if row else None
+
+    def metadata(self):
+        with self.lock:
+            self._reopen_if_replaced()
+            return dict(self.connection.execute("SELECT name, value FROM metadata").fetchall())
+
+
+def build_vector_tiles(feature_collection, output_path, layer_name='zcta',
+                       min_zoom=TILE_MIN_ZOOM, max_zoom=TILE_MAX_ZOOM):
+    """Cut a FeatureCollection into an MBTiles tile set, simplifying per zoom"""
+    print(f"🧩 Building vector tiles {output_path} (zoom {min_zoom}-{max_zoom})...")
+    topology = ZIPPolygonTopology(feature_collection)
+    writer = MBTilesWriter(output_path)
+    total_tiles = 0
+    for zoom in range(min_zoom, max_zoom + 1):
+        # One grid unit at this zoom in degrees of longitude
+        tolerance = SIMPLIFY_GRID_UNITS * 360.0 / (2 ** zoom * TILE_EXTENT)
+        simplified = topology.simplify(tolerance)
+        tiles = cut_zoom_level(simplified, zoom)
+        writer.write_tiles(zoom, {xy: encode_tile_layer(layer_name, features) for xy, features in tiles.items()})
+        total_tiles += len(tiles)
+        print(f"  ✅ zoom {zoom}: {len(tiles)} tiles")
+
+    all_points = np.vstack([
+        np.asarray(ring, dtype=np.float64)[:, :2]
+        for feature in feature_collection['features']
+        for part in _feature_parts(feature) for ring in part
+    ]) if feature_collection['features'] else np.zeros((1, 2))
+    west, south = all_points.min(axis=0)
+    east, north = all_points.max(axis=0)
+    fields = {'zcta': 'String'}
+    fields.update({key: 'String' if key in ('attractiveness_category', 'fill_color', 'dominant_system') else 'Number'
+                   for key in TILE_PROPERTIES})
+    writer.write_metadata({
+        'name': layer_name,
+        'format': 'pbf',
+        'type': 'overlay',
+        'minzoom': min_zoom,
+        'maxzoom': max_zoom,
+        'bounds': f"{west:.6f},{south:.6f},{east:.6f},{north:.6f}",
+        'center': f"{(west + east) / 2:.6f},{(south + north) / 2:.6f},{min_zoom}",
+        'json': json.dumps({'vector_layers': [
+            {'id': layer_name, 'fields': fields, 'minzoom': min_zoom, 'maxzoom': max_zoom}
+        ]})
+    })
+    writer.close()
+    print(f"  ✅ {total_tiles} tiles written to {output_path}")
+    return output_path
+
+
+def load_zip_market_share(files=MARKET_SHARE_FILES):
+    """
+    Per-ZIP dominant system, HHI (0-10,000) and SSM Health share from the 2024
+    inpatient market share extracts; missing files are skipped
+    """
+    return MarketShares.load(files).summary()
+
+
+class VectorTileLayer(JSCSSMixin, Layer):
+    """
+    Leaflet.VectorGrid layer for a tile set served by deploy_secure_map.py,
+    filled by each feature's fill_color property with a click popup
+    """
+
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = L.vectorGrid.protobuf({{ this.url|tojson }}, {
+            rendererFactory: L.canvas.tile,
+            interactive: true,
+            maxNativeZoom: {{ this.max_native_zoom }},
+            getFeatureId: function(f) { return f.properties.zcta; },
+            vectorTileLayerStyles: {
+                {{ this.layer_name_in_tiles|tojson }}: function(properties) {
+                    return {
+                        fill: true,
+                        fillColor: properties.fill_color || {{ this.default_color|tojson }},
+                        fillOpacity: 0.6,
+                        color: 'black',
+                        weight: 1
+                    };
+                }
+            }
+        });
+        {% if this.show %}{{ this.get_name() }}.addTo({{ this._parent.get_name() }});{% endif %}
+        {{ this.get_name() }}.on('click', function(e) {
+            var p = e.layer.properties, fields = {{ this.popup_fields|tojson }}, rows = '';
+            fields.forEach(function(field) {
+                if (p[field[0]] !== undefined) {
+                    rows += '<tr><th style="text-align:left;padding-right:8px">' + field[1] + '</th><td>' + p[field[0]] + '</td></tr>';
+                }
+            });
+            L.popup().setLatLng(e.latlng).setContent('<table>' + rows + '</table>').openOn({{ this._parent.get_name() }});
+        });
+        {% endmacro %}
+    """)
+
+    default_js = [
+        ('leaflet.vectorgrid', 'https://unpkg.com/leaflet.vectorgrid@1.3.0/dist/Leaflet.VectorGrid.bundled.min.js')
+    ]
+
+    def __init__(self, url, layer_name_in_tiles='zcta', popup_fields=None, name=None,
+                 max_native_zoom=TILE_MAX_ZOOM, default_color='#cccccc', overlay=True, control=True, show=True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = 'VectorTileLayer'
+        self.url = url
+        self.layer_name_in_tiles = layer_name_in_tiles
+        self.popup_fields = [list(field) for field in (popup_fields or [('zcta', 'ZIP Code')])]
+        self.max_native_zoom = max_native_zoom
+        self.default_color = default_color
+
+
+def main():
+    """Build the ZCTA tile set served by deploy_secure_map.py"""
+    from create_comprehensive_final_map import load_and_merge_zip_data, build_zip_score_lookup, prepare_zip_features
+    from geometry_store import load_feature_collection
+
+    print("🏥 SSM Health ZCTA Vector Tile Builder")
+    print("=" * 50)
+
+    zip_score_lookup = build_zip_score_lookup(load_and_merge_zip_data())
+    market_share = load_zip_market_share().set_index('zip')
+    print(f"📊 Market share available for {len(market_share)} ZIP codes")
+
+    features = []
+    # Same polygons as the comprehensive map: WI/IL (FIPS 55, 17) plus MO/OK
+    for geojson_file, zip_field, statefps in [
+            ('zipcodes_mn_wi_il_scored.geojson', 'ZCTA5CE10', ('55', '17')),
+            ('zipcodes_mo_ok.geojson', 'ZCTA5CE20', None)]:
+        if not os.path.exists(geojson_file):
+            print(f"  ⚠️ {geojson_file} not found, skipping")
+            continue
+        geojson = prepare_zip_features(load_feature_collection(geojson_file), zip_field, zip_score_lookup, statefps)
+        features.extend(geojson['features'])
+
+    for feature in features:
+        zip_code = feature_zip(feature)
+        if zip_code in market_share.index:
+            row = market_share.loc[zip_code]
+            feature['properties']['dominant_system'] = row['dominant_system']
+            feature['properties']['hhi'] = float(row['hhi'])
+            feature['properties']['ssm_market_share'] = float(row['ssm_market_share'])
+
+    build_vector_tiles({'type': 'FeatureCollection', 'features': features}, TILESETS['zcta'])
+
+
+if __name__ == "__main__":
+    main()